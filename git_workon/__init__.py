@@ -1 +1,34 @@
-"""The script package."""
+"""The script package.
+
+Reports of unpushed changes of projects are available for programmatic use::
+
+    from git_workon import WorkingDir, get_reports
+
+    for path, report in get_reports(paths).items():
+        if not report.clean:
+            print(path, report.commits, report.unstaged)
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .git import (
+        ProjectReport,
+        WorkingDir,
+        get_report,
+        get_reports,
+    )
+
+__all__ = ["ProjectReport", "WorkingDir", "get_report", "get_reports"]
+
+
+def __getattr__(name: str):
+    # the API is imported lazily, so running modules of the package with
+    # `python -m` does not import them twice
+    if name in __all__:
+        return getattr(
+            importlib.import_module(".git", __name__), name
+        )
+    raise AttributeError(
+        f"module {__name__!r} has no attribute {name!r}"
+    )
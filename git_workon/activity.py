@@ -0,0 +1,122 @@
+"""Module for last activity times of GIT projects.
+
+Activity is derived from file system metadata only, without GIT
+subprocesses: mtimes of the HEAD reflog and the index, which change on
+commits, checkouts and staging, and mtimes of a sample of working tree
+entries, which change on edits.
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+_GIT_DIR = ".git"
+# number of working tree entries checked per project
+SAMPLE_SIZE = 2000
+_DURATION_UNITS = {
+    "s": 1,
+    "m": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 604800,
+}
+
+
+def parse_duration(duration: str) -> float:
+    """Parse a human-readable duration like `14d` into seconds."""
+    number = duration.strip().lower()
+    multiplier = 1
+    if number[-1:] in _DURATION_UNITS:
+        number, multiplier = number[:-1], _DURATION_UNITS[number[-1]]
+    try:
+        return float(number) * multiplier
+    except ValueError as exc:
+        raise ValueError(f'Invalid duration "{duration}"') from exc
+
+
+def format_age(seconds: float) -> str:
+    """Return a human-readable age like `3d`."""
+    for unit in ("w", "d", "h", "m"):
+        if seconds >= _DURATION_UNITS[unit]:
+            return f"{seconds // _DURATION_UNITS[unit]:.0f}{unit}"
+    return "now"
+
+
+def _get_git_dir(directory: str) -> str:
+    """Return the GIT directory of a project, a linked worktree one too."""
+    path = os.path.join(directory, _GIT_DIR)
+    if os.path.isfile(path):
+        with open(path, encoding="utf8") as file:
+            gitdir = file.read().strip()[len("gitdir:") :].strip()
+        return os.path.join(directory, gitdir)
+    return path
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def sample_worktree(directory: str, size: int = SAMPLE_SIZE) -> float:
+    """Return the latest mtime of up to `size` working tree entries.
+
+    Entries are visited breadth-first, so shallow ones are always checked.
+    """
+    latest = _mtime(directory)
+    queue = deque([directory])
+    checked = 0
+    while queue and checked < size:
+        try:
+            with os.scandir(queue.popleft()) as entries:
+                for entry in entries:
+                    if entry.name == _GIT_DIR:
+                        continue
+                    checked += 1
+                    stat = entry.stat(follow_symlinks=False)
+                    latest = max(latest, stat.st_mtime)
+                    if entry.is_dir(follow_symlinks=False):
+                        queue.append(entry.path)
+                    if checked >= size:
+                        break
+        except OSError:
+            continue
+    return latest
+
+
+def get_activity(
+    directory: str, sample_size: int = SAMPLE_SIZE
+) -> Optional[float]:
+    """Return the last activity time of a GIT project.
+
+    :returns: timestamp or None if no activity found
+    """
+    git_dir = _get_git_dir(directory)
+    latest = max(
+        _mtime(os.path.join(git_dir, "logs", "HEAD")),
+        _mtime(os.path.join(git_dir, "index")),
+        sample_worktree(directory, sample_size),
+    )
+    return latest or None
+
+
+def get_activities(
+    directories: List[str], jobs: Optional[int] = None
+) -> Dict[str, Optional[float]]:
+    """Return last activity times of projects by their `directories`.
+
+    Projects are inspected concurrently.
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return dict(
+            zip(directories, executor.map(get_activity, directories))
+        )
+
+
+def get_age(timestamp: Optional[float]) -> Optional[float]:
+    """Return seconds passed since `timestamp`."""
+    if timestamp is None:
+        return None
+    return max(time.time() - timestamp, 0.0)
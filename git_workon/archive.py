@@ -0,0 +1,471 @@
+"""Module for archiving of GIT projects instead of their removal.
+
+A project is archived into `<archive_dir>/<project>/<timestamp>/` directory
+in one of the modes:
+
+* unpushed - a GIT bundle of unpushed refs (branches, tags, stashes and a
+  detached HEAD) and a compressed tar of untracked files and uncommitted
+  changes. Tags and a detached HEAD pointing to pushed commits are left out
+  of bundles, so their targets are kept in the metadata
+* full - a compressed tar of the whole project tree
+
+Archives are streamed straight into their final files without staging
+copies on disk. Compression uses all CPU cores if a multi-threaded
+compressor (`zstd`, `pigz` or `xz`) is available, and falls back to the
+single-threaded Python `gzip` otherwise.
+"""
+import functools
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tarfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Dict, Iterator, List, Optional
+
+from . import runner
+
+MODE_UNPUSHED = "unpushed"
+MODE_FULL = "full"
+
+_META_NAME = "meta.json"
+_BUNDLE_NAME = "refs.bundle"
+_TREE_NAME = "tree.tar"
+_UNTRACKED_NAME = "untracked.tar"
+_PATCH_NAME = "uncommitted.patch"
+_STASH_REFS = "refs/workon-stash"
+_HEAD_REFS = "refs/workon-head"
+
+
+class ArchiveError(Exception):
+    """Archive creation/restoration error."""
+
+
+@dataclass
+class _Compressor:
+    extension: str
+    compress: Optional[List[str]]
+    decompress: Optional[List[str]]
+
+
+_COMPRESSORS = (
+    _Compressor(
+        "zst", ["zstd", "-q", "-T0", "-c"], ["zstd", "-q", "-d", "-c"]
+    ),
+    _Compressor("gz", ["pigz", "-c"], ["pigz", "-d", "-c"]),
+    _Compressor("xz", ["xz", "-T0", "-c"], ["xz", "-d", "-c"]),
+)
+# used if no multi-threaded compressor is available
+_PYTHON_GZIP = _Compressor("gz", None, None)
+
+
+def _get_compressor() -> _Compressor:
+    for compressor in _COMPRESSORS:
+        if shutil.which(compressor.compress[0]):
+            return compressor
+    return _PYTHON_GZIP
+
+
+def _get_decompressor(extension: str) -> _Compressor:
+    for compressor in _COMPRESSORS:
+        if compressor.extension == extension and shutil.which(
+            compressor.decompress[0]
+        ):
+            return compressor
+    if extension == _PYTHON_GZIP.extension:
+        return _PYTHON_GZIP
+    raise ArchiveError(
+        f'No decompressor found for "{extension}" archives'
+    )
+
+
+# patches and untracked files names are bytes
+_git = functools.partial(runner.run, check=True, text=False)
+
+
+@contextmanager
+def _open_tar_writer(
+    path: str, compressor: _Compressor
+) -> Iterator[tarfile.TarFile]:
+    """Open a tar stream compressed straight into `path`."""
+    with open(path, "wb") as file:
+        if compressor.compress is None:
+            with tarfile.open(fileobj=file, mode="w|gz") as tar:
+                yield tar
+            return
+
+        with subprocess.Popen(
+            compressor.compress, stdin=subprocess.PIPE, stdout=file
+        ) as proc:
+            with tarfile.open(fileobj=proc.stdin, mode="w|") as tar:
+                yield tar
+            proc.stdin.close()
+        if proc.returncode:
+            raise ArchiveError(f'Failed to compress "{path}"')
+
+
+@contextmanager
+def _open_tar_reader(
+    path: str, extension: str
+) -> Iterator[tarfile.TarFile]:
+    """Open a compressed tar stream from `path`."""
+    compressor = _get_decompressor(extension)
+    with open(path, "rb") as file:
+        if compressor.decompress is None:
+            with tarfile.open(fileobj=file, mode="r|gz") as tar:
+                yield tar
+            return
+
+        with subprocess.Popen(
+            compressor.decompress, stdin=file, stdout=subprocess.PIPE
+        ) as proc:
+            with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+                yield tar
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _get_head(directory: str) -> Optional[str]:
+    result = runner.run(
+        ["symbolic-ref", "--quiet", "--short", "HEAD"], cwd=directory
+    )
+    return result.stdout.strip() or None
+
+
+def _get_detached_head(directory: str) -> Optional[str]:
+    """Return the HEAD commit if it is detached."""
+    if _get_head(directory):
+        return None
+    result = runner.run(
+        ["rev-parse", "--verify", "--quiet", "HEAD"], cwd=directory
+    )
+    return result.stdout.strip() or None
+
+
+def _get_tags(directory: str) -> Dict[str, str]:
+    """Return objects of tags by their names."""
+    output = runner.run(
+        [
+            "for-each-ref",
+            "--format=%(refname:strip=2) %(objectname)",
+            "refs/tags",
+        ],
+        directory,
+        check=True,
+    ).stdout
+    return dict(line.rsplit(" ", 1) for line in output.splitlines())
+
+
+def _get_stashes(directory: str) -> List[List[str]]:
+    """Return stash commits and messages from the newest to the oldest."""
+    output = runner.run(
+        ["stash", "list", "--format=%H %gs"], directory, check=True
+    ).stdout
+    return [line.split(" ", 1) for line in output.splitlines()]
+
+
+def _bundle_unpushed_refs(
+    directory: str,
+    path: str,
+    stashes: List[List[str]],
+    detached: Optional[str] = None,
+) -> bool:
+    """Write unpushed refs to the bundle `path`.
+
+    Branches, tags, stashes and the `detached` HEAD commit are bundled.
+
+    :returns: whether there was something to bundle
+    """
+    temporary_refs = {
+        f"{_STASH_REFS}/{i}": commit
+        for i, (commit, _) in enumerate(stashes)
+    }
+    if detached:
+        temporary_refs[f"{_HEAD_REFS}/HEAD"] = detached
+    for ref, commit in temporary_refs.items():
+        _git(["update-ref", ref, commit], directory)
+    try:
+        _git(
+            [
+                "bundle",
+                "create",
+                path,
+                "--branches",
+                "--tags",
+                f"--glob={_STASH_REFS}/*",
+                f"--glob={_HEAD_REFS}/*",
+                "--not",
+                "--remotes",
+            ],
+            directory,
+        )
+    except subprocess.CalledProcessError as exc:
+        if b"empty bundle" not in exc.stderr:
+            raise ArchiveError(
+                f"Failed to bundle unpushed refs:\n{exc.stderr.decode()}"
+            ) from exc
+        return False
+    finally:
+        for ref in temporary_refs:
+            _git(["update-ref", "-d", ref], directory)
+    return True
+
+
+def _archive_untracked(
+    directory: str, path: str, compressor: _Compressor
+) -> None:
+    """Write untracked files and uncommitted changes to the tar `path`."""
+    untracked = _git(
+        ["ls-files", "--others", "--exclude-standard", "-z"],
+        directory,
+    ).stdout.decode()
+    patch = _git(["diff", "HEAD", "--binary"], directory).stdout
+
+    with _open_tar_writer(path, compressor) as tar:
+        _add_bytes(tar, _PATCH_NAME, patch)
+        for name in filter(None, untracked.split("\0")):
+            tar.add(
+                os.path.join(directory, name),
+                arcname=os.path.join("untracked", name),
+                recursive=False,
+            )
+
+
+def _get_remotes(directory: str) -> dict:
+    output = runner.run(["remote", "-v"], cwd=directory).stdout
+    return {
+        line.split()[0]: line.split()[1]
+        for line in output.splitlines()
+        if line.endswith("(fetch)")
+    }
+
+
+def _make_archive_dir(archive_dir: str, project_name: str) -> str:
+    path = os.path.join(
+        archive_dir, project_name, time.strftime("%Y%m%dT%H%M%S")
+    )
+    suffix = 0
+    candidate = path
+    while os.path.exists(candidate):
+        suffix += 1
+        candidate = f"{path}-{suffix}"
+    os.makedirs(candidate)
+    return candidate
+
+
+def archive_project(
+    directory: str, archive_dir: str, mode: str = MODE_UNPUSHED
+) -> str:
+    """Archive a GIT project from `directory` into `archive_dir`.
+
+    :returns: path to the created archive
+    :raises: `ArchiveError` if the project failed to be archived. No partial
+      archive is left in that case
+    """
+    project_name = os.path.basename(os.path.normpath(directory))
+    path = _make_archive_dir(archive_dir, project_name)
+    compressor = _get_compressor()
+    logging.info('Archiving "%s" to "%s"', directory, path)
+
+    meta = {
+        "project": project_name,
+        "mode": mode,
+        "created": time.time(),
+        "head": _get_head(directory),
+        "detached": _get_detached_head(directory),
+        "tags": {},
+        "remotes": _get_remotes(directory),
+        "compression": compressor.extension,
+        "stashes": [],
+    }
+    try:
+        if mode == MODE_FULL:
+            with _open_tar_writer(
+                os.path.join(
+                    path, f"{_TREE_NAME}.{compressor.extension}"
+                ),
+                compressor,
+            ) as tar:
+                tar.add(directory, arcname=".")
+        else:
+            stashes = _get_stashes(directory)
+            meta["stashes"] = [message for _, message in stashes]
+            meta["tags"] = _get_tags(directory)
+            if not _bundle_unpushed_refs(
+                directory,
+                os.path.join(path, _BUNDLE_NAME),
+                stashes,
+                meta["detached"],
+            ):
+                logging.debug('No unpushed refs in "%s"', directory)
+            _archive_untracked(
+                directory,
+                os.path.join(
+                    path, f"{_UNTRACKED_NAME}.{compressor.extension}"
+                ),
+                compressor,
+            )
+    except (
+        OSError,
+        subprocess.CalledProcessError,
+        ArchiveError,
+    ) as exc:
+        shutil.rmtree(path)
+        if isinstance(exc, ArchiveError):
+            raise
+        raise ArchiveError(
+            f'Failed to archive "{directory}": {exc}'
+        ) from exc
+
+    with open(
+        os.path.join(path, _META_NAME), "w", encoding="utf8"
+    ) as file:
+        json.dump(meta, file, indent=2)
+    return path
+
+
+def find_archive(
+    archive_dir: str, project_name: str
+) -> Optional[str]:
+    """Return path to the latest complete archive of a project."""
+    project_dir = os.path.join(archive_dir, project_name)
+    if not os.path.isdir(project_dir):
+        return None
+    for name in sorted(os.listdir(project_dir), reverse=True):
+        path = os.path.join(project_dir, name)
+        if os.path.isfile(os.path.join(path, _META_NAME)):
+            return path
+    return None
+
+
+def load_meta(path: str) -> dict:
+    """Return metadata of the archive under `path`."""
+    with open(
+        os.path.join(path, _META_NAME), encoding="utf8"
+    ) as file:
+        return json.load(file)
+
+
+def _extract(tar: tarfile.TarFile, destination: str) -> None:
+    for member in tar:
+        tar.extract(member, destination)
+
+
+def restore_tree(path: str, destination: str) -> None:
+    """Restore a full archive from `path` into `destination` directory."""
+    meta = load_meta(path)
+    logging.info('Restoring "%s" from "%s"', destination, path)
+    with _open_tar_reader(
+        os.path.join(path, f"{_TREE_NAME}.{meta['compression']}"),
+        meta["compression"],
+    ) as tar:
+        _extract(tar, destination)
+
+
+def restore_unpushed(path: str, directory: str) -> None:
+    """Restore unpushed state from an archive `path` into a fresh clone.
+
+    :raises: `ArchiveError` if the state failed to be restored
+    """
+    meta = load_meta(path)
+    logging.info(
+        'Restoring unpushed state of "%s" from "%s"', directory, path
+    )
+    bundle = os.path.join(path, _BUNDLE_NAME)
+    try:
+        if os.path.isfile(bundle):
+            _git(
+                [
+                    "fetch",
+                    "--update-head-ok",
+                    bundle,
+                    "+refs/heads/*:refs/heads/*",
+                    "+refs/tags/*:refs/tags/*",
+                    f"+{_STASH_REFS}/*:{_STASH_REFS}/*",
+                    f"+{_HEAD_REFS}/*:{_HEAD_REFS}/*",
+                ],
+                directory,
+            )
+            # HEAD branch might be moved by the fetch
+            _git(["reset", "--hard", "HEAD"], directory)
+        _restore_tags(meta.get("tags", {}), directory)
+        if meta["head"]:
+            _git(["checkout", meta["head"]], directory)
+        elif meta.get("detached"):
+            _git(
+                ["checkout", "--detach", meta["detached"]], directory
+            )
+        _git(["update-ref", "-d", f"{_HEAD_REFS}/HEAD"], directory)
+
+        # stashes are stored from the oldest to the newest one
+        for i in reversed(range(len(meta["stashes"]))):
+            ref = f"{_STASH_REFS}/{i}"
+            _git(
+                ["stash", "store", "-m", meta["stashes"][i], ref],
+                directory,
+            )
+            _git(["update-ref", "-d", ref], directory)
+
+        with _open_tar_reader(
+            os.path.join(
+                path, f"{_UNTRACKED_NAME}.{meta['compression']}"
+            ),
+            meta["compression"],
+        ) as tar:
+            _restore_untracked(tar, directory)
+    except subprocess.CalledProcessError as exc:
+        raise ArchiveError(
+            f'Failed to restore "{directory}":\n{exc.stderr.decode()}'
+        ) from exc
+
+
+def _restore_tags(tags: Dict[str, str], directory: str) -> None:
+    """Create `tags` missing from a fresh clone.
+
+    Tags of pushed commits are left out of bundles, so their targets are
+    already in the clone. Tags moved on remotes are kept as they are.
+    """
+    existing = _get_tags(directory)
+    for name, target in tags.items():
+        if name in existing:
+            continue
+        try:
+            _git(
+                ["update-ref", f"refs/tags/{name}", target], directory
+            )
+        except subprocess.CalledProcessError:
+            logging.warning(
+                'Failed to restore "%s" tag, its target "%s" is missing',
+                name,
+                target,
+            )
+
+
+def _restore_untracked(tar: tarfile.TarFile, directory: str) -> None:
+    prefix = "untracked/"
+    for member in tar:
+        if member.name == _PATCH_NAME:
+            patch = _read_member(tar, member)
+            if patch:
+                _git(
+                    ["apply", "--binary", "-"], directory, input=patch
+                )
+        elif member.name.startswith(prefix):
+            member.name = member.name[len(prefix) :]
+            tar.extract(member, directory)
+
+
+def _read_member(
+    tar: tarfile.TarFile, member: tarfile.TarInfo
+) -> bytes:
+    file: Optional[IO[bytes]] = tar.extractfile(member)
+    return file.read() if file else b""
@@ -2,13 +2,17 @@
 import argparse
 import logging
 import sys
+import time
 from dataclasses import dataclass
-from typing import Iterator, List, Optional
+from typing import Dict, Iterator, List, Optional
 
 import termcolor
 
+from . import archive as archive_module
 from . import config as config_module
-from . import git
+from . import activity, disk, doctor, events, git, maintenance, search
+from . import sources as sources_module
+from . import ssh
 
 
 class CLIError(Exception):
@@ -29,6 +33,7 @@ _COLOR_FOR_STATUS = {
     git.ProjectStatus.CLEAN: "green",
     git.ProjectStatus.DIRTY: "yellow",
     git.ProjectStatus.UNDEFINED: "white",
+    git.ProjectStatus.BUSY: "cyan",
 }
 
 
@@ -61,12 +66,43 @@ def _append_start_command(
     start_parser.register("action", "extend", ExtendAction)
 
     start_parser.add_argument(
-        "project", help="project name to start with"
+        "project",
+        nargs="*",
+        help=(
+            "names of projects to start with. Use <project>@<branch> to "
+            "check out a branch as a worktree of the project clone"
+        ),
+    )
+    start_parser.add_argument(
+        "-m",
+        "--manifest",
+        help=(
+            "file with names of projects to start with, one per line. "
+            'Empty lines and lines starting with "#" are ignored'
+        ),
+    )
+    start_parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of projects cloned concurrently",
+        type=int,
+        default=git.CLONE_JOBS,
+    )
+    start_parser.add_argument(
+        "--open-dir",
+        help=(
+            "open the working directory instead of the first "
+            "started project"
+        ),
+        action="store_true",
     )
     start_parser.add_argument(
         "-s",
         "--source",
-        help="git source including username",
+        help=(
+            "git source including username, or a directory of "
+            "project bundles prefixed with bundle:"
+        ),
         action="extend",
         nargs="+",
         required=user_config.sources is None,
@@ -78,6 +114,39 @@ def _append_start_command(
         help="don't open a project",
         action="store_true",
     )
+    start_parser.add_argument(
+        "--submodules",
+        help="clone submodules recursively",
+        action="store_true",
+    )
+    start_parser.add_argument(
+        "--submodule-jobs",
+        help="number of submodules cloned at once by --submodules",
+        type=int,
+        default=git.SUBMODULE_JOBS,
+    )
+    start_parser.add_argument(
+        "--defer-lfs",
+        help=(
+            "don't download Git LFS files content on clone. It is "
+            "downloaded on a later checkout or by `git lfs pull`"
+        ),
+        action="store_true",
+    )
+    start_parser.add_argument(
+        "--wait",
+        help=(
+            "wait for the whole setup of projects before opening them. "
+            "Otherwise completion of resumable clones history and "
+            "submodules continue in background"
+        ),
+        action="store_true",
+    )
+    start_parser.add_argument(
+        "--restore",
+        help="restore a project from its latest archive made by done",
+        action="store_true",
+    )
 
     return start_parser
 
@@ -108,10 +177,46 @@ def _append_done_command(subparsers, parent):
         ),
         action="store_true",
     )
+    done_parser.add_argument(
+        "--archive",
+        help="archive a project instead of checking it before removal",
+        action="store_true",
+    )
+    done_parser.add_argument(
+        "--archive-mode",
+        help=(
+            f'mode of --archive. "{archive_module.MODE_UNPUSHED}" mode '
+            "archives unpushed refs, stashes, untracked files and "
+            f'uncommitted changes, "{archive_module.MODE_FULL}" mode '
+            "archives the whole tree"
+        ),
+        choices=(
+            archive_module.MODE_UNPUSHED,
+            archive_module.MODE_FULL,
+        ),
+        default=archive_module.MODE_UNPUSHED,
+    )
 
     return done_parser
 
 
+def _append_fetch_args(parser):
+    parser.add_argument(
+        "--fetch",
+        help=(
+            "fetch remotes of projects concurrently before checks, "
+            "so they are made against the actual remote state"
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--fetch-timeout",
+        help="timeout of a single project fetch in seconds",
+        type=float,
+        default=git.FETCH_TIMEOUT,
+    )
+
+
 def _append_config_command(subparsers, parent):
     return subparsers.add_parser(
         "config",
@@ -122,6 +227,31 @@ def _append_config_command(subparsers, parent):
     )
 
 
+def _append_gc_command(subparsers, parent):
+    gc_parser = subparsers.add_parser(
+        "gc",
+        help=(
+            "remove least recently used clean projects until the "
+            "working directory fits a disk budget"
+        ),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        parents=[parent],
+        add_help=False,
+    )
+    gc_parser.add_argument(
+        "--max-size",
+        help="disk budget for projects, e.g. 500M or 50G",
+        type=disk.parse_size,
+        required=True,
+    )
+    gc_parser.add_argument(
+        "--dry-run",
+        help="only show projects that would be removed",
+        action="store_true",
+    )
+    return gc_parser
+
+
 def _append_show_command(subparsers, parent):
     show_parser = subparsers.add_parser(
         "show",
@@ -137,9 +267,161 @@ def _append_show_command(subparsers, parent):
         help="don't check projects status",
         action="store_true",
     )
+    show_parser.add_argument(
+        "--size",
+        help=(
+            "show on-disk size of projects split into objects, "
+            "working tree and untracked/ignored files"
+        ),
+        action="store_true",
+    )
+    show_parser.add_argument(
+        "--sort",
+        help=(
+            "sort projects by a key. Sorting by size implies --size, "
+            "by activity lists the least recently active projects first"
+        ),
+        choices=("name", "size", "activity"),
+        default="name",
+    )
+    show_parser.add_argument(
+        "--stale",
+        help=(
+            "show only projects inactive for a duration, "
+            "e.g. 14d, 2w or 12h"
+        ),
+        type=activity.parse_duration,
+    )
     return show_parser
 
 
+def _append_doctor_command(subparsers, parent):
+    doctor_parser = subparsers.add_parser(
+        "doctor",
+        help="find projects slowing down checks and fix them",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        parents=[parent],
+        add_help=False,
+    )
+    doctor_parser.add_argument(
+        "project",
+        help="projects to diagnose. All projects if not specified",
+        nargs="*",
+    )
+    doctor_parser.add_argument(
+        "--fix",
+        help="fix found issues of all projects concurrently",
+        action="store_true",
+    )
+    doctor_parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of projects diagnosed and fixed at once",
+        type=int,
+        default=git.REPORT_JOBS,
+    )
+    return doctor_parser
+
+
+def _append_maintain_command(subparsers, parent):
+    maintain_parser = subparsers.add_parser(
+        "maintain",
+        help="repack projects and write their commit-graphs concurrently",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        parents=[parent],
+        add_help=False,
+    )
+    maintain_parser.add_argument(
+        "project",
+        help="projects to maintain. All projects if not specified",
+        nargs="*",
+    )
+    maintain_parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of projects maintained at once",
+        type=int,
+        default=maintenance.JOBS,
+    )
+    return maintain_parser
+
+
+def _append_grep_command(subparsers, parent):
+    grep_parser = subparsers.add_parser(
+        "grep",
+        help="search all projects with git grep concurrently",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        parents=[parent],
+        add_help=False,
+    )
+    grep_parser.add_argument("pattern", help="pattern to search for")
+    grep_parser.add_argument(
+        "pathspec",
+        help="search only files matching these git pathspecs",
+        nargs="*",
+    )
+    grep_parser.add_argument(
+        "-p",
+        "--project",
+        help="project to search. All projects if not specified",
+        action="append",
+    )
+    grep_parser.add_argument(
+        "-i",
+        "--ignore-case",
+        help="ignore case differences",
+        action="store_true",
+    )
+    grep_parser.add_argument(
+        "-w",
+        "--word-regexp",
+        help="match the pattern only at word boundaries",
+        action="store_true",
+    )
+    grep_parser.add_argument(
+        "-F",
+        "--fixed-strings",
+        help="treat the pattern as a fixed string",
+        action="store_true",
+    )
+    grep_parser.add_argument(
+        "-l",
+        "--files-with-matches",
+        help="show only names of files with matches",
+        action="store_true",
+    )
+    grep_parser.add_argument(
+        "--limit",
+        help="stop after that many results. No limit if 0",
+        type=int,
+        default=search.LIMIT,
+    )
+    grep_parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of projects searched at once",
+        type=int,
+        default=search.JOBS,
+    )
+    return grep_parser
+
+
+def _append_stats_command(subparsers, parent):
+    stats_parser = subparsers.add_parser(
+        "stats",
+        help="show statistics of logged clones, checks and commands",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        parents=[parent],
+        add_help=False,
+    )
+    stats_parser.add_argument(
+        "--since",
+        help="only operations of the recent duration, e.g. 30d or 2w",
+        type=activity.parse_duration,
+    )
+    return stats_parser
+
+
 def _parse_args(user_config: config_module.UserConfig):
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers(
@@ -157,6 +439,13 @@ def _parse_args(user_config: config_module.UserConfig):
         help="get more information of what's going on",
     )
 
+    archive_dir_arg = ArgParseArgument(
+        positional=("--archive-dir",),
+        keyword={
+            "help": "directory for project archives",
+            "default": user_config.archive_dir,
+        },
+    )
     directory_arg = ArgParseArgument(
         positional=("-d", "--directory"),
         keyword={
@@ -179,18 +468,29 @@ def _parse_args(user_config: config_module.UserConfig):
     done_parser = _append_done_command(subparsers, parent_parser)
     _append_config_command(subparsers, parent_parser)
     show_parser = _append_show_command(subparsers, parent_parser)
+    gc_parser = _append_gc_command(subparsers, parent_parser)
+    doctor_parser = _append_doctor_command(subparsers, parent_parser)
+    maintain_parser = _append_maintain_command(
+        subparsers, parent_parser
+    )
+    grep_parser = _append_grep_command(subparsers, parent_parser)
+    _append_stats_command(subparsers, parent_parser)
+    _append_fetch_args(done_parser)
+    _append_fetch_args(show_parser)
 
     _append_args(
         start_parser,
         [
             directory_arg,
             editor_arg,
+            archive_dir_arg,
         ],
     )
     _append_args(
         done_parser,
         [
             directory_arg,
+            archive_dir_arg,
         ],
     )
     _append_args(
@@ -199,13 +499,58 @@ def _parse_args(user_config: config_module.UserConfig):
             directory_arg,
         ],
     )
+    _append_args(
+        gc_parser,
+        [
+            directory_arg,
+        ],
+    )
+    _append_args(
+        doctor_parser,
+        [
+            directory_arg,
+        ],
+    )
+    _append_args(
+        maintain_parser,
+        [
+            directory_arg,
+        ],
+    )
+    _append_args(
+        grep_parser,
+        [
+            directory_arg,
+        ],
+    )
 
     args = parser.parse_args()
     if hasattr(args, "project") and args.project:
-        args.project = args.project.strip("/ ")
+        if isinstance(args.project, list):
+            args.project = [
+                _strip_project_name(name) for name in args.project
+            ]
+        else:
+            args.project = _strip_project_name(args.project)
     return args
 
 
+def _strip_project_name(name: str) -> str:
+    return name.strip("/ ")
+
+
+def _fetch_projects(
+    workon_dir: git.WorkingDir, args: argparse.Namespace
+) -> None:
+    if not args.fetch:
+        return
+    errors = workon_dir.fetch(
+        getattr(args, "project", None), timeout=args.fetch_timeout
+    )
+    for project, error in errors.items():
+        logging.warning('Failed to fetch "%s": %s', project, error)
+
+
 def _init_logger(verbose):
     level = logging.DEBUG if verbose >= 1 else logging.INFO
     logging.basicConfig(level=level, format="%(message)s")
@@ -218,7 +563,10 @@ def main():
         args = _parse_args(user_config)
         _init_logger(args.verbose)
 
-        FUNC_FOR_COMMAND[args.command](args, user_config)
+        with ssh.multiplexed(), events.timed(
+            "command", name=args.command
+        ):
+            FUNC_FOR_COMMAND[args.command](args, user_config)
     except KeyboardInterrupt:
         logging.info("\nCanceled by user")
         sys.exit(0)
@@ -238,7 +586,7 @@ def handle_start_command(
     user_config: config_module.UserConfig,
 ) -> None:
     """Process start command."""
-    workon_dir = git.WorkingDir(args.directory)
+    workon_dir = git.WorkingDir(args.directory, user_config)
 
     if user_config.sources:
         if args.source:
@@ -246,11 +594,75 @@ def handle_start_command(
         else:
             args.source = user_config.sources
 
-    if args.project not in workon_dir:
-        workon_dir.clone(args.project, args.source)
+    names = list(args.project)
+    if args.manifest:
+        names.extend(_read_manifest(args.manifest))
+    if not names:
+        raise git.CommandError(
+            "No projects to start. Specify them or a manifest file"
+        )
+
+    projects = [git.split_project_name(name) for name in names]
+    missing = list(
+        dict.fromkeys(
+            project
+            for project, _ in projects
+            if project not in workon_dir
+        )
+    )
+    # the editor may be opened while the setup continues in background
+    background = not args.noopen and not args.wait
+    for project in dict.fromkeys(project for project, _ in projects):
+        if project not in missing:
+            workon_dir.resume_setup(project, background)
+
+    if args.restore:
+        for project in missing:
+            workon_dir.restore(project, args.archive_dir, args.source)
+    else:
+        errors = workon_dir.clone_all(
+            missing,
+            args.source,
+            jobs=args.jobs,
+            submodule_jobs=args.submodule_jobs
+            if args.submodules
+            else None,
+            defer_lfs=args.defer_lfs,
+            background=background,
+        )
+        if errors:
+            raise git.CommandError(
+                "\n".join(
+                    f'"{project}": {error}'
+                    for project, error in errors.items()
+                )
+            )
+
+    started = []
+    for project, branch in projects:
+        if branch:
+            project = workon_dir.add_worktree(project, branch)
+        started.append(project)
 
     if not args.noopen:
-        workon_dir.open(args.project, args.editor)
+        workon_dir.open(
+            None if args.open_dir else started[0], args.editor
+        )
+
+
+def _read_manifest(path: str) -> List[str]:
+    try:
+        with open(path, encoding="utf8") as file:
+            lines = [line.strip() for line in file]
+    except OSError as exc:
+        raise git.CommandError(
+            f'Failed to read manifest "{path}": {exc}'
+        ) from exc
+    return [
+        _strip_project_name(line)
+        for line in lines
+        if line and not line.startswith("#")
+    ]
 
 
 # pylint:disable=unused-argument
@@ -259,12 +671,18 @@ def handle_done_command(
     user_config: config_module.UserConfig,
 ) -> None:
     """Process done command."""
-    workon_dir = git.WorkingDir(args.directory)
+    workon_dir = git.WorkingDir(args.directory, user_config)
 
     if args.project:
         args.project = args.project.strip("/ ")
 
-    workon_dir.remove(args.project, args.force)
+    _fetch_projects(workon_dir, args)
+    if args.archive:
+        workon_dir.archive(
+            args.project, args.archive_dir, args.archive_mode
+        )
+    else:
+        workon_dir.remove(args.project, args.force)
 
 
 def handle_config_command(
@@ -274,14 +692,28 @@ def handle_config_command(
     """Process config command."""
     config_module.init_config()
     logging.info(config_module.load_config())
+    logging.info(sources_module.describe())
+
+
+def _build_project_size_text(size: Optional[disk.DiskUsage]) -> str:
+    if size is None:
+        return ""
+    return (
+        f"{disk.format_size(size.total):>8} "
+        f"(objects {disk.format_size(size.objects)}, "
+        f"tree {disk.format_size(size.worktree)}, "
+        f"untracked {disk.format_size(size.untracked)})"
+    )
 
 
 def _build_projects_info_text(
     projects_info: Iterator[git.ProjectInfo],
 ) -> str:
+    projects_info = list(projects_info)
+    width = max((len(info.name) for info in projects_info), default=0)
     return "\n".join(
         termcolor.colored(
-            f"{info.name}",
+            _build_project_text(info, width),
             _COLOR_FOR_STATUS[
                 info.status or git.ProjectStatus.UNDEFINED
             ],
@@ -290,14 +722,269 @@ def _build_projects_info_text(
     )
 
 
+def _build_project_activity_text(active_at: Optional[float]) -> str:
+    age = activity.get_age(active_at)
+    if age is None:
+        return ""
+    if age < 60:
+        return "active now"
+    return f"active {activity.format_age(age)} ago"
+
+
+def _build_project_text(info: git.ProjectInfo, width: int) -> str:
+    details = [
+        text
+        for text in (
+            _build_project_size_text(info.size),
+            _build_project_activity_text(info.active_at),
+        )
+        if text
+    ]
+    text = (
+        f"{info.name:<{width}} {'  '.join(details)}"
+        if details
+        else f"{info.name}"
+    )
+    if info.setup:
+        text += f" [{info.setup}]"
+    return text
+
+
+def _sort_projects_info(
+    projects_info: Iterator[git.ProjectInfo], key: str
+) -> List[git.ProjectInfo]:
+    if key == "size":
+        return sorted(
+            projects_info,
+            key=lambda info: info.size.total if info.size else -1,
+            reverse=True,
+        )
+    if key == "activity":
+        # the least recently active first
+        return sorted(
+            projects_info,
+            key=lambda info: info.active_at or 0,
+        )
+    return sorted(projects_info, key=lambda info: info.name)
+
+
 def handle_show_command(
     args: argparse.Namespace,
     user_config: config_module.UserConfig,
 ) -> None:
     """Process show command."""
-    workon_dir = git.WorkingDir(args.directory)
-    projects_info = workon_dir.show(check_status=not args.nocheck)
-    logging.info(_build_projects_info_text(projects_info))
+    workon_dir = git.WorkingDir(args.directory, user_config)
+    _fetch_projects(workon_dir, args)
+    projects_info = workon_dir.show(
+        check_status=not args.nocheck,
+        size=args.size or args.sort == "size",
+        activity=args.sort == "activity",
+        stale=args.stale,
+    )
+    logging.info(
+        _build_projects_info_text(
+            _sort_projects_info(projects_info, args.sort)
+        )
+    )
+
+
+def handle_gc_command(
+    args: argparse.Namespace,
+    user_config: config_module.UserConfig,
+) -> None:
+    """Process gc command."""
+    workon_dir = git.WorkingDir(args.directory, user_config)
+    removed = workon_dir.gc(args.max_size, dry_run=args.dry_run)
+    for project in removed:
+        logging.info(
+            'Would remove "%s"' if args.dry_run else 'Removed "%s"',
+            project,
+        )
+
+
+def _build_diagnosis_text(
+    project_name: str, diagnosis: doctor.Diagnosis
+) -> str:
+    timings = ", ".join(
+        f"{check} {elapsed:.1f}s"
+        for check, elapsed in sorted(
+            diagnosis.timings.items(),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+    )
+    text = f"{project_name}: {diagnosis.latency:.1f}s ({timings})"
+    for issue in diagnosis.issues:
+        text += f"\n  * {issue.description}"
+        if issue.fix:
+            text += f" (fix: {issue.fix})"
+    return text
+
+
+def handle_doctor_command(
+    args: argparse.Namespace,
+    user_config: config_module.UserConfig,
+) -> None:
+    """Process doctor command."""
+    workon_dir = git.WorkingDir(args.directory, user_config)
+    diagnoses = workon_dir.diagnose(args.project or None, args.jobs)
+    # the slowest projects first
+    for project, diagnosis in sorted(
+        diagnoses.items(),
+        key=lambda item: item[1].latency,
+        reverse=True,
+    ):
+        if diagnosis.issues:
+            logging.info(_build_diagnosis_text(project, diagnosis))
+    if not any(diagnosis.issues for diagnosis in diagnoses.values()):
+        logging.info("No issues found")
+        return
+
+    if args.fix:
+        errors = workon_dir.treat(diagnoses, args.jobs)
+        if errors:
+            raise git.CommandError(
+                "Failed to fix some projects:\n"
+                + "\n".join(
+                    f'"{project}": {error}'
+                    for project, error in errors.items()
+                )
+            )
+
+
+def _build_maintenance_text(
+    project_name: str, result: maintenance.Maintenance
+) -> str:
+    if result.skipped:
+        return f"{project_name}: skipped, {result.skipped}"
+    text = (
+        f"{project_name}: checks {result.before:.2f}s -> "
+        f"{result.after:.2f}s ({result.delta:+.2f}s)"
+    )
+    if result.error:
+        text += f", {result.error}"
+    return text
+
+
+def handle_maintain_command(
+    args: argparse.Namespace,
+    user_config: config_module.UserConfig,
+) -> None:
+    """Process maintain command."""
+    workon_dir = git.WorkingDir(args.directory, user_config)
+    results = workon_dir.maintain(args.project or None, args.jobs)
+    # the most sped up projects first, skipped ones last
+    for project, result in sorted(
+        results.items(),
+        key=lambda item: (
+            item[1].delta is None,
+            item[1].delta or 0,
+            item[0],
+        ),
+    ):
+        logging.info(_build_maintenance_text(project, result))
+    if not results:
+        logging.info("No projects to maintain")
+    errors = {
+        project: result.error
+        for project, result in results.items()
+        if result.error
+    }
+    if errors:
+        raise git.CommandError(
+            "Failed to maintain some projects:\n"
+            + "\n".join(
+                f'"{project}": {error}'
+                for project, error in errors.items()
+            )
+        )
+
+
+def handle_grep_command(
+    args: argparse.Namespace,
+    user_config: config_module.UserConfig,
+) -> None:
+    """Process grep command."""
+    workon_dir = git.WorkingDir(args.directory, user_config)
+    errors: Dict[str, str] = {}
+    found = 0
+    for project, line in workon_dir.grep(
+        search.get_grep_args(
+            args.pattern,
+            args.pathspec,
+            ignore_case=args.ignore_case,
+            word=args.word_regexp,
+            fixed=args.fixed_strings,
+            files=args.files_with_matches,
+        ),
+        args.project,
+        args.jobs,
+        args.limit or None,
+        errors,
+    ):
+        logging.info("%s/%s", project, line)
+        found += 1
+
+    if args.limit and found >= args.limit:
+        logging.info("Stopped at the limit of %d results", args.limit)
+    elif not found and not errors:
+        logging.info("No matches found")
+    if errors:
+        raise git.CommandError(
+            "Failed to search some projects:\n"
+            + "\n".join(
+                f'"{project}": {error}'
+                for project, error in errors.items()
+            )
+        )
+
+
+def _build_timing_text(timing: events.Timing) -> str:
+    return (
+        f"{timing.count} times, p50 {timing.p50:.1f}s, "
+        f"p95 {timing.p95:.1f}s"
+    )
+
+
+def _build_stats_text(stats: events.Stats) -> str:
+    lines = []
+    if stats.clones:
+        lines.append(f"Clones: {_build_timing_text(stats.clones)}")
+    if stats.checks:
+        lines.append(f"Checks: {_build_timing_text(stats.checks)}")
+    if stats.commands:
+        lines.append("Commands:")
+        lines.extend(
+            f"  {name}: {_build_timing_text(timing)}"
+            for name, timing in sorted(stats.commands.items())
+        )
+    if stats.slowest_projects:
+        lines.append("Slowest projects checks:")
+        lines.extend(
+            f"  {project}: {_build_timing_text(timing)}"
+            for project, timing in stats.slowest_projects
+        )
+    if stats.sources:
+        lines.append("Sources:")
+        for source, (successes, failures) in sorted(
+            stats.sources.items()
+        ):
+            total = successes + failures
+            lines.append(
+                f"  {source}: {successes}/{total} clones succeeded "
+                f"({successes / total:.0%})"
+            )
+    return "\n".join(lines) or "No operations logged"
+
+
+def handle_stats_command(
+    args: argparse.Namespace,
+    user_config: config_module.UserConfig,
+) -> None:
+    """Process stats command."""
+    events.flush()
+    since = time.time() - args.since if args.since else None
+    logging.info(_build_stats_text(events.get_stats(since)))
 
 
 # pylint:enable=unused-argument
@@ -308,6 +995,11 @@ FUNC_FOR_COMMAND = {
     "done": handle_done_command,
     "config": handle_config_command,
     "show": handle_show_command,
+    "gc": handle_gc_command,
+    "doctor": handle_doctor_command,
+    "maintain": handle_maintain_command,
+    "grep": handle_grep_command,
+    "stats": handle_stats_command,
 }
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 """Module for dealing with the utility configuration."""
+import fnmatch
 import json
 import logging
 import os
@@ -10,6 +11,10 @@ import appdirs
 _CONFIG_PATH = os.path.join(
     appdirs.user_config_dir("git_workon"), "config.json"
 )
+_CACHE_DIR = appdirs.user_cache_dir("git_workon")
+_ARCHIVE_DIR = os.path.join(
+    appdirs.user_data_dir("git_workon"), "archive"
+)
 _CONFIG_TEMPLATE = {
     "dir": "~/git_workon",
     "editor": "",
@@ -17,10 +22,66 @@ _CONFIG_TEMPLATE = {
 }
 
 
+UNTRACKED_MODES = ("all", "normal", "no")
+PROFILES = ("default", "large")
+
+
 class ConfigError(Exception):
     """Configuration error."""
 
 
+def _validate_project_options(pattern: str, options: dict) -> None:
+    if not isinstance(options, dict):
+        raise ConfigError(
+            f'"projects.{pattern}" parameter should be of object type'
+        )
+    unknown = set(options) - {
+        "untracked",
+        "profile",
+        "sparse",
+        "resumable",
+        "post_clone",
+        "pre_done",
+        "exclude",
+        "share",
+        "upstream",
+    }
+    if unknown:
+        raise ConfigError(
+            f'Unknown "projects.{pattern}" parameters: {sorted(unknown)}'
+        )
+    if options.get("untracked", "normal") not in UNTRACKED_MODES:
+        raise ConfigError(
+            f'"projects.{pattern}.untracked" parameter should be one of '
+            f"{UNTRACKED_MODES}"
+        )
+    if options.get("profile", "default") not in PROFILES:
+        raise ConfigError(
+            f'"projects.{pattern}.profile" parameter should be one of '
+            f"{PROFILES}"
+        )
+    for key in ("resumable", "share"):
+        if not isinstance(options.get(key, False), bool):
+            raise ConfigError(
+                f'"projects.{pattern}.{key}" parameter should be of boolean '
+                "type"
+            )
+    if not isinstance(options.get("upstream", ""), str):
+        raise ConfigError(
+            f'"projects.{pattern}.upstream" parameter should be of string '
+            "type"
+        )
+    for key in ("sparse", "post_clone", "pre_done", "exclude"):
+        values = options.get(key, [])
+        if not isinstance(values, list) or not all(
+            isinstance(value, str) for value in values
+        ):
+            raise ConfigError(
+                f'"projects.{pattern}.{key}" parameter should be an array '
+                "of strings"
+            )
+
+
 @dataclass
 class UserConfig:
     """User configuration."""
@@ -28,6 +89,8 @@ class UserConfig:
     dir: Optional[str]
     editor: Optional[str]
     sources: Optional[list]
+    archive_dir: str = _ARCHIVE_DIR
+    projects: Optional[dict] = None
 
     def __post_init__(self):
         if self.dir and not isinstance(self.dir, str):
@@ -42,6 +105,46 @@ class UserConfig:
             raise ConfigError(
                 '"sources" parameter should be of array type'
             )
+        for source in self.sources or []:
+            if not isinstance(source, (str, list)) or (
+                isinstance(source, list)
+                and not all(
+                    isinstance(mirror, str) for mirror in source
+                )
+            ):
+                raise ConfigError(
+                    '"sources" parameter should be an array of strings '
+                    "and arrays of mirrors"
+                )
+        if not isinstance(self.archive_dir, str):
+            raise ConfigError(
+                '"archive_dir" parameter should be of string type'
+            )
+        self.archive_dir = os.path.expanduser(self.archive_dir)
+        if self.projects and not isinstance(self.projects, dict):
+            raise ConfigError(
+                '"projects" parameter should be of object type'
+            )
+        for pattern, options in (self.projects or {}).items():
+            _validate_project_options(pattern, options)
+
+    def project_options(self, project_name: str) -> dict:
+        """Return options of a project.
+
+        Options of all `projects` patterns matching the project name are
+        merged in the configuration order, so later patterns win.
+        """
+        options: dict = {}
+        for pattern, pattern_options in (self.projects or {}).items():
+            if fnmatch.fnmatchcase(project_name, pattern):
+                options.update(pattern_options)
+        return options
+
+
+def cache_path(name: str) -> str:
+    """Return path of the `name` file under the cache directory."""
+    os.makedirs(_CACHE_DIR, exist_ok=True)
+    return os.path.join(_CACHE_DIR, name)
 
 
 def load_config(path: str = _CONFIG_PATH) -> "UserConfig":
@@ -53,7 +156,11 @@ def load_config(path: str = _CONFIG_PATH) -> "UserConfig":
         config = {}
 
     return UserConfig(
-        config.get("dir"), config.get("editor"), config.get("sources")
+        config.get("dir"),
+        config.get("editor"),
+        config.get("sources"),
+        config.get("archive_dir", _ARCHIVE_DIR),
+        config.get("projects"),
     )
 
 
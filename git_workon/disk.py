@@ -0,0 +1,210 @@
+"""Module for accounting of the disk usage of GIT projects."""
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from . import activity
+from . import config as config_module
+from . import runner
+
+_CACHE_NAME = "sizes.json"
+# cached sizes are rescanned at least that often, as files rewritten in place
+# or changes deep in huge trees may not change the fingerprint
+CACHE_TTL = 24 * 3600
+_GIT_DIR = ".git"
+
+
+@dataclass
+class DiskUsage:
+    """On-disk size of a project in bytes."""
+
+    objects: int
+    worktree: int
+    untracked: int
+
+    @property
+    def total(self) -> int:
+        """Return the total size of a project."""
+        return self.objects + self.worktree + self.untracked
+
+
+def format_size(size: int) -> str:
+    """Return a human-readable size."""
+    value = float(size)
+    for unit in ("B", "K", "M", "G"):
+        if value < 1024:
+            return (
+                f"{value:.0f}{unit}"
+                if unit == "B"
+                else f"{value:.1f}{unit}"
+            )
+        value /= 1024
+    return f"{value:.1f}T"
+
+
+def parse_size(size: str) -> int:
+    """Parse a human-readable size like `50G` into bytes."""
+    number = size.strip().upper()
+    multiplier = 1
+    for power, unit in enumerate("KMGT", start=1):
+        if number.endswith(unit):
+            number, multiplier = number[:-1], 1024**power
+            break
+    try:
+        return int(float(number) * multiplier)
+    except ValueError as exc:
+        raise ValueError(f'Invalid size "{size}"') from exc
+
+
+def _walk(
+    directory: str, skip: Iterable[str] = ()
+) -> Iterator[Tuple[str, int]]:
+    """Yield relative paths and on-disk sizes of files under `directory`."""
+    stack = [""]
+    while stack:
+        relative = stack.pop()
+        try:
+            entries = list(
+                os.scandir(os.path.join(directory, relative))
+            )
+        except OSError:
+            continue
+        for entry in entries:
+            path = os.path.join(relative, entry.name)
+            if path in skip:
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(path)
+                    continue
+                yield path, entry.stat(
+                    follow_symlinks=False
+                ).st_blocks * 512
+            except OSError:
+                continue
+
+
+def _get_tracked_files(directory: str) -> Set[str]:
+    output = runner.run(["ls-files", "-z"], cwd=directory).stdout
+    return set(output.split("\0"))
+
+
+def _scan(directory: str) -> DiskUsage:
+    logging.debug('Scanning disk usage of "%s"', directory)
+    git_dir = os.path.join(directory, _GIT_DIR)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # a worktree `.git` is a file, its objects belong to the main clone
+        objects = executor.submit(
+            lambda: sum(size for _, size in _walk(git_dir))
+        )
+        tracked = executor.submit(_get_tracked_files, directory)
+
+        usage = DiskUsage(objects.result(), 0, 0)
+        tracked_files = tracked.result()
+
+    for path, size in _walk(directory, skip={_GIT_DIR}):
+        if path in tracked_files:
+            usage.worktree += size
+        else:
+            usage.untracked += size
+    return usage
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _fingerprint(directory: str) -> List[float]:
+    """Return a cheap fingerprint of a project tree.
+
+    It changes when the index or packs are changed, and when entries of the
+    working tree are added, removed or written, at any depth, as long as
+    they are within the sample of `activity.sample_worktree`.
+    """
+    return [
+        _mtime(os.path.join(directory, _GIT_DIR, "index")),
+        _mtime(os.path.join(directory, _GIT_DIR, "objects")),
+        _mtime(os.path.join(directory, _GIT_DIR, "objects", "pack")),
+        activity.sample_worktree(directory),
+    ]
+
+
+def _load_cache(path: str) -> dict:
+    try:
+        with open(path, encoding="utf8") as file:
+            return json.load(file)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def _dump_cache(path: str, cache: dict) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf8") as file:
+        json.dump(cache, file)
+    os.replace(tmp_path, path)
+
+
+def get_usage(
+    directories: List[str], jobs: Optional[int] = None
+) -> Dict[str, DiskUsage]:
+    """Return on-disk sizes of project `directories`.
+
+    Sizes are cached and only projects whose fingerprint has changed since
+    the last scan or scanned more than `CACHE_TTL` ago are scanned again,
+    concurrently.
+    """
+    cache_path = config_module.cache_path(_CACHE_NAME)
+    cache = _load_cache(cache_path)
+
+    usage = {}
+    outdated = {}
+    now = time.time()
+    for directory in directories:
+        fingerprint = _fingerprint(directory)
+        cached = cache.get(directory)
+        if (
+            cached
+            and cached["fingerprint"] == fingerprint
+            and now - cached.get("scanned_at", 0) < CACHE_TTL
+        ):
+            usage[directory] = DiskUsage(**cached["usage"])
+        else:
+            outdated[directory] = fingerprint
+
+    if outdated:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for directory, directory_usage in zip(
+                outdated, executor.map(_scan, outdated)
+            ):
+                usage[directory] = directory_usage
+                cache[directory] = {
+                    "fingerprint": outdated[directory],
+                    "usage": asdict(directory_usage),
+                    "scanned_at": now,
+                }
+        _dump_cache(
+            cache_path,
+            {
+                directory: entry
+                for directory, entry in cache.items()
+                if os.path.isdir(directory)
+            },
+        )
+
+    return usage
@@ -0,0 +1,181 @@
+"""Module for diagnosis of GIT projects slowing down checks.
+
+Checks of `show` and `done` are timed per project and the causes of slow
+ones are looked for: missing commit-graph, too many loose objects or packs,
+huge untracked trees, slow remotes and oversized stash lists. Some causes
+have a fix, a GIT command run in the project.
+"""
+import logging
+import os
+import shlex
+import subprocess
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from . import maintenance, runner
+
+# thresholds of `git gc --auto`
+LOOSE_OBJECTS_LIMIT = 6700
+PACKS_LIMIT = 50
+STASHES_LIMIT = 20
+SLOW_UNSTAGED_SECONDS = 1.0
+SLOW_REMOTE_SECONDS = 2.0
+
+
+class DoctorError(Exception):
+    """Failed fix of a project."""
+
+
+@dataclass
+class Issue:
+    """A cause of slow checks of a project.
+
+    `fix` is a GIT command fixing the issue if there is one.
+    """
+
+    kind: str
+    description: str
+    fix: Optional[str] = None
+
+
+@dataclass
+class Diagnosis:
+    """Timings of checks of a project in seconds and found issues."""
+
+    timings: Dict[str, float] = field(default_factory=dict)
+    issues: List[Issue] = field(default_factory=list)
+
+    @property
+    def latency(self) -> float:
+        """Return the total duration of checks."""
+        return sum(self.timings.values())
+
+
+def _get_object_counts(directory: str) -> Dict[str, int]:
+    """Return `git count-objects` numbers by their names."""
+    counts = {}
+    for line in runner.run(
+        ["count-objects", "-v"], cwd=directory, check=True
+    ).stdout.splitlines():
+        name, _, value = line.partition(": ")
+        if value.isdigit():
+            counts[name] = int(value)
+    return counts
+
+
+def _has_commit_graph(directory: str) -> bool:
+    common_dir = os.path.join(
+        directory,
+        runner.run(
+            ["rev-parse", "--git-common-dir"],
+            cwd=directory,
+            check=True,
+        ).stdout.strip(),
+    )
+    info_dir = os.path.join(common_dir, "objects", "info")
+    return os.path.isfile(
+        os.path.join(info_dir, "commit-graph")
+    ) or os.path.isdir(os.path.join(info_dir, "commit-graphs"))
+
+
+def diagnose(
+    directory: str, timings: Dict[str, float], totals: Dict[str, int]
+) -> Diagnosis:
+    """Find causes of slow checks of a GIT project.
+
+    `timings` are durations of checks and `totals` are numbers of unpushed
+    entities found by them, as in `git.ProjectReport`.
+    """
+    diagnosis = Diagnosis(dict(timings))
+    issues = diagnosis.issues
+    try:
+        has_commit_graph = _has_commit_graph(directory)
+        counts = _get_object_counts(directory)
+    except subprocess.CalledProcessError as exc:
+        issues.append(
+            Issue(
+                "git",
+                f"failed to inspect objects: {exc.stderr.strip()}",
+            )
+        )
+        return diagnosis
+
+    if not has_commit_graph:
+        issues.append(
+            Issue(
+                "commit-graph",
+                "no commit-graph, history walks read every commit",
+                "git commit-graph write --reachable --changed-paths",
+            )
+        )
+    if counts.get("count", 0) > LOOSE_OBJECTS_LIMIT:
+        issues.append(
+            Issue(
+                "loose-objects",
+                f"{counts['count']:,} loose objects",
+                # packs loose objects only
+                "git repack -d -l",
+            )
+        )
+    if counts.get("packs", 0) > PACKS_LIMIT:
+        issues.append(
+            Issue(
+                "packs",
+                f"{counts['packs']:,} packs",
+                " ".join(
+                    shlex.quote(arg)
+                    for arg in [
+                        "git",
+                        *maintenance.get_repack_args(directory),
+                    ]
+                ),
+            )
+        )
+    if timings.get("unstaged", 0) > SLOW_UNSTAGED_SECONDS:
+        issues.append(
+            Issue(
+                "untracked",
+                f"unstaged changes check took {timings['unstaged']:.1f}s. "
+                'Huge untracked trees are skipped by "untracked" and '
+                '"exclude" project options',
+            )
+        )
+    if timings.get("tags", 0) > SLOW_REMOTE_SECONDS:
+        issues.append(
+            Issue(
+                "remote",
+                f"remote answered the tags check in {timings['tags']:.1f}s",
+            )
+        )
+    if totals.get("stashes", 0) > STASHES_LIMIT:
+        issues.append(
+            Issue(
+                "stashes",
+                f"{totals['stashes']:,} stashes. Drop the stale ones with "
+                "`git stash drop`",
+            )
+        )
+    return diagnosis
+
+
+def treat(directory: str, issues: List[Issue]) -> List[Issue]:
+    """Run fixes of `issues` of a GIT project.
+
+    :returns: fixed issues
+    :raises: `DoctorError` on the first failed fix
+    """
+    fixed = []
+    for issue in issues:
+        if not issue.fix:
+            continue
+        logging.info('Fixing %s of "%s"', issue.kind, directory)
+        try:
+            runner.run(
+                shlex.split(issue.fix)[1:], cwd=directory, check=True
+            )
+        except subprocess.CalledProcessError as exc:
+            raise DoctorError(
+                f'"{issue.fix}" failed: {exc.stderr.strip()}'
+            ) from exc
+        fixed.append(issue)
+    return fixed
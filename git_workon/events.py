@@ -0,0 +1,222 @@
+"""Module for the log of operations and its statistics.
+
+Every command, clone, project check and GIT call is recorded as a compact
+JSON line with its duration and outcome. Records are buffered and appended
+to a log under the cache directory when the process exits. The log is
+rotated once it grows over `MAX_LOG_SIZE`, keeping `ROTATIONS` old logs.
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import config as config_module
+from . import locks
+
+_LOG_NAME = "events.jsonl"
+MAX_LOG_SIZE = 4 * 1024 * 1024
+ROTATIONS = 3
+# buffered records are flushed once there are that many of them
+_BUFFER_SIZE = 1000
+SLOWEST_PROJECTS = 5
+
+_buffer: List[dict] = []
+_lock = threading.Lock()
+
+
+def record(
+    kind: str, duration: float, ok: bool = True, **fields
+) -> None:
+    """Record an operation of `kind` which took `duration` seconds."""
+    event = {
+        "t": round(time.time(), 3),
+        "kind": kind,
+        "duration": round(duration, 4),
+        "ok": ok,
+        **fields,
+    }
+    with _lock:
+        _buffer.append(event)
+        full = len(_buffer) >= _BUFFER_SIZE
+    if full:
+        flush()
+
+
+@contextmanager
+def timed(kind: str, **fields) -> Iterator[dict]:
+    """Record duration of an operation run in the context.
+
+    The operation fails if the context raises. The yielded dictionary may
+    be updated with more fields of the record.
+    """
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield fields
+        ok = True
+    finally:
+        record(kind, time.perf_counter() - started, ok, **fields)
+
+
+def _get_log_path(rotation: int = 0) -> str:
+    path = config_module.cache_path(_LOG_NAME)
+    return f"{path}.{rotation}" if rotation else path
+
+
+def _rotate() -> None:
+    for rotation in range(ROTATIONS, 0, -1):
+        try:
+            os.replace(
+                _get_log_path(rotation - 1), _get_log_path(rotation)
+            )
+        except FileNotFoundError:
+            pass
+
+
+def flush() -> None:
+    """Append buffered records to the log."""
+    with _lock:
+        events = list(_buffer)
+        _buffer.clear()
+    if not events:
+        return
+    path = _get_log_path()
+    lines = "".join(
+        json.dumps(event, separators=(",", ":")) + "\n"
+        for event in events
+    )
+    try:
+        # serializes rotations and appends of concurrent processes
+        with locks.acquire(f"{path}.lock"):
+            try:
+                if os.path.getsize(path) > MAX_LOG_SIZE:
+                    _rotate()
+            except FileNotFoundError:
+                pass
+            with open(path, "a", encoding="utf8") as file:
+                file.write(lines)
+    except OSError:
+        # the log is best effort, it never breaks commands
+        pass
+
+
+atexit.register(flush)
+
+
+def load() -> List[dict]:
+    """Return all logged records, the oldest first."""
+    events = []
+    for rotation in range(ROTATIONS, -1, -1):
+        try:
+            with open(
+                _get_log_path(rotation), encoding="utf8"
+            ) as file:
+                for line in file:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except OSError:
+            continue
+    return events
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Return the nearest-rank `percent` percentile of `values`."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+@dataclass
+class Timing:
+    """Durations of operations in seconds."""
+
+    count: int
+    p50: float
+    p95: float
+
+    @classmethod
+    def of(cls, durations: List[float]) -> Optional["Timing"]:
+        """Return timing of `durations` if there are any."""
+        if not durations:
+            return None
+        return cls(
+            len(durations),
+            percentile(durations, 50),
+            percentile(durations, 95),
+        )
+
+
+@dataclass
+class Stats:
+    """Statistics of logged operations.
+
+    `slowest_projects` are projects with the highest median check time,
+    `sources` are numbers of successful and failed clones by source.
+    """
+
+    clones: Optional[Timing] = None
+    checks: Optional[Timing] = None
+    commands: Dict[str, Timing] = field(default_factory=dict)
+    slowest_projects: List[Tuple[str, Timing]] = field(
+        default_factory=list
+    )
+    sources: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+
+def get_stats(since: Optional[float] = None) -> Stats:
+    """Return statistics of operations logged after the `since` time."""
+    clones: List[float] = []
+    checks: Dict[str, List[float]] = {}
+    commands: Dict[str, List[float]] = {}
+    sources: Dict[str, List[int]] = {}
+    for event in load():
+        if since and event.get("t", 0) < since:
+            continue
+        kind, duration = event.get("kind"), event.get("duration", 0)
+        if kind == "clone":
+            counts = sources.setdefault(
+                event.get("source", ""), [0, 0]
+            )
+            counts[0 if event.get("ok") else 1] += 1
+            if event.get("ok"):
+                clones.append(duration)
+        elif kind == "check":
+            checks.setdefault(event.get("project", ""), []).append(
+                duration
+            )
+        elif kind == "command":
+            commands.setdefault(event.get("name", ""), []).append(
+                duration
+            )
+
+    project_timings = {
+        project: Timing.of(durations)
+        for project, durations in checks.items()
+    }
+    return Stats(
+        Timing.of(clones),
+        Timing.of(
+            [
+                duration
+                for values in checks.values()
+                for duration in values
+            ]
+        ),
+        {
+            name: Timing.of(values)
+            for name, values in commands.items()
+        },
+        sorted(
+            project_timings.items(),
+            key=lambda item: item[1].p50,
+            reverse=True,
+        )[:SLOWEST_PROJECTS],
+        {source: tuple(counts) for source, counts in sources.items()},
+    )
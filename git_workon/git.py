@@ -1,28 +1,109 @@
 """Module for interaction with GIT."""
+import contextlib
+import functools
 import glob
+import hashlib
+import itertools
 import logging
 import os
+import re
 import shutil
+import signal
 import subprocess
-from dataclasses import dataclass
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Iterator, List, Optional
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from . import activity as activity_module
+from . import archive as archive_module
+from . import config as config_module
+from . import (
+    disk,
+    doctor,
+    events,
+    hooks,
+    locks,
+    maintenance,
+    metadata,
+    pipeline,
+    runner,
+    search,
+    ssh,
+)
+from . import sources as sources_module
 
 
 class GITError(Exception):
     """Any error related with GIT usage."""
 
 
+class NotFoundError(GITError):
+    """A project not found on a reachable source."""
+
+
 class CommandError(Exception):
     """Command error."""
 
 
+WORKTREE_SEPARATOR = "@"
+MAX_SHOWN_LINES = 50
+FETCH_JOBS = 16
+FETCH_JOBS_PER_HOST = 4
+FETCH_TIMEOUT = 60
+SLOW_STATUS_SECONDS = 1.0
+SUBMODULE_JOBS = 8
+CLONE_JOBS = 4
+REPORT_JOBS = 16
+# number of hooks run at once across all processes
+HOOK_JOBS = 4
+# initial number of commits fetched by a resumable clone step
+DEEPEN_STEP = 256
+# hidden directory under the working directory with the `gw` state
+STATE_DIR_NAME = ".git_workon"
+PROFILE_LARGE = "large"
+# prefix of sources with directories of bundle snapshots
+BUNDLE_SOURCE = "bundle:"
+# answers of reachable sources without a project, as opposed to failures
+# to reach them
+_NOT_FOUND_PATTERN = re.compile(
+    r"does not appear to be a git repository"
+    r"|repository '[^']*' (does not exist|not found)"
+    r"|repository not found"
+    r"|project you were looking for could not be found",
+    re.IGNORECASE,
+)
+LARGE_REPO_CONFIG = (
+    ("workon.profile", PROFILE_LARGE),
+    ("core.commitGraph", "true"),
+    ("core.multiPackIndex", "true"),
+    ("fetch.writeCommitGraph", "true"),
+    ("gc.writeCommitGraph", "true"),
+    ("feature.manyFiles", "true"),
+    ("core.untrackedCache", "true"),
+)
+
+
 class ProjectStatus(Enum):
     """GIT project status."""
 
     CLEAN = "clean"
     DIRTY = "dirty"
     UNDEFINED = "undefined"
+    BUSY = "busy"
 
 
 @dataclass
@@ -31,19 +112,31 @@ class ProjectInfo:
 
     name: str
     status: Optional[ProjectStatus]
+    size: Optional[disk.DiskUsage] = None
+    setup: Optional[str] = None
+    active_at: Optional[float] = None
 
 
 def _run_command(
-    command: str, check=False, cwd: str = None
+    command: str,
+    check=False,
+    cwd: str = None,
+    timeout: Optional[float] = None,
+    env: Optional[Dict[str, str]] = None,
+    stdin: Optional[str] = None,
 ) -> subprocess.CompletedProcess:
-    """Run command in subprocess."""
-    logging.debug('Running command "%s"', command)
-    return subprocess.run(
-        command.split(),
+    """Run GIT command line in subprocess, see `runner.run`.
+
+    `env` variables are added to the current environment, `stdin` is the
+    command input.
+    """
+    return runner.run(
+        command.split()[1:],
         cwd=cwd,
-        capture_output=True,
-        text=True,
         check=check,
+        input=stdin,
+        timeout=timeout,
+        env={**os.environ, **env} if env else None,
     )
 
 
@@ -54,238 +147,2428 @@ def is_git_dir(directory: str) -> bool:
     )
 
 
-def _get_stash_info(directory: str):
+def is_worktree(directory: str) -> bool:
+    """Return whether a directory is a linked GIT worktree.
+
+    Linked worktrees have a `.git` file pointing to the main clone instead
+    of a `.git` directory. Submodules have such a file too, but it points
+    to the `modules` directory of their superproject.
+    """
+    path = os.path.join(directory, ".git")
+    if not os.path.isfile(path):
+        return False
+    with open(path, encoding="utf8") as file:
+        gitdir = file.read().strip()
+    return "/worktrees/" in gitdir.replace(os.sep, "/")
+
+
+def split_project_name(name: str) -> Tuple[str, Optional[str]]:
+    """Split `project@branch` name into a project and a branch."""
+    project, _, branch = name.partition(WORKTREE_SEPARATOR)
+    return project, branch or None
+
+
+def get_worktrees(directory: str) -> List[str]:
+    """Return paths of live linked worktrees of the `directory` clone."""
+    output = _run_command(
+        "git worktree list --porcelain", cwd=directory
+    ).stdout
+
+    worktrees = []
+    # the first entry is always the main worktree
+    for entry in output.strip().split("\n\n")[1:]:
+        lines = entry.splitlines()
+        if any(line.startswith("prunable") for line in lines):
+            continue
+        worktrees.append(lines[0][len("worktree ") :])
+    return worktrees
+
+
+def add_worktree(
+    directory: str, destination: str, branch: str
+) -> None:
+    """Add a `branch` worktree of the `directory` clone to `destination`.
+
+    An existing local or remote branch is checked out, otherwise a new
+    branch is created from the current HEAD.
+    """
+    logging.info(
+        'Adding "%s" worktree of "%s" to "%s"',
+        branch,
+        directory,
+        destination,
+    )
+    try:
+        try:
+            _run_command(
+                f"git worktree add {destination} {branch}",
+                cwd=directory,
+                check=True,
+            )
+        except subprocess.CalledProcessError as exc:
+            if "invalid reference" not in exc.stderr:
+                raise
+            _run_command(
+                f"git worktree add -b {branch} {destination}",
+                cwd=directory,
+                check=True,
+            )
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to add "{branch}" worktree:\n{exc.stderr}'
+        ) from exc
+
+
+def remove_worktree(directory: str) -> None:
+    """Remove a linked worktree leaving its branch in the main clone.
+
+    :raises: `GITError` if the worktree could not be removed
+    """
+    try:
+        common_dir = _run_command(
+            "git rev-parse --git-common-dir",
+            cwd=directory,
+            check=True,
+        ).stdout.strip()
+        main_dir = os.path.dirname(
+            os.path.normpath(os.path.join(directory, common_dir))
+        )
+        _run_command(
+            f"git worktree remove --force {directory}",
+            cwd=main_dir,
+            check=True,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to remove "{directory}" worktree:\n{exc.stderr}'
+        ) from exc
+
+
+@dataclass
+class CappedOutput:
+    """Command output lines capped to a limit.
+
+    `total` is the number of all lines read, including the dropped ones.
+    """
+
+    lines: List[str]
+    total: int
+
+    def __bool__(self) -> bool:
+        return self.total > 0
+
+    def describe(self, entity: str) -> str:
+        """Return kept lines and a summary if some lines were dropped."""
+        text = "".join(f"{line}\n" for line in self.lines)
+        if self.total > len(self.lines):
+            text += (
+                f"... {self.total:,} {entity} "
+                f"(first {len(self.lines)} shown)\n"
+            )
+        return text
+
+
+def _stream_command(
+    command: str,
+    cwd: str = None,
+    limit: int = MAX_SHOWN_LINES,
+    stop_after: Optional[int] = None,
+) -> CappedOutput:
+    """Run command in subprocess streaming its output.
+
+    Only first `limit` lines are kept, other ones are just counted. If
+    `stop_after` is set, the command is killed after reading that number
+    of lines.
+
+    :raises: `GITError` if the command failed, `KeyboardInterrupt` if it
+        was killed by SIGINT as `runner.run` does
+    """
+    logging.debug('Streaming command "%s"', command)
+    output = CappedOutput([], 0)
+    # errors go to a file, so a command can't block on a full pipe
+    with events.timed(
+        "git", command=runner.get_subcommand(command.split()[1:])
+    ), tempfile.TemporaryFile() as stderr, subprocess.Popen(
+        command.split(),
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=stderr,
+        text=True,
+    ) as proc:
+        for line in proc.stdout:
+            output.total += 1
+            if len(output.lines) < limit:
+                output.lines.append(line.rstrip("\n"))
+            if stop_after and output.total >= stop_after:
+                proc.kill()
+                return output
+        returncode = proc.wait()
+        if returncode == -signal.SIGINT:
+            raise KeyboardInterrupt
+        if returncode:
+            stderr.seek(0)
+            error = stderr.read().decode(errors="replace").strip()
+            raise GITError(f'Failed to run "{command}": {error}')
+    return output
+
+
+def _get_stash_info(directory: str, **kwargs) -> CappedOutput:
     """Return stash info under `directory`."""
     logging.debug(
         'Checking for unpushed GIT stashes under "%s"', directory
     )
-    return _run_command("git stash list", cwd=directory).stdout
+    return _stream_command("git stash list", cwd=directory, **kwargs)
+
+
+# whether the builtin GIT file system monitor is supported, found once
+_fsmonitor_supported: Optional[bool] = None
+
+
+def _is_fsmonitor_supported(directory: str) -> bool:
+    """Return whether the builtin GIT file system monitor is supported.
+
+    The daemon answers only inside a repository, so it is asked in the
+    `directory` project. The answer is cached for the process unless the
+    project turned out not to be a repository.
+    """
+    global _fsmonitor_supported  # pylint:disable=global-statement
+    if _fsmonitor_supported is None:
+        stderr = _run_command(
+            "git fsmonitor--daemon status", cwd=directory
+        ).stderr
+        if "not a git repository" in stderr:
+            return False
+        _fsmonitor_supported = (
+            "not supported" not in stderr
+            and "not a git command" not in stderr
+        )
+    return _fsmonitor_supported
+
+
+def _get_status_command(
+    directory: str, untracked: str, exclude: Sequence[str] = ()
+) -> str:
+    """Return `git status` command reusing GIT caches where available.
+
+    The untracked cache lets GIT skip untracked directories not changed
+    since the previous status. The untracked cache and the builtin file
+    system monitor are used only if the project has not configured them
+    itself. Paths matching `exclude` pathspecs are not reported.
+    """
+    configured = {
+        line.split()[0]
+        for line in _run_command(
+            r"git config --get-regexp ^core\.(fsmonitor|untrackedcache)$",
+            cwd=directory,
+        ).stdout.splitlines()
+    }
+    options = ""
+    if "core.untrackedcache" not in configured:
+        options += "-c core.untrackedCache=true "
+    if (
+        "core.fsmonitor" not in configured
+        and _is_fsmonitor_supported(directory)
+    ):
+        options += "-c core.fsmonitor=true "
+    command = (
+        f"git {options}status --short --untracked-files={untracked}"
+    )
+    if exclude:
+        command += " -- . " + " ".join(
+            f":(exclude){pattern}" for pattern in exclude
+        )
+    return command
 
 
-def _get_unpushed_branches_info(directory: str) -> str:
-    """Return information about unpushed branches.
+def _get_unstaged_info(
+    directory: str,
+    untracked: str = "normal",
+    exclude: Sequence[str] = (),
+    **kwargs,
+) -> CappedOutput:
+    """Return information about unstaged changes.
 
-    Format is: <commit> (<branch>) <commit_message>
+    `untracked` is the `--untracked-files` mode of `git status`, changes of
+    paths matching `exclude` pathspecs are skipped.
     """
     logging.debug(
-        'Checking for unpushed GIT commits under "%s"', directory
+        'Checking for unstaged changes under "%s"', directory
+    )
+    started = time.monotonic()
+    info = _stream_command(
+        _get_status_command(directory, untracked, exclude),
+        cwd=directory,
+        **kwargs,
     )
-    return _run_command(
-        "git log --branches --not --remotes --decorate --oneline",
+    elapsed = time.monotonic() - started
+    if elapsed > SLOW_STATUS_SECONDS:
+        logging.warning(
+            'Checking unstaged changes of "%s" took %.1fs. Consider '
+            '"untracked" project option to skip untracked files',
+            directory,
+            elapsed,
+        )
+    return info
+
+
+def _get_submodules(directory: str) -> List[str]:
+    """Return paths of initialized submodules of a project."""
+    if not os.path.isfile(os.path.join(directory, ".gitmodules")):
+        return []
+    output = _run_command(
+        r"git config --file .gitmodules --get-regexp ^submodule\..*\.path$",
         cwd=directory,
     ).stdout
+    paths = [
+        os.path.join(directory, line.partition(" ")[2])
+        for line in output.splitlines()
+    ]
+    return [
+        path
+        for path in paths
+        if os.path.exists(os.path.join(path, ".git"))
+    ]
+
+
+@dataclass
+class ProjectReport:
+    """Unpushed entities of a GIT project.
+
+    Every list keeps at most `limit` entries of `get_report`, `totals` has
+    the numbers of all entries found per category. `commits` are
+    "<commit> <message>" lines by branch, `HEAD` for detached commits of
+    worktrees. `errors` are failed checks, `timings` are durations of checks
+    in seconds.
+    """
 
+    path: str
+    stashes: List[str] = field(default_factory=list)
+    commits: Dict[str, List[str]] = field(default_factory=dict)
+    unstaged: List[str] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
+    submodules: Dict[str, "ProjectReport"] = field(
+        default_factory=dict
+    )
+    totals: Dict[str, int] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def clean(self) -> bool:
+        """Return whether everything is pushed and all checks succeeded."""
+        return not (
+            self.stashes
+            or self.commits
+            or self.unstaged
+            or self.tags
+            or self.errors
+        ) and all(report.clean for report in self.submodules.values())
+
+    def describe(self) -> str:
+        """Return unpushed entities and failed checks as text."""
+
+        def _capped(name: str, lines: List[str], entity: str) -> str:
+            total = self.totals.get(name, len(lines))
+            return CappedOutput(lines, total).describe(entity)
+
+        output = ""
+        if self.stashes:
+            output += f"Stashes:\n{_capped('stashes', self.stashes, 'stashes')}"
+        if self.commits:
+            commits = [
+                f"{branch}: {commit}"
+                for branch, lines in self.commits.items()
+                for commit in lines
+            ]
+            output += (
+                "\nCommits:\n"
+                f"{_capped('commits', commits, 'unpushed commits')}"
+            )
+        if self.unstaged:
+            output += (
+                "\nNot staged:\n"
+                f"{_capped('unstaged', self.unstaged, 'unstaged files')}"
+            )
+        if self.tags:
+            output += f"\nTags:\n{_capped('tags', self.tags, 'tags')}"
+        if self.errors:
+            output += "\nErrors:\n" + "".join(
+                f"{error}\n" for error in self.errors
+            )
+        submodules = "".join(
+            f'"{name}":\n{report.describe().strip()}\n'
+            for name, report in self.submodules.items()
+            if not report.clean
+        )
+        if submodules:
+            output += f"\nSubmodules:\n{submodules}"
+        return output
+
+
+def _get_unpushed_commits(
+    directory: str, worktree: bool, **kwargs
+) -> CappedOutput:
+    r"""Return unpushed commits as "<branch>\t<commit> <message>" lines.
 
-def _get_unstaged_info(directory: str) -> str:
-    """Return information about unstaged changes."""
+    Commits of a worktree are the ones reachable only from its HEAD.
+    """
     logging.debug(
-        'Checking for unstaged changes under "%s"', directory
+        'Checking for unpushed GIT commits under "%s"', directory
+    )
+    if worktree:
+        revisions = "HEAD --not --branches --remotes"
+    else:
+        revisions = "--branches --not --remotes"
+    return _stream_command(
+        f"git log {revisions} --source --format=%S%x09%h%x20%s",
+        cwd=directory,
+        **kwargs,
     )
-    return _run_command("git status --short", cwd=directory).stdout
 
 
-def _get_unpushed_tags(directory: str) -> str:
-    """Return unpushed tags.
+def _group_commits(
+    lines: List[str], worktree: bool
+) -> Dict[str, List[str]]:
+    """Return `_get_unpushed_commits` lines as commits by branch."""
+    commits: Dict[str, List[str]] = {}
+    for line in lines:
+        ref, _, commit = line.partition("\t")
+        branch = (
+            "HEAD" if worktree else re.sub("^refs/heads/", "", ref)
+        )
+        commits.setdefault(branch, []).append(commit)
+    return commits
+
 
-    If no tags found, returns an empty string.
-    If failed to get tags information, returns a string containing error
-    description.
+def _get_unpushed_tag_names(directory: str) -> List[str]:
+    """Return names of unpushed tags.
+
+    :raises: `GITError` if failed to get tags information
     """
     logging.debug('Checking for unpushed tags under "%s"', directory)
-
     try:
         info = _run_command(
-            "git push --tags --dry-run", cwd=directory, check=True
+            "git push --tags --dry-run",
+            cwd=directory,
+            check=True,
+            env=ssh.get_env(directory),
         ).stderr
     except subprocess.CalledProcessError as exc:
-        return f"Failed to check unpushed tags: {exc.stderr}"
-
-    if "new tag" not in info:
-        return ""
-    return info
+        raise GITError(
+            f"Failed to check unpushed tags: {exc.stderr.strip()}"
+        ) from exc
+    return [
+        line.split()[-1]
+        for line in info.splitlines()
+        if "[new tag]" in line
+    ]
 
 
-def check_all_pushed(directory: str) -> None:
-    """Check if everything from GIT directory is pushed.
+def get_report(
+    directory: str,
+    untracked: str = "normal",
+    exclude: Sequence[str] = (),
+    limit: int = MAX_SHOWN_LINES,
+    verdict_only: bool = False,
+) -> ProjectReport:
+    """Return a report of unpushed entities of a GIT project.
 
     It checks:
-      * stashes
-      * branches
       * unstaged
+      * commits
+      * stashes
       * tags
+      * submodules, concurrently and recursively
+
+    Stashes, branches and tags of a linked worktree are stored in its main
+    clone and survive the worktree removal, so only unstaged changes and
+    detached commits are checked for worktrees.
 
-    :raises: `GITError` if there is something unpushed. Error message contains
-      information about unpushed entities
+    `untracked` is the mode of untracked files check: "all", "normal" or
+    "no" to skip untracked files. Unstaged changes of paths matching
+    `exclude` pathspecs (e.g. build artifacts) are ignored.
+
+    Only first `limit` entries of every check are kept. If `verdict_only`
+    is set, checks stop on the first unpushed entity found or failed check.
+
+    The report never raises: failed checks are recorded in `errors`. It is
+    safe to call from several threads at once.
     """
-    unstaged = _get_unstaged_info(directory)
-    stashes = _get_stash_info(directory)
-    branches = _get_unpushed_branches_info(directory)
-    tags = _get_unpushed_tags(directory)
+    report = ProjectReport(directory)
+    worktree = is_worktree(directory)
+    kwargs = (
+        {"limit": 1, "stop_after": 1}
+        if verdict_only
+        else {"limit": limit}
+    )
 
-    if any([unstaged, stashes, branches, tags]):
-        output = ""
-        if stashes:
-            output += f"Stashes:\n{stashes}"
-        if branches:
-            output += f"\nCommits:\n{branches}"
-        if unstaged:
-            output += f"\nNot staged:\n{unstaged}"
-        if tags:
-            output += f"\nTags:\n{tags}"
+    def _timed(
+        name: str, get_info: Callable[..., CappedOutput]
+    ) -> List[str]:
+        started = time.monotonic()
+        try:
+            info = get_info(**kwargs)
+        except (GITError, OSError) as exc:
+            report.errors.append(f"{name}: {exc}")
+            return []
+        finally:
+            report.timings[name] = time.monotonic() - started
+        if info:
+            report.totals[name] = info.total
+        return info.lines
+
+    def _get_tags(limit: int, **_) -> CappedOutput:
+        names = _get_unpushed_tag_names(directory)
+        return CappedOutput(names[:limit], len(names))
+
+    checks = [
+        (
+            "unstaged",
+            functools.partial(
+                _get_unstaged_info, directory, untracked, exclude
+            ),
+        ),
+        (
+            "commits",
+            functools.partial(
+                _get_unpushed_commits, directory, worktree
+            ),
+        ),
+    ]
+    if not worktree:
+        checks += [
+            (
+                "stashes",
+                functools.partial(_get_stash_info, directory),
+            ),
+            ("tags", _get_tags),
+        ]
+    for name, get_info in checks:
+        lines = _timed(name, get_info)
+        if name == "commits":
+            report.commits = _group_commits(lines, worktree)
+        else:
+            setattr(report, name, lines)
+        if verdict_only and not report.clean:
+            return report
+
+    started = time.monotonic()
+    submodules = _get_submodules(directory)
+    if submodules:
+        with ThreadPoolExecutor(
+            max_workers=min(SUBMODULE_JOBS, len(submodules))
+        ) as executor:
+            for path, submodule_report in zip(
+                submodules,
+                executor.map(
+                    functools.partial(
+                        get_report,
+                        untracked=untracked,
+                        limit=limit,
+                        verdict_only=verdict_only,
+                    ),
+                    submodules,
+                ),
+            ):
+                report.submodules[
+                    os.path.relpath(path, directory)
+                ] = submodule_report
+    report.timings["submodules"] = time.monotonic() - started
+    return report
+
+
+def check_all_pushed(
+    directory: str,
+    verdict_only: bool = False,
+    untracked: str = "normal",
+    exclude: Sequence[str] = (),
+) -> None:
+    """Check if everything from GIT directory is pushed.
+
+    The project is checked by `get_report` with the same options. Only
+    first `MAX_SHOWN_LINES` lines of every check are kept. If
+    `verdict_only` is set, checks stop on the first unpushed entity found
+    and the error message is not detailed.
+
+    :raises: `GITError` if there is something unpushed or a check failed.
+      Error message contains information about unpushed entities
+    """
+    report = get_report(
+        directory, untracked, exclude, verdict_only=verdict_only
+    )
+    if report.clean:
+        return
+    if verdict_only:
+        raise GITError(f'"{directory}" has unpushed changes')
+    raise GITError(report.describe())
+
+
+def get_reports(
+    directories: Iterable[str],
+    jobs: int = REPORT_JOBS,
+    **kwargs,
+) -> Dict[str, ProjectReport]:
+    """Return reports of GIT projects built by `jobs` threads.
+
+    `kwargs` are passed to `get_report`. It is safe to call from several
+    threads at once.
 
-        raise GITError(output)
+    :returns: reports by directories
+    """
+    directories = list(directories)
+    if not directories:
+        return {}
+    with ThreadPoolExecutor(
+        max_workers=min(jobs, len(directories))
+    ) as executor:
+        return dict(
+            zip(
+                directories,
+                executor.map(
+                    functools.partial(get_report, **kwargs),
+                    directories,
+                ),
+            )
+        )
+
+
+def get_remote_host(url: str) -> str:
+    """Return a host of a GIT remote `url`.
+
+    Local paths and `file://` URLs have the `localhost` host.
+    """
+    if "://" in url:
+        return urllib.parse.urlsplit(url).hostname or "localhost"
+    # scp-like syntax: [user@]host:path
+    match = re.match(r"^(?:[^@/]+@)?([^:/]+):", url)
+    if match:
+        return match.group(1)
+    return "localhost"
+
+
+def _get_remotes(directory: str) -> Dict[str, str]:
+    """Return remote names and URLs of the `directory` clone."""
+    output = _run_command(
+        r"git config --get-regexp ^remote\..*\.url$", cwd=directory
+    ).stdout
+
+    remotes = {}
+    for line in output.splitlines():
+        key, _, url = line.partition(" ")
+        remotes[key[len("remote.") : -len(".url")]] = url
+    return remotes
 
 
-def clone(source: str, destination: str):
-    """Clone a project from GIT `source` to `destination` directory."""
+def fetch(
+    directory: str, remote: str, timeout: Optional[float] = None
+) -> None:
+    """Fetch a `remote` of the `directory` clone.
+
+    :raises: `GITError` if the fetch failed or timed out
+    """
+    logging.debug('Fetching "%s" remote of "%s"', remote, directory)
     try:
-        logging.info('Cloning "%s" to "%s"', source, destination)
-        _run_command(f"git clone {source} {destination}", check=True)
+        _run_command(
+            f"git fetch --prune --quiet {remote}",
+            cwd=directory,
+            check=True,
+            timeout=timeout,
+            env={
+                "GIT_TERMINAL_PROMPT": "0",
+                **ssh.get_env(directory),
+            },
+        )
     except subprocess.CalledProcessError as exc:
         raise GITError(
-            f'Failed to clone "{source}":\n{exc.stderr}'
+            f'Failed to fetch "{remote}": {exc.stderr.strip()}'
+        ) from exc
+    except subprocess.TimeoutExpired as exc:
+        raise GITError(
+            f'Fetching "{remote}" timed out after {timeout}s'
         ) from exc
 
 
-class WorkingDir:
-    """Encapsulates working directory for GIT projects."""
+def fetch_all(
+    directories: List[str],
+    jobs: int = FETCH_JOBS,
+    jobs_per_host: int = FETCH_JOBS_PER_HOST,
+    timeout: Optional[float] = FETCH_TIMEOUT,
+) -> Dict[str, str]:
+    """Fetch all remotes of `directories` clones concurrently.
 
-    def __init__(self, directory: str) -> None:
-        self.directory = os.path.expanduser(directory)
-        self._ensure_directory()
+    No more than `jobs_per_host` fetches run against the same host at once.
 
-    def _ensure_directory(self) -> None:
-        os.makedirs(self.directory, exist_ok=True)
+    :returns: errors of failed fetches by directory
+    """
+    tasks_by_host: Dict[str, List[Tuple[str, str, str]]] = {}
+    for directory in directories:
+        for remote, url in _get_remotes(directory).items():
+            host = get_remote_host(url)
+            tasks_by_host.setdefault(host, []).append(
+                (host, directory, remote)
+            )
 
-    @property
-    def _dirs(self) -> List[str]:
-        return os.listdir(self.directory)
+    semaphores = {
+        host: threading.BoundedSemaphore(jobs_per_host)
+        for host in tasks_by_host
+    }
+    errors: Dict[str, str] = {}
 
-    def remove(
-        self, project_name: str = None, force: bool = False
-    ) -> None:
-        """Remove project from the directory.
+    def _fetch(host: str, directory: str, remote: str) -> None:
+        with semaphores[host]:
+            try:
+                fetch(directory, remote, timeout)
+            except GITError as exc:
+                errors.setdefault(directory, str(exc))
 
-        If `project_name` is not specified, all projects will be removed.
-        """
-        if project_name:
-            if project_name not in self._dirs:
-                raise CommandError(
-                    f'"{project_name}" not found in "{self.directory}"'
-                )
-            self._remove_project(project_name, force)
-        else:
-            self._remove_projects(force)
+    # interleave hosts so that workers are not blocked by a single host
+    tasks = [
+        task
+        for tasks_ in itertools.zip_longest(*tasks_by_host.values())
+        for task in tasks_
+        if task
+    ]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for future in [
+            executor.submit(_fetch, *task) for task in tasks
+        ]:
+            future.result()
 
-    def clone(self, project_name: str, sources: List[str]) -> None:
-        """Clone a project to the working directory."""
-        if project_name in self._dirs:
-            raise CommandError(
-                f'Project "{project_name}" is already cloned'
-            )
+    return errors
 
-        for i, source in enumerate(sources, start=1):
-            try:
-                clone(
-                    os.path.join(
-                        source.strip("/"), f"{project_name}.git"
-                    ),
-                    f"{self.directory}/{project_name}",
-                )
-                break
-            except GITError as exc:
-                if i == len(sources):
-                    raise CommandError(
-                        f'Failed to clone "{project_name}". Tried all configured sources'
-                    ) from exc
-                logging.debug(exc)
 
-    def open(self, project_name: str, editor: str = None) -> None:
-        """Open a project from the directory.
+@functools.lru_cache(maxsize=None)
+def resolve_editor(editor: Optional[str] = None) -> Optional[str]:
+    """Return the first installed editor of `editor`, $EDITOR, vi and vim.
 
-        If editor is not specified, try $EDITOR, vi, vim consequently.
-        """
-        project_dir = os.path.join(self.directory, project_name)
+    The lookup is cached, so it is done once per process.
+    """
+    for candidate in (editor, os.environ.get("EDITOR"), "vi", "vim"):
+        if candidate and shutil.which(candidate):
+            return candidate
+    return None
 
-        if not os.path.isdir(project_dir):
-            raise CommandError(
-                f'No project named "{project_name}" found under the working directory'
-            )
 
-        for editor_ in (
-            editor,
-            os.environ.get("EDITOR"),
-            "vi",
-            "vim",
-        ):
-            if editor_:
-                logging.info(
-                    'Opening "%s" with "%s" editor',
-                    project_dir,
-                    editor_,
-                )
-                result = subprocess.run(
-                    [editor_, project_dir], check=False
-                )
-                if result.returncode == 0:
-                    break
-        else:
-            raise CommandError(
-                f'No suitable editor found to open "{project_dir}"'
-            )
+def clone(
+    source: str,
+    destination: str,
+    sparse: bool = False,
+    submodule_jobs: Optional[int] = None,
+    defer_lfs: bool = False,
+    depth: Optional[int] = None,
+    reference: Optional[str] = None,
+):
+    """Clone a project from GIT `source` to `destination` directory.
 
-    def show(self, check_status: bool) -> Iterator[ProjectInfo]:
-        """Return information about GIT projects."""
-        for project in self._dirs:
-            yield ProjectInfo(
-                project,
-                self._get_project_status(project)
-                if check_status
-                else None,
-            )
+    If `sparse`, only files in the root directory are checked out.
 
-    def _get_project_status(self, project_name: str) -> ProjectStatus:
-        path = os.path.join(self.directory, project_name)
-        if not is_git_dir(path):
-            return ProjectStatus.UNDEFINED
-        try:
-            check_all_pushed(path)
-        except GITError:
-            return ProjectStatus.DIRTY
-        else:
-            return ProjectStatus.CLEAN
+    If `submodule_jobs` is set, submodules are cloned recursively with that
+    many parallel jobs.
 
-    def _remove_projects(self, force: bool = False) -> None:
-        for project in self._dirs:
-            if os.path.isdir(os.path.join(self.directory, project)):
-                try:
-                    self._remove_project(project, force=force)
-                except CommandError as exc:
-                    logging.error(exc)
-                    continue
+    If `defer_lfs`, Git LFS files are checked out as pointers and their
+    content is downloaded only on a later checkout or `git lfs pull`.
 
-    def _remove_project(
-        self, project_name: str, force: bool = False
-    ) -> None:
-        logging.info('Finishing up "%s"', project_name)
-        proj_path = os.path.join(self.directory, project_name)
+    If `depth` is set, a shallow clone of all branches is made.
 
-        if not is_git_dir(proj_path):
-            logging.debug(
-                "Not a GIT repository (%s), skipping", proj_path
+    If `reference` is set, objects of that repository are borrowed through
+    alternates instead of being fetched, see `dissociate`.
+
+    :raises: `NotFoundError` if the source has no such project, `GITError`
+      on other failures, e.g. an unreachable source
+    """
+    options = ""
+    if reference:
+        options += f"--reference-if-able {reference} "
+    if depth:
+        options += f"--depth {depth} --no-single-branch "
+    if sparse:
+        options += "--sparse "
+    if submodule_jobs:
+        options += f"--recurse-submodules --jobs {submodule_jobs} "
+    try:
+        logging.info('Cloning "%s" to "%s"', source, destination)
+        _run_command(
+            f"git clone {options}{source} {destination}",
+            check=True,
+            env={"GIT_LFS_SKIP_SMUDGE": "1"} if defer_lfs else None,
+        )
+    except subprocess.CalledProcessError as exc:
+        error = (
+            NotFoundError
+            if _NOT_FOUND_PATTERN.search(exc.stderr or "")
+            else GITError
+        )
+        raise error(
+            f'Failed to clone "{source}":\n{exc.stderr}'
+        ) from exc
+
+
+def is_partial_clone(directory: str) -> bool:
+    """Return whether a directory has a clone with a checked out HEAD.
+
+    Such a clone may lack history and is completed by `deepen`.
+    """
+    return (
+        os.path.isdir(os.path.join(directory, ".git"))
+        and _run_command(
+            "git rev-parse --verify --quiet HEAD", cwd=directory
+        ).returncode
+        == 0
+    )
+
+
+def _get_packs_size(directory: str) -> int:
+    """Return size of packed objects of a project."""
+    return sum(
+        os.path.getsize(path)
+        for path in glob.glob(
+            os.path.join(
+                directory, ".git", "objects", "pack", "*.pack"
             )
-            return
+        )
+    )
 
-        try:
-            if force or check_all_pushed(proj_path) is None:
-                logging.debug('Removing "%s"', proj_path)
-                shutil.rmtree(proj_path)
-        except GITError as exc:
-            raise CommandError(
-                f"There are some unpushed changes or problems! See below\n\n"
-                f"{exc}\n"
-                f'Push your local changes or use "-f" flag to drop them'
-            ) from exc
+
+def _reset_staging(staging: str, resumable: bool) -> bool:
+    """Remove a staged clone unless it is a partial resumable one.
+
+    :returns: whether the partial clone is kept
+    """
+    partial = resumable and is_partial_clone(staging)
+    if not partial:
+        shutil.rmtree(staging, ignore_errors=True)
+    return partial
+
+
+def _split_sources(
+    sources: List[str], project_name: str
+) -> Tuple[Optional[str], List[str]]:
+    """Return the bundle snapshot of a project and the remote sources."""
+    bundle = find_bundle(
+        [
+            source[len(BUNDLE_SOURCE) :]
+            for source in sources
+            if source.startswith(BUNDLE_SOURCE)
+        ],
+        project_name,
+    )
+    return bundle, [
+        source
+        for source in sources
+        if not source.startswith(BUNDLE_SOURCE)
+    ]
+
+
+def _skip_missing(sources: List[str], project_name: str) -> List[str]:
+    """Return sources without those which recently had no project.
+
+    :raises: `CommandError` if all of the sources had no project
+    """
+    missing = sources_module.get_missing(sources, project_name)
+    if missing and len(missing) == len(sources):
+        raise CommandError(
+            f'Failed to clone "{project_name}". It was not found on any '
+            "configured source during the last "
+            f"{sources_module.MISS_TTL // 60} minutes"
+        )
+    for source in missing:
+        logging.info(
+            'Skipping "%s" which recently had no "%s"',
+            source,
+            project_name,
+        )
+    return [source for source in sources if source not in missing]
+
+
+def _get_clone_error(project_name: str, partial: bool) -> str:
+    return (
+        f'Failed to clone "{project_name}". Tried all configured sources'
+        + (
+            ". The partial clone is kept and will be resumed by the next start"
+            if partial
+            else ""
+        )
+    )
+
+
+def _catch_up_seeded(
+    project_name: str,
+    staging: str,
+    url: str,
+    defer_lfs: bool = False,
+    submodule_jobs: Optional[int] = None,
+) -> None:
+    """Fetch the delta of a clone seeded from a snapshot from `url`."""
+    logging.info('Fetching "%s" delta from "%s"', project_name, url)
+    set_remote_url(staging, url)
+    catch_up(staging, defer_lfs)
+    if submodule_jobs:
+        update_submodules(staging, submodule_jobs)
+
+
+def _resume_staged(project_name: str, staging: str, url: str) -> None:
+    """Resume a partial clone of a project from `url`."""
+    logging.info(
+        'Resuming clone of "%s" from "%s"', project_name, url
+    )
+    set_remote_url(staging, url)
+
+
+def _get_clone_kwargs(
+    options: dict,
+    resumable: bool,
+    submodule_jobs: Optional[int],
+    defer_lfs: bool,
+) -> dict:
+    """Return `clone` arguments of a project with `options`."""
+    kwargs: dict = {"depth": 1} if resumable else {}
+    if options.get("sparse"):
+        kwargs["sparse"] = True
+    if submodule_jobs:
+        kwargs["submodule_jobs"] = submodule_jobs
+    if defer_lfs:
+        kwargs["defer_lfs"] = True
+    return kwargs
+
+
+def _record_clone(
+    project_name: str,
+    source: str,
+    started: float,
+    staging: Optional[str] = None,
+    exc: Optional[GITError] = None,
+) -> None:
+    """Record statistics of a clone attempt from a source.
+
+    The attempt failed if `exc` is given, otherwise `staging` is the clone.
+    """
+    elapsed = time.monotonic() - started
+    if isinstance(exc, NotFoundError):
+        # sources may host different projects, so a missing project is not
+        # a failure of the source
+        sources_module.record_miss(source, project_name)
+    else:
+        sources_module.record(source, exc is None, elapsed)
+    if exc is None:
+        events.record(
+            "clone",
+            elapsed,
+            project=project_name,
+            source=source,
+            size=_get_packs_size(staging),
+        )
+    else:
+        events.record(
+            "clone",
+            elapsed,
+            ok=False,
+            project=project_name,
+            source=source,
+        )
+
+
+def is_shallow(directory: str) -> bool:
+    """Return whether a project is a shallow clone."""
+    return os.path.exists(os.path.join(directory, ".git", "shallow"))
+
+
+def update_submodules(directory: str, jobs: int) -> None:
+    """Clone and check out submodules recursively using parallel `jobs`."""
+    try:
+        _run_command(
+            f"git submodule update --init --recursive --jobs {jobs}",
+            check=True,
+            cwd=directory,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to update submodules of "{directory}":\n{exc.stderr}'
+        ) from exc
+
+
+def set_remote_url(directory: str, url: str) -> None:
+    """Set URL of the origin remote of a project."""
+    try:
+        _run_command(
+            f"git remote set-url origin {url}",
+            check=True,
+            cwd=directory,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to set origin of "{directory}":\n{exc.stderr}'
+        ) from exc
+
+
+def get_alternates(directory: str) -> List[str]:
+    """Return object directories a project borrows objects from."""
+    try:
+        with open(
+            os.path.join(
+                directory, ".git", "objects", "info", "alternates"
+            ),
+            encoding="utf8",
+        ) as file:
+            return [
+                os.path.normpath(
+                    os.path.join(directory, ".git", "objects", line)
+                )
+                for line in file.read().splitlines()
+                if line and not line.startswith("#")
+            ]
+    except OSError:
+        return []
+
+
+def dissociate(directory: str) -> None:
+    """Copy borrowed objects into a project and stop borrowing them.
+
+    Done before a project lending objects is removed, so its borrowers
+    stay intact.
+    """
+    logging.info('Copying borrowed objects into "%s"', directory)
+    try:
+        _run_command("git repack -a -d -q", check=True, cwd=directory)
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to copy borrowed objects into "{directory}":\n'
+            f"{exc.stderr}"
+        ) from exc
+    os.remove(
+        os.path.join(
+            directory, ".git", "objects", "info", "alternates"
+        )
+    )
+
+
+def has_objects(directory: str, objects: List[str]) -> bool:
+    """Return whether a project has any of `objects`."""
+    output = _run_command(
+        "git cat-file --batch-check",
+        cwd=directory,
+        stdin="".join(f"{name}\n" for name in objects),
+    ).stdout
+    return any(
+        not line.endswith(" missing") for line in output.splitlines()
+    )
+
+
+def get_remote_tips(url: str) -> List[str]:
+    """Return commits of all refs of a remote repository.
+
+    :raises: `GITError` if the remote is unreachable
+    """
+    try:
+        output = _run_command(
+            f"git ls-remote {url}",
+            check=True,
+            env={"GIT_TERMINAL_PROMPT": "0"},
+        ).stdout
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to list refs of "{url}":\n{exc.stderr}'
+        ) from exc
+    return sorted({line.split()[0] for line in output.splitlines()})
+
+
+def update_pool(pool: str, url: str) -> None:
+    """Create or update a shared object pool of an upstream `url`.
+
+    A pool is a bare mirror never pruned or garbage collected, so objects
+    borrowed from it never disappear.
+    """
+    try:
+        if os.path.isdir(pool):
+            logging.info('Updating object pool of "%s"', url)
+            _run_command(
+                "git fetch --quiet origin", check=True, cwd=pool
+            )
+        else:
+            logging.info('Creating object pool of "%s"', url)
+            _run_command(
+                f"git clone --mirror --quiet {url} {pool}", check=True
+            )
+            _run_command("git config gc.auto 0", check=True, cwd=pool)
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to update object pool of "{url}":\n{exc.stderr}'
+        ) from exc
+
+
+def protect_lender(directory: str) -> None:
+    """Keep unreachable objects of a project lending objects to others.
+
+    Borrowers may still need objects unreachable in the lender.
+    """
+    _run_command("git config gc.pruneExpire never", cwd=directory)
+
+
+def find_bundle(
+    bundle_dirs: List[str], project_name: str
+) -> Optional[str]:
+    """Return path of the first `<project>.bundle` under `bundle_dirs`."""
+    for bundle_dir in bundle_dirs:
+        path = os.path.join(
+            os.path.expanduser(bundle_dir), f"{project_name}.bundle"
+        )
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def catch_up(directory: str, defer_lfs: bool = False) -> None:
+    """Update a clone seeded from a bundle from its origin remote.
+
+    Only objects missing from the seed are fetched, then the checked out
+    branch is fast-forwarded.
+    """
+    fetch(directory, "origin")
+    try:
+        _run_command(
+            "git merge --ff-only --quiet @{upstream}",
+            check=True,
+            cwd=directory,
+            env={"GIT_LFS_SKIP_SMUDGE": "1"} if defer_lfs else None,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to update "{directory}" from origin:\n{exc.stderr}'
+        ) from exc
+
+
+def deepen(directory: str, step: int = DEEPEN_STEP) -> None:
+    """Complete history of a shallow clone step by step.
+
+    Every step is a separate fetch of up to `step` commits more than the
+    previous one, so an interrupted deepening loses only its last step.
+    Tags are fetched once the history is complete.
+    """
+    try:
+        while is_shallow(directory):
+            logging.info(
+                'Deepening history of "%s" by %d commits',
+                directory,
+                step,
+            )
+            _run_command(
+                f"git fetch --deepen {step} origin",
+                check=True,
+                cwd=directory,
+            )
+            step *= 2
+        _run_command(
+            "git fetch --tags origin",
+            check=True,
+            cwd=directory,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to fetch history of "{directory}":\n{exc.stderr}'
+        ) from exc
+
+
+def set_sparse_checkout(directory: str, patterns: List[str]) -> None:
+    """Check out only `patterns` directories of a project."""
+    try:
+        _run_command(
+            f"git sparse-checkout set --cone {' '.join(patterns)}",
+            check=True,
+            cwd=directory,
+        )
+    except subprocess.CalledProcessError as exc:
+        raise GITError(
+            f'Failed to set sparse checkout of "{directory}":\n{exc.stderr}'
+        ) from exc
+
+
+def setup_large_repo(directory: str) -> None:
+    """Set a project up to keep GIT operations on it fast.
+
+    Writes the commit-graph and the multi-pack-index, enables the untracked
+    cache and registers the project for GIT background maintenance. The
+    registration disables automatic gc of the project, which is enabled back
+    as nothing guarantees a scheduler runs the maintenance. Failed optional
+    steps are logged only.
+    """
+    logging.info('Setting "%s" up as a large repository', directory)
+    for key, value in LARGE_REPO_CONFIG:
+        _run_command(f"git config {key} {value}", cwd=directory)
+
+    for command in (
+        "git commit-graph write --reachable --changed-paths",
+        "git multi-pack-index write",
+        "git maintenance register",
+    ):
+        result = _run_command(command, cwd=directory)
+        if result.returncode:
+            logging.warning(
+                'Command "%s" failed in "%s": %s',
+                command,
+                directory,
+                result.stderr.strip(),
+            )
+    _run_command("git config --unset maintenance.auto", cwd=directory)
+
+
+def _unregister_large_repo(directory: str) -> None:
+    """Undo the global part of `setup_large_repo` before removal."""
+    if (
+        _run_command(
+            "git config --get workon.profile", cwd=directory
+        ).stdout.strip()
+        == PROFILE_LARGE
+    ):
+        _run_command("git maintenance unregister", cwd=directory)
+
+
+class WorkingDir:
+    """Encapsulates working directory for GIT projects."""
+
+    def __init__(
+        self,
+        directory: str,
+        user_config: Optional[config_module.UserConfig] = None,
+    ) -> None:
+        self.directory = os.path.expanduser(directory)
+        self._user_config = user_config
+        # set once concurrent clones are interrupted
+        self._cancelled = threading.Event()
+        self._ensure_directory()
+
+    def _get_project_options(self, project_name: str) -> dict:
+        if self._user_config is None:
+            return {}
+        project, _ = split_project_name(project_name)
+        return self._user_config.project_options(project)
+
+    def _check_project(
+        self, project_name: str, verdict_only: bool = False
+    ) -> None:
+        """Check a project with `check_all_pushed` logging the check time."""
+        with events.timed(
+            "check", project=project_name, verdict_only=verdict_only
+        ):
+            check_all_pushed(
+                os.path.join(self.directory, project_name),
+                verdict_only=verdict_only,
+                **self._get_check_options(project_name),
+            )
+
+    def _get_check_options(self, project_name: str) -> dict:
+        """Return `check_all_pushed` options of a project."""
+        options = self._get_project_options(project_name)
+        return {
+            "untracked": options.get("untracked", "normal"),
+            "exclude": options.get("exclude", []),
+        }
+
+    def _ensure_directory(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def _dirs(self) -> List[str]:
+        return [
+            name
+            for name in os.listdir(self.directory)
+            if name != STATE_DIR_NAME
+        ]
+
+    def _get_state_path(self, kind: str, name: str) -> str:
+        """Return path of the `name` entry of the `kind` state directory."""
+        directory = os.path.join(self.directory, STATE_DIR_NAME, kind)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    def _lock(self, project_name: str, **kwargs):
+        """Return a cross-process lock of a project.
+
+        See `locks.acquire` for `kwargs`.
+        """
+        return locks.acquire(
+            self._get_state_path("locks", f"{project_name}.lock"),
+            **kwargs,
+        )
+
+    def remove(
+        self, project_name: str = None, force: bool = False
+    ) -> None:
+        """Remove project from the directory.
+
+        If `project_name` is not specified, all projects will be removed.
+        """
+        if project_name:
+            project_name = self._get_dir_name(project_name)
+            if project_name not in self._dirs:
+                raise CommandError(
+                    f'"{project_name}" not found in "{self.directory}"'
+                )
+            self._remove_project(project_name, force=force)
+        else:
+            self._remove_projects(force)
+
+    def clone(
+        self,
+        project_name: str,
+        sources: sources_module.Sources,
+        submodule_jobs: Optional[int] = None,
+        defer_lfs: bool = False,
+        background: bool = False,
+    ) -> None:
+        """Clone a project to the working directory.
+
+        Sources are tried in the given order, mirrors grouped in nested
+        lists in order of their expected time to a successful clone based on
+        the recorded statistics, see `sources.order`.
+
+        The clone is set up according to the project options: the "large"
+        `profile` and `sparse` checkout directories.
+
+        See `clone` function for `submodule_jobs` and `defer_lfs`.
+
+        The project is locked while cloned. It is cloned into the staging
+        area and moved into the working directory once complete, so an
+        interrupted clone never looks like a project.
+
+        If `background` is set, the project is moved into the working
+        directory once checked out. Completion of its history and cloning
+        of submodules are left to the background setup, see `setup`.
+        """
+        with self._lock(project_name):
+            if project_name in self._dirs:
+                raise CommandError(
+                    f'Project "{project_name}" is already cloned'
+                )
+            staging = self._clone_staged(
+                project_name,
+                sources,
+                None if background else submodule_jobs,
+                defer_lfs,
+                complete=not background,
+            )
+            self._commit_staged(project_name, staging)
+
+            steps = []
+            if is_shallow(os.path.join(self.directory, project_name)):
+                steps.append(pipeline.STEP_DEEPEN)
+            if background and submodule_jobs:
+                steps.append(pipeline.STEP_SUBMODULES)
+            if self._get_project_options(project_name).get(
+                "post_clone"
+            ):
+                steps.append(pipeline.STEP_HOOKS)
+            if not steps:
+                return
+            status = pipeline.Status(steps, submodule_jobs)
+            if background:
+                self._start_setup(project_name, status)
+            else:
+                self._run_setup(project_name, status)
+
+    def _clone_staged(
+        self,
+        project_name: str,
+        sources: sources_module.Sources,
+        submodule_jobs: Optional[int] = None,
+        defer_lfs: bool = False,
+        complete: bool = True,
+    ) -> str:
+        """Clone a project into the staging area.
+
+        Resumable clones start shallow and are deepened step by step. Their
+        partial state is kept in the staging area on failures and
+        interruptions, so the next clone resumes it fetching only missing
+        objects, from any of `sources`. If not `complete`, resumable clones
+        are left shallow.
+
+        `sources` prefixed with `BUNDLE_SOURCE` are directories of
+        `<project>.bundle` snapshots. A clone is seeded from the snapshot of
+        the project if there is one and only the delta is fetched from
+        other sources. If all of them fail, the clone is left at the
+        snapshot.
+
+        Sources which recently had no such project are skipped, and the
+        clone fails at once if all of them had none, see
+        `sources.get_missing`.
+
+        :returns: path to the staged clone
+        """
+        staging = self._get_state_path("staging", project_name)
+        options = self._get_project_options(project_name)
+        resumable = options.get(
+            "resumable", options.get("profile") == PROFILE_LARGE
+        )
+        partial = _reset_staging(staging, resumable)
+        snapshot, sources = _split_sources(
+            sources_module.order(sources), project_name
+        )
+        # the snapshot the clone is seeded from
+        snapshot = (
+            None
+            if partial
+            else self._seed(staging, snapshot, options, defer_lfs)
+        )
+        if not partial and not snapshot:
+            sources = _skip_missing(sources, project_name)
+
+        error = None
+        for source in sources:
+            started = time.monotonic()
+            try:
+                self._raise_if_cancelled()
+                # a failed clone may leave a partial one to resume
+                self._get_source_fetcher(
+                    project_name,
+                    staging,
+                    bool(snapshot),
+                    partial,
+                    **_get_clone_kwargs(
+                        options, resumable, submodule_jobs, defer_lfs
+                    ),
+                )(
+                    os.path.join(
+                        source.strip("/"), f"{project_name}.git"
+                    )
+                )
+                if resumable and complete:
+                    deepen(staging)
+            except GITError as exc:
+                # the clone might be killed by the interrupt
+                self._raise_if_cancelled(exc)
+                _record_clone(project_name, source, started, exc=exc)
+                logging.debug(exc)
+                error = exc
+                if not snapshot:
+                    partial = _reset_staging(staging, resumable)
+                continue
+            except KeyboardInterrupt:
+                if resumable and is_partial_clone(staging):
+                    logging.info(
+                        'The partial clone of "%s" is kept and will be '
+                        "resumed by the next start",
+                        project_name,
+                    )
+                raise
+            _record_clone(project_name, source, started, staging)
+            break
+        else:
+            if not snapshot:
+                raise CommandError(
+                    _get_clone_error(project_name, partial)
+                ) from error
+            if sources:
+                logging.warning(
+                    'Failed to fetch "%s" from all configured sources, '
+                    'it is left at the "%s" snapshot',
+                    project_name,
+                    snapshot,
+                )
+
+        if options.get("sparse"):
+            try:
+                set_sparse_checkout(staging, options["sparse"])
+            except GITError as exc:
+                shutil.rmtree(staging)
+                raise CommandError(exc) from exc
+        return staging
+
+    def _get_pool(self, upstream: str) -> Optional[str]:
+        """Return the shared object pool of an `upstream` repository.
+
+        The pool is created or updated first. Pools are kept under the state
+        directory and are never removed by `done`.
+        """
+        name = hashlib.sha1(upstream.encode()).hexdigest()[:16]
+        pool = self._get_state_path("pools", f"{name}.git")
+        with self._lock(f"pool-{name}"):
+            try:
+                update_pool(pool, upstream)
+            except GITError as exc:
+                logging.warning(exc)
+                if not os.path.isdir(pool):
+                    return None
+        return pool
+
+    def _raise_if_cancelled(
+        self, exc: Optional[GITError] = None
+    ) -> None:
+        """Raise `KeyboardInterrupt` if concurrent clones are interrupted."""
+        if self._cancelled.is_set():
+            raise KeyboardInterrupt from exc
+
+    def _get_source_fetcher(
+        self,
+        project_name: str,
+        staging: str,
+        seeded: bool,
+        partial: bool,
+        **kwargs,
+    ) -> Callable[[str], None]:
+        """Return a function fetching a staged project from a source URL.
+
+        Seeded clones fetch the delta from the snapshot, partial clones are
+        resumed and others are cloned from scratch with `kwargs` of `clone`.
+        """
+        if seeded:
+            return functools.partial(
+                _catch_up_seeded,
+                project_name,
+                staging,
+                defer_lfs=kwargs.get("defer_lfs", False),
+                submodule_jobs=kwargs.get("submodule_jobs"),
+            )
+        if partial:
+            return functools.partial(
+                _resume_staged, project_name, staging
+            )
+        return functools.partial(
+            self._clone_fresh, project_name, staging, **kwargs
+        )
+
+    def _clone_fresh(
+        self, project_name: str, staging: str, url: str, **kwargs
+    ) -> None:
+        """Clone a project into the staging area from scratch.
+
+        The clone borrows objects of the `upstream` pool of the project or,
+        if the `share` option is set, of a clone sharing history. `kwargs`
+        are passed to `clone`.
+        """
+        options = self._get_project_options(project_name)
+        pool = (
+            self._get_pool(options["upstream"])
+            if options.get("upstream")
+            else None
+        )
+        reference = pool
+        if not reference and options.get("share"):
+            reference = self._find_shared_clone(project_name, url)
+        if reference:
+            kwargs["reference"] = reference
+        clone(url, staging, **kwargs)
+        if reference and reference != pool:
+            protect_lender(reference)
+
+    def _find_shared_clone(
+        self, project_name: str, url: str
+    ) -> Optional[str]:
+        """Return a clone sharing history with the `url` repository.
+
+        A clone shares history if it has any of the commits of the remote
+        refs.
+        """
+        try:
+            tips = get_remote_tips(url)
+        except GITError as exc:
+            logging.debug(exc)
+            return None
+        for name in self._dirs:
+            path = os.path.join(self.directory, name)
+            if name == project_name or not os.path.isdir(
+                os.path.join(path, ".git")
+            ):
+                continue
+            if tips and has_objects(path, tips):
+                logging.info(
+                    'Borrowing objects of "%s" from "%s"',
+                    project_name,
+                    name,
+                )
+                return path
+        return None
+
+    def _dissociate_borrowers(self, project_name: str) -> None:
+        """Make projects borrowing objects of a project self-contained."""
+        objects = os.path.realpath(
+            os.path.join(
+                self.directory, project_name, ".git", "objects"
+            )
+        )
+        for name in self._dirs:
+            path = os.path.join(self.directory, name)
+            if name == project_name or objects not in [
+                os.path.realpath(alternate)
+                for alternate in get_alternates(path)
+            ]:
+                continue
+            with self._lock(name):
+                try:
+                    dissociate(path)
+                except GITError as exc:
+                    raise CommandError(
+                        f'"{name}" borrows objects of "{project_name}": '
+                        f"{exc}"
+                    ) from exc
+
+    @staticmethod
+    def _seed(
+        staging: str,
+        bundle: Optional[str],
+        options: dict,
+        defer_lfs: bool,
+    ) -> Optional[str]:
+        """Clone a project from a bundle snapshot into the staging area.
+
+        :returns: the `bundle` if the clone succeeded
+        """
+        if bundle is None:
+            return None
+        try:
+            clone(
+                bundle,
+                staging,
+                sparse=bool(options.get("sparse")),
+                defer_lfs=defer_lfs,
+            )
+        except GITError as exc:
+            logging.warning(
+                'Failed to seed a clone from "%s": %s', bundle, exc
+            )
+            shutil.rmtree(staging, ignore_errors=True)
+            return None
+        return bundle
+
+    def _commit_staged(self, project_name: str, staging: str) -> None:
+        """Move a staged project into the working directory."""
+        path = os.path.join(self.directory, project_name)
+        try:
+            os.rename(staging, path)
+        except OSError as exc:
+            raise CommandError(
+                f'Failed to move "{project_name}" into place: {exc}'
+            ) from exc
+        metadata.record_clone(path)
+        if (
+            self._get_project_options(project_name).get("profile")
+            == PROFILE_LARGE
+        ):
+            setup_large_repo(path)
+
+    def _get_status_path(self, project_name: str) -> str:
+        return self._get_state_path("status", f"{project_name}.json")
+
+    def _start_setup(
+        self, project_name: str, status: pipeline.Status
+    ) -> None:
+        """Start setup steps of a project in the background."""
+        status.current = status.pending[0]
+        status.pid = pipeline.spawn(
+            self.directory,
+            project_name,
+            status.pending,
+            self._get_state_path("logs", f"{project_name}.log"),
+            status.submodule_jobs,
+        )
+        pipeline.save_status(
+            self._get_status_path(project_name), status
+        )
+
+    def setup(
+        self,
+        project_name: str,
+        steps: List[str],
+        submodule_jobs: Optional[int] = None,
+    ) -> None:
+        """Run setup steps of a project in the foreground.
+
+        Progress of the steps is recorded, so it is shown by `show`, and
+        failed or interrupted steps can be resumed by `resume_setup`.
+        """
+        with self._lock(project_name):
+            self._run_setup(
+                project_name,
+                pipeline.Status(list(steps), submodule_jobs),
+            )
+
+    def _run_setup(
+        self, project_name: str, status: pipeline.Status
+    ) -> None:
+        path = os.path.join(self.directory, project_name)
+        status_path = self._get_status_path(project_name)
+
+        def _on_progress(detail: str) -> None:
+            status.detail = detail
+            pipeline.save_status(status_path, status)
+
+        for step in status.pending:
+            status.current, status.detail = step, None
+            pipeline.save_status(status_path, status)
+            logging.info('Running "%s" setup of "%s"', step, path)
+            try:
+                if step == pipeline.STEP_DEEPEN:
+                    deepen(path)
+                elif step == pipeline.STEP_SUBMODULES:
+                    update_submodules(
+                        path, status.submodule_jobs or SUBMODULE_JOBS
+                    )
+                elif step == pipeline.STEP_HOOKS:
+                    self._run_hooks(
+                        project_name, "post_clone", _on_progress
+                    )
+            except (GITError, hooks.HookError) as exc:
+                status.error = str(exc)
+                pipeline.save_status(status_path, status)
+                raise CommandError(
+                    f'Setup of "{project_name}" failed at {step}: {exc}'
+                ) from exc
+            status.done.append(step)
+        os.remove(status_path)
+
+    def _run_hooks(
+        self,
+        project_name: str,
+        kind: str,
+        on_progress: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        """Run `kind` hooks of a project configured in its options."""
+        commands = self._get_project_options(project_name).get(kind)
+        if not commands:
+            return
+        hooks.run(
+            os.path.join(self.directory, project_name),
+            commands,
+            self._get_state_path("logs", f"{project_name}.log"),
+            [
+                self._get_state_path("locks", f"hooks-{i}.lock")
+                for i in range(HOOK_JOBS)
+            ],
+            on_progress,
+        )
+
+    def get_setup_status(
+        self, project_name: str
+    ) -> Optional[pipeline.Status]:
+        """Return status of an unfinished setup of a project."""
+        return pipeline.load_status(
+            self._get_status_path(project_name)
+        )
+
+    def resume_setup(
+        self, project_name: str, background: bool = False
+    ) -> None:
+        """Resume failed or interrupted setup steps of a project."""
+        status = self.get_setup_status(project_name)
+        if not status or status.running:
+            return
+        logging.info(
+            'Resuming setup of "%s": %s',
+            project_name,
+            ", ".join(status.pending),
+        )
+        if background:
+            status.error = None
+            self._start_setup(project_name, status)
+        else:
+            self.setup(
+                project_name, status.pending, status.submodule_jobs
+            )
+
+    def clone_all(
+        self,
+        project_names: List[str],
+        sources: sources_module.Sources,
+        jobs: int = CLONE_JOBS,
+        **kwargs,
+    ) -> Dict[str, str]:
+        """Clone projects concurrently using at most `jobs` threads.
+
+        Every project tries all `sources` on its own. See `clone` method for
+        `kwargs`. On interrupt, clones stop before their next source and
+        the interrupt is re-raised.
+
+        :returns: errors of failed clones by project names
+        """
+        errors = {}
+
+        def _clone(project_name: str) -> None:
+            if self._cancelled.is_set():
+                return
+            try:
+                self.clone(project_name, sources, **kwargs)
+            except CommandError as exc:
+                # might be cloned by a concurrent process meanwhile, but
+                # not with its setup failed
+                if project_name not in self or self.get_setup_status(
+                    project_name
+                ):
+                    errors[project_name] = str(exc)
+
+        if project_names:
+            with ThreadPoolExecutor(
+                max_workers=min(jobs, len(project_names))
+            ) as executor:
+                try:
+                    list(executor.map(_clone, project_names))
+                except KeyboardInterrupt:
+                    # workers stop before their next source
+                    self._cancelled.set()
+                    raise
+        return errors
+
+    def add_worktree(self, project_name: str, branch: str) -> str:
+        """Add a `branch` worktree of a cloned project.
+
+        The worktree shares the object store of the project clone and is
+        placed next to it as `<project>@<branch>`.
+
+        :returns: the worktree name under the working directory
+        """
+        if project_name not in self._dirs:
+            raise CommandError(
+                f'No project named "{project_name}" found under the working directory'
+            )
+
+        worktree_name = self._get_dir_name(
+            f"{project_name}{WORKTREE_SEPARATOR}{branch}"
+        )
+        with self._lock(worktree_name):
+            if worktree_name in self._dirs:
+                return worktree_name
+
+            try:
+                add_worktree(
+                    os.path.join(self.directory, project_name),
+                    os.path.join(self.directory, worktree_name),
+                    branch,
+                )
+            except GITError as exc:
+                raise CommandError(exc) from exc
+        return worktree_name
+
+    def fetch(
+        self,
+        project_name: str = None,
+        timeout: Optional[float] = FETCH_TIMEOUT,
+    ) -> Dict[str, str]:
+        """Fetch remotes of projects concurrently.
+
+        If `project_name` is not specified, all projects will be fetched.
+        Worktrees share remotes of their main clones, so they are skipped.
+
+        :returns: errors of failed fetches by project name
+        """
+        names = (
+            [self._get_dir_name(project_name)]
+            if project_name
+            else self._dirs
+        )
+        paths = {
+            os.path.join(self.directory, name): name
+            for name in names
+            if is_git_dir(os.path.join(self.directory, name))
+            and (
+                project_name
+                or not is_worktree(os.path.join(self.directory, name))
+            )
+        }
+        errors = fetch_all(list(paths), timeout=timeout)
+        return {paths[path]: error for path, error in errors.items()}
+
+    def open(
+        self, project_name: Optional[str], editor: str = None
+    ) -> None:
+        """Open a project from the directory.
+
+        If `project_name` is None, the working directory itself is opened.
+
+        See `resolve_editor` for how the editor is chosen.
+        """
+        project_dir = (
+            os.path.join(self.directory, project_name)
+            if project_name
+            else self.directory
+        )
+
+        if not os.path.isdir(project_dir):
+            raise CommandError(
+                f'No project named "{project_name}" found under the working directory'
+            )
+
+        editor_ = resolve_editor(editor)
+        if not editor_:
+            raise CommandError(
+                f'No suitable editor found to open "{project_dir}"'
+            )
+
+        logging.info(
+            'Opening "%s" with "%s" editor', project_dir, editor_
+        )
+        # editors may outlive the command and its SSH masters
+        result = subprocess.run(
+            [editor_, project_dir],
+            check=False,
+            env=ssh.get_detached_env(),
+        )
+        if result.returncode:
+            raise CommandError(
+                f'Editor "{editor_}" failed to open "{project_dir}"'
+            )
+        if project_name:
+            metadata.record_open(project_dir)
+
+    def show(
+        self,
+        check_status: bool,
+        size: bool = False,
+        activity: bool = False,
+        stale: Optional[float] = None,
+    ) -> Iterator[ProjectInfo]:
+        """Return information about GIT projects.
+
+        If `size` is set, on-disk sizes of GIT projects are calculated.
+
+        If `activity` is set, last activity times of GIT projects are found
+        from the file system metadata and the last time they were opened.
+        If `stale` is set, only GIT projects inactive for that many seconds
+        are returned, and only they are checked.
+        """
+        git_paths = [
+            os.path.join(self.directory, project)
+            for project in self._dirs
+            if is_git_dir(os.path.join(self.directory, project))
+        ]
+        usage = {}
+        if size:
+            usage = disk.get_usage(git_paths)
+            metadata.record_sizes(
+                {path: size.total for path, size in usage.items()}
+            )
+        active_at: Dict[str, Optional[float]] = {}
+        if activity or stale is not None:
+            active_at = activity_module.get_activities(git_paths)
+            for path, meta in metadata.get(git_paths).items():
+                if meta.opened_at:
+                    active_at[path] = max(
+                        active_at[path] or 0, meta.opened_at
+                    )
+
+        for project in self._dirs:
+            if stale is not None:
+                age = activity_module.get_age(
+                    active_at.get(
+                        os.path.join(self.directory, project)
+                    )
+                )
+                if age is None or age < stale:
+                    continue
+            setup_status = self.get_setup_status(project)
+            yield ProjectInfo(
+                project,
+                self._get_project_status(project)
+                if check_status
+                else None,
+                usage.get(os.path.join(self.directory, project)),
+                setup_status.describe() if setup_status else None,
+                active_at.get(os.path.join(self.directory, project)),
+            )
+
+    def reports(
+        self,
+        project_names: Optional[Iterable[str]] = None,
+        jobs: int = REPORT_JOBS,
+    ) -> Dict[str, ProjectReport]:
+        """Return reports of GIT projects by their names.
+
+        All projects are reported if no `project_names` given. Project
+        options are respected. Projects locked by other processes are not
+        checked and get an error reported. It is safe to call from several
+        threads at once.
+        """
+        return self._map_projects(
+            self._get_report, project_names, jobs
+        )
+
+    def grep(
+        self,
+        args: List[str],
+        project_names: Optional[Iterable[str]] = None,
+        jobs: int = search.JOBS,
+        limit: Optional[int] = search.LIMIT,
+        errors: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Tuple[str, str]]:
+        """Search GIT projects with `git grep` concurrently.
+
+        All projects are searched if no `project_names` given. See
+        `search.grep_all` for other arguments.
+
+        :returns: names of projects and their matched lines, as they arrive
+        """
+        directories = {
+            name: os.path.join(self.directory, name)
+            for name in (
+                self._dirs if project_names is None else project_names
+            )
+        }
+        for name, path in list(directories.items()):
+            if is_git_dir(path):
+                continue
+            if project_names is not None:
+                raise CommandError(
+                    f'"{name}" not found in "{self.directory}"'
+                )
+            del directories[name]
+        return search.grep_all(directories, args, jobs, limit, errors)
+
+    def _map_projects(
+        self,
+        func: Callable,
+        project_names: Optional[Iterable[str]],
+        jobs: int,
+    ) -> dict:
+        """Call `func` for GIT projects concurrently.
+
+        :returns: results by project names
+        """
+        if project_names is None:
+            project_names = self._dirs
+        names = [
+            name
+            for name in project_names
+            if is_git_dir(os.path.join(self.directory, name))
+        ]
+        if not names:
+            return {}
+        with ThreadPoolExecutor(
+            max_workers=min(jobs, len(names))
+        ) as executor:
+            return dict(zip(names, executor.map(func, names)))
+
+    def _get_report(self, project_name: str) -> ProjectReport:
+        path = os.path.join(self.directory, project_name)
+        try:
+            with self._lock(
+                project_name, shared=True, blocking=False
+            ):
+                return get_report(
+                    path, **self._get_check_options(project_name)
+                )
+        except locks.LockedError as exc:
+            return ProjectReport(path, errors=[str(exc)])
+
+    def diagnose(
+        self,
+        project_names: Optional[Iterable[str]] = None,
+        jobs: int = REPORT_JOBS,
+    ) -> Dict[str, doctor.Diagnosis]:
+        """Time checks of GIT projects and find causes of slow ones.
+
+        All projects are diagnosed if no `project_names` given.
+
+        :returns: diagnoses by project names
+        """
+
+        def _diagnose(project_name: str) -> doctor.Diagnosis:
+            report = self._get_report(project_name)
+            return doctor.diagnose(
+                report.path, report.timings, report.totals
+            )
+
+        return self._map_projects(_diagnose, project_names, jobs)
+
+    def treat(
+        self,
+        diagnoses: Dict[str, doctor.Diagnosis],
+        jobs: int = REPORT_JOBS,
+    ) -> Dict[str, str]:
+        """Fix issues of diagnosed GIT projects concurrently.
+
+        Every project is locked while its fixes run.
+
+        :returns: errors of failed fixes by project names
+        """
+        errors: Dict[str, str] = {}
+
+        def _treat(project_name: str) -> None:
+            with self._lock(project_name):
+                try:
+                    doctor.treat(
+                        os.path.join(self.directory, project_name),
+                        diagnoses[project_name].issues,
+                    )
+                except doctor.DoctorError as exc:
+                    errors[project_name] = str(exc)
+
+        self._map_projects(
+            _treat,
+            [
+                name
+                for name, diagnosis in diagnoses.items()
+                if any(issue.fix for issue in diagnosis.issues)
+            ],
+            jobs,
+        )
+        return errors
+
+    def maintain(
+        self,
+        project_names: Optional[Iterable[str]] = None,
+        jobs: int = maintenance.JOBS,
+    ) -> Dict[str, maintenance.Maintenance]:
+        """Maintain GIT projects concurrently.
+
+        All projects are maintained if no `project_names` given. CPU cores
+        are split between `jobs` projects maintained at once. Projects open
+        by processes, locked by other processes and linked worktrees, which
+        share objects of their clones, are skipped. Every project is locked
+        and its checks are timed before and after its maintenance.
+
+        :returns: maintenances by project names
+        """
+        if project_names is None:
+            project_names = self._dirs
+        project_names = list(project_names)
+        open_paths = maintenance.get_open_paths(
+            [
+                os.path.join(self.directory, name)
+                for name in project_names
+            ]
+        )
+        threads = max((os.cpu_count() or 1) // jobs, 1)
+
+        def _maintain(project_name: str) -> maintenance.Maintenance:
+            path = os.path.join(self.directory, project_name)
+            if is_worktree(path):
+                return maintenance.Maintenance(
+                    skipped="worktree, maintained with its clone"
+                )
+            if path in open_paths:
+                return maintenance.Maintenance(skipped="open")
+            result = maintenance.Maintenance()
+            try:
+                with self._lock(project_name, blocking=False):
+                    options = self._get_check_options(project_name)
+                    result.before = maintenance.get_latency(
+                        get_report(path, **options).timings
+                    )
+                    try:
+                        result.tasks = maintenance.maintain(
+                            path, threads
+                        )
+                    except maintenance.MaintenanceError as exc:
+                        result.error = str(exc)
+                    result.after = maintenance.get_latency(
+                        get_report(path, **options).timings
+                    )
+            except locks.LockedError:
+                result.skipped = "busy"
+            return result
+
+        return self._map_projects(_maintain, project_names, jobs)
+
+    def _get_project_status(self, project_name: str) -> ProjectStatus:
+        path = os.path.join(self.directory, project_name)
+        if not is_git_dir(path):
+            return ProjectStatus.UNDEFINED
+        try:
+            with self._lock(
+                project_name, shared=True, blocking=False
+            ):
+                self._check_project(project_name, verdict_only=True)
+        except locks.LockedError:
+            return ProjectStatus.BUSY
+        except GITError:
+            return ProjectStatus.DIRTY
+        else:
+            return ProjectStatus.CLEAN
+
+    @staticmethod
+    def _get_dir_name(project_name: str) -> str:
+        project, branch = split_project_name(project_name)
+        if not branch:
+            return project
+        return (
+            f"{project}{WORKTREE_SEPARATOR}{branch.replace('/', '-')}"
+        )
+
+    def archive(
+        self,
+        project_name: str = None,
+        archive_dir: str = None,
+        mode: str = archive_module.MODE_UNPUSHED,
+    ) -> None:
+        """Archive project into `archive_dir` and remove it from the directory.
+
+        Unpushed changes are archived instead of being checked. If
+        `project_name` is not specified, all projects will be archived.
+        """
+        if project_name:
+            project_name = self._get_dir_name(project_name)
+            if project_name not in self._dirs:
+                raise CommandError(
+                    f'"{project_name}" not found in "{self.directory}"'
+                )
+            self._remove_project(
+                project_name,
+                archive_dir=archive_dir,
+                archive_mode=mode,
+            )
+        else:
+            self._remove_projects(
+                archive_dir=archive_dir, archive_mode=mode
+            )
+
+    def restore(
+        self,
+        project_name: str,
+        archive_dir: str,
+        sources: sources_module.Sources,
+    ) -> None:
+        """Restore a project from its latest archive in `archive_dir`.
+
+        The project is cloned from the archived origin or `sources` first if
+        only its unpushed state was archived. Like `clone`, the project is
+        restored in the staging area.
+        """
+        with self._lock(project_name):
+            if project_name in self._dirs:
+                raise CommandError(
+                    f'Project "{project_name}" is already cloned'
+                )
+
+            path = archive_module.find_archive(
+                archive_dir, project_name
+            )
+            if not path:
+                raise CommandError(
+                    f'No archive of "{project_name}" found in "{archive_dir}"'
+                )
+
+            staging = self._get_state_path("staging", project_name)
+            shutil.rmtree(staging, ignore_errors=True)
+            meta = archive_module.load_meta(path)
+            try:
+                if meta["mode"] == archive_module.MODE_FULL:
+                    archive_module.restore_tree(path, staging)
+                else:
+                    origin = meta["remotes"].get("origin")
+                    try:
+                        if not origin:
+                            raise GITError("No origin is archived")
+                        clone(origin, staging)
+                    except GITError as exc:
+                        logging.debug(exc)
+                        staging = self._clone_staged(
+                            project_name, sources
+                        )
+                    archive_module.restore_unpushed(path, staging)
+            except archive_module.ArchiveError as exc:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise CommandError(exc) from exc
+            self._commit_staged(project_name, staging)
+
+    def gc(self, max_size: int, dry_run: bool = False) -> List[str]:
+        """Remove least recently used clean projects to fit `max_size`.
+
+        Only sizes of GIT projects are accounted. Projects are removed with
+        the same checks as `remove` does, so dirty projects are skipped. If
+        `dry_run` is set, projects are only checked.
+
+        :returns: names of removed projects
+        """
+        paths = {
+            os.path.join(self.directory, name): name
+            for name in self._dirs
+            if is_git_dir(os.path.join(self.directory, name))
+        }
+        usage = disk.get_usage(list(paths))
+        metadata.record_sizes(
+            {path: size.total for path, size in usage.items()}
+        )
+        total = sum(size.total for size in usage.values())
+        logging.debug(
+            "Workspace size is %s, budget is %s",
+            disk.format_size(total),
+            disk.format_size(max_size),
+        )
+
+        # projects never opened via `gw` fall back to their mtime
+        projects_meta = metadata.get(list(paths))
+        lru = sorted(
+            paths,
+            key=lambda path: projects_meta[path].used_at
+            or os.stat(path).st_mtime,
+        )
+
+        removed: List[str] = []
+        pending = lru
+        while pending and total > max_size:
+            # main clones are revisited once their worktrees are removed
+            blocked = []
+            for path in pending:
+                if total <= max_size:
+                    break
+                gone = [
+                    os.path.join(self.directory, name)
+                    for name in removed
+                ]
+                if self._get_live_worktrees(paths[path], gone):
+                    blocked.append(path)
+                    continue
+                try:
+                    if dry_run:
+                        self._check_removable(
+                            paths[path], verdict_only=True, gone=gone
+                        )
+                    else:
+                        self._remove_project(paths[path])
+                except CommandError as exc:
+                    logging.debug(
+                        'Skipping "%s": %s', paths[path], exc
+                    )
+                    continue
+                total -= usage[path].total
+                removed.append(paths[path])
+            if blocked == pending:
+                break
+            pending = blocked
+
+        if total > max_size:
+            logging.warning(
+                "Workspace size %s still exceeds %s: "
+                "the rest of projects are dirty",
+                disk.format_size(total),
+                disk.format_size(max_size),
+            )
+        return removed
+
+    def _get_live_worktrees(
+        self, project_name: str, gone: Iterable[str] = ()
+    ) -> List[str]:
+        """Return live worktrees of a main clone except `gone` ones.
+
+        Worktrees are not main clones, so they have none.
+        """
+        path = os.path.join(self.directory, project_name)
+        if is_worktree(path):
+            return []
+        gone = {os.path.realpath(worktree) for worktree in gone}
+        return [
+            worktree
+            for worktree in get_worktrees(path)
+            if os.path.realpath(worktree) not in gone
+        ]
+
+    def _check_removable(
+        self,
+        project_name: str,
+        check: bool = True,
+        verdict_only: bool = False,
+        gone: Iterable[str] = (),
+    ) -> None:
+        """Check whether a project may be removed.
+
+        Main clones with live worktrees, except `gone` ones, are kept. If
+        `check` is set, projects with unpushed changes are kept too.
+
+        :raises: `CommandError` if the project is kept
+        """
+        worktrees = self._get_live_worktrees(project_name, gone)
+        if worktrees:
+            raise CommandError(
+                f'"{project_name}" has live worktrees: '
+                f'{", ".join(worktrees)}. Finish them first'
+            )
+        if not check:
+            return
+        try:
+            self._check_project(
+                project_name, verdict_only=verdict_only
+            )
+        except GITError as exc:
+            raise CommandError(
+                f"There are some unpushed changes or problems! See below\n\n"
+                f"{exc}\n"
+                f'Push your local changes or use "-f" flag to drop them'
+            ) from exc
+
+    def _remove_projects(self, force: bool = False, **kwargs) -> None:
+        # worktrees go first so their main clones can be removed after
+        for project in sorted(
+            self._dirs,
+            key=lambda name: not is_worktree(
+                os.path.join(self.directory, name)
+            ),
+        ):
+            if os.path.isdir(os.path.join(self.directory, project)):
+                try:
+                    self._remove_project(
+                        project, force=force, **kwargs
+                    )
+                except CommandError as exc:
+                    logging.error(exc)
+                    continue
+
+    def _remove_project(self, project_name: str, **kwargs) -> None:
+        with self._lock(project_name):
+            self._remove_project_locked(project_name, **kwargs)
+
+    def _remove_project_locked(
+        self,
+        project_name: str,
+        force: bool = False,
+        archive_dir: str = None,
+        archive_mode: str = archive_module.MODE_UNPUSHED,
+    ) -> None:
+        logging.info('Finishing up "%s"', project_name)
+        proj_path = os.path.join(self.directory, project_name)
+
+        if not is_git_dir(proj_path):
+            logging.debug(
+                "Not a GIT repository (%s), skipping", proj_path
+            )
+            return
+
+        worktree = is_worktree(proj_path)
+        if archive_dir and worktree:
+            raise CommandError(
+                f'"{project_name}" is a worktree and can not be archived'
+            )
+        # hooks run only for projects which are going to be removed
+        self._check_removable(
+            project_name, check=not force and not archive_dir
+        )
+
+        try:
+            self._run_hooks(project_name, "pre_done")
+        except hooks.HookError as exc:
+            if not force:
+                raise CommandError(
+                    f'{exc}. Use "-f" flag to finish anyway'
+                ) from exc
+            logging.warning(exc)
+
+        if archive_dir:
+            try:
+                archive_module.archive_project(
+                    proj_path, archive_dir, archive_mode
+                )
+            except archive_module.ArchiveError as exc:
+                raise CommandError(exc) from exc
+
+        self._delete_project(project_name, worktree)
+
+    def _delete_project(
+        self, project_name: str, worktree: bool
+    ) -> None:
+        """Remove a checked project clone or a worktree."""
+        proj_path = os.path.join(self.directory, project_name)
+        logging.debug('Removing "%s"', proj_path)
+        if worktree:
+            try:
+                remove_worktree(proj_path)
+            except GITError as exc:
+                raise CommandError(exc) from exc
+        else:
+            self._dissociate_borrowers(project_name)
+            _unregister_large_repo(proj_path)
+            # moved out first, so an interrupted removal does not leave
+            # a half-removed project behind
+            trash = self._get_state_path("trash", project_name)
+            shutil.rmtree(trash, ignore_errors=True)
+            os.rename(proj_path, trash)
+            shutil.rmtree(trash)
+        metadata.forget(proj_path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._get_status_path(project_name))
 
     def __contains__(self, item) -> bool:
         return item in self._dirs
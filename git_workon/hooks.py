@@ -0,0 +1,55 @@
+"""Module for user hooks run on projects.
+
+Hooks are shell commands run in a project directory, e.g. creating a virtual
+environment after a clone or stopping services before a removal. Their
+output goes to a log file. Every hook takes a slot, one of lock files, so
+the number of hooks run at once across all `gw` processes is limited.
+"""
+import logging
+import subprocess
+from typing import Callable, List, Optional
+
+from . import locks
+
+
+class HookError(Exception):
+    """Hook failure."""
+
+
+def run(
+    directory: str,
+    commands: List[str],
+    log_path: str,
+    slots: List[str],
+    on_progress: Optional[Callable[[str], None]] = None,
+) -> None:
+    """Run hook `commands` one by one in `directory`.
+
+    `on_progress` is called with a description of every hook before it runs.
+
+    :raises: `HookError` on the first failed hook
+    """
+    with open(log_path, "a", encoding="utf8") as log:
+        for i, command in enumerate(commands, start=1):
+            if on_progress:
+                on_progress(f"{i}/{len(commands)}: {command}")
+            with locks.acquire_any(slots):
+                logging.info(
+                    'Running hook "%s" in "%s"', command, directory
+                )
+                log.write(f"$ {command}\n")
+                log.flush()
+                result = subprocess.run(
+                    command,
+                    shell=True,
+                    cwd=directory,
+                    stdin=subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    check=False,
+                )
+            if result.returncode:
+                raise HookError(
+                    f'Hook "{command}" failed with code {result.returncode}. '
+                    f'See "{log_path}"'
+                )
@@ -0,0 +1,69 @@
+"""Module for cross-process locks of projects.
+
+Locks are advisory `flock` locks of files, so they are released by the OS
+even if a process holding them gets killed.
+"""
+import fcntl
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Iterator, List
+
+
+class LockedError(Exception):
+    """A lock is held by another process."""
+
+
+@contextmanager
+def acquire(
+    path: str, shared: bool = False, blocking: bool = True
+) -> Iterator[None]:
+    """Acquire a lock of the `path` file.
+
+    Shared locks may be held by several processes at once, an exclusive lock
+    excludes all other locks. If `blocking`, wait until the lock is released
+    by other processes.
+
+    :raises: `LockedError` if not `blocking` and the lock is held by another
+      process
+    """
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    with open(path, "a", encoding="utf8") as file:
+        try:
+            fcntl.flock(file, operation | fcntl.LOCK_NB)
+        except BlockingIOError as exc:
+            if not blocking:
+                raise LockedError(
+                    f'"{path}" is locked by another process'
+                ) from exc
+            logging.info('Waiting for "%s" to be unlocked', path)
+            fcntl.flock(file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def acquire_any(paths: List[str], poll: float = 0.1) -> Iterator[str]:
+    """Acquire an exclusive lock of any of `paths` files.
+
+    Waits until one of the locks is free, so at most `len(paths)` holders
+    run at once.
+
+    :returns: path of the acquired lock
+    """
+    waiting = False
+    with ExitStack() as stack:
+        while True:
+            for path in paths:
+                try:
+                    stack.enter_context(acquire(path, blocking=False))
+                except LockedError:
+                    continue
+                yield path
+                return
+            if not waiting:
+                logging.info("Waiting for a free slot")
+                waiting = True
+            time.sleep(poll)
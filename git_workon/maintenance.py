@@ -0,0 +1,186 @@
+"""Module for maintenance of GIT projects speeding up their checks.
+
+Loose objects, packs and loose refs pile up in clones and slow down status and
+log walks of checks. Maintenance packs refs, repacks objects, prunes expired
+unreachable ones and writes the commit-graph, as `git gc` would. Its GIT
+commands run with the lowest CPU and IO priorities available and a limited
+number of pack threads, so maintenance of many projects at once does not
+starve other work.
+"""
+import logging
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from . import runner
+
+# default of `gc.pruneExpire`
+PRUNE_EXPIRE = "2.weeks.ago"
+NICENESS = 19
+# half of CPU cores are left to other work
+JOBS = max((os.cpu_count() or 1) // 2, 1)
+_PROC_DIR = "/proc"
+
+
+class MaintenanceError(Exception):
+    """Failed maintenance of a project."""
+
+
+@dataclass
+class Maintenance:
+    """Maintenance of a project.
+
+    `before` and `after` are latencies of its local checks in seconds, `tasks`
+    are names of run maintenance tasks. A project is either `skipped` for
+    a reason or maintained, possibly with an `error`.
+    """
+
+    before: Optional[float] = None
+    after: Optional[float] = None
+    tasks: List[str] = field(default_factory=list)
+    skipped: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def delta(self) -> Optional[float]:
+        """Return the change of the checks latency."""
+        if self.before is None or self.after is None:
+            return None
+        return self.after - self.before
+
+
+def get_latency(timings: Dict[str, float]) -> float:
+    """Return the total duration of local checks of `git.ProjectReport`.
+
+    The remote tags check is not affected by maintenance, so it is left out.
+    """
+    return sum(
+        elapsed
+        for check, elapsed in timings.items()
+        if check != "tags"
+    )
+
+
+def _get_priority_prefix() -> List[str]:
+    """Return a command prefix running a command with the lowest priorities."""
+    prefix = []
+    if shutil.which("ionice"):
+        prefix.extend(["ionice", "-c", "3"])
+    if shutil.which("nice"):
+        prefix.extend(["nice", "-n", str(NICENESS)])
+    return prefix
+
+
+def _git(directory: str, *args: str, threads: int = 0) -> str:
+    config = ["-c", f"pack.threads={threads}"] if threads else []
+    return runner.run(
+        [*config, *args],
+        cwd=directory,
+        check=True,
+        prefix=_get_priority_prefix(),
+        stdin=subprocess.DEVNULL,
+    ).stdout
+
+
+def _get_prune_expire(directory: str) -> str:
+    try:
+        return (
+            _git(directory, "config", "gc.pruneExpire").strip()
+            or PRUNE_EXPIRE
+        )
+    except subprocess.CalledProcessError:
+        return PRUNE_EXPIRE
+
+
+def get_repack_args(
+    directory: str, expire: Optional[str] = None
+) -> List[str]:
+    """Return GIT arguments repacking objects of a project into one pack.
+
+    Unreachable objects are kept until `gc.pruneExpire` (or `expire`), so
+    objects of running commands and ones borrowed through alternates
+    survive. Objects borrowed from alternates are not copied.
+    """
+    expire = expire or _get_prune_expire(directory)
+    repack = ["repack", "-d", "-l"]
+    if expire == "never":
+        repack.extend(["-a", "--keep-unreachable"])
+    else:
+        repack.extend(["-A", f"--unpack-unreachable={expire}"])
+    return repack
+
+
+def get_tasks(directory: str) -> List[Tuple[str, List[str]]]:
+    """Return maintenance tasks of a GIT project.
+
+    See `get_repack_args` for objects kept by the repack.
+
+    :returns: names and GIT arguments of tasks in order
+    """
+    expire = _get_prune_expire(directory)
+    tasks = [("pack-refs", ["pack-refs", "--all", "--prune"])]
+    tasks.append(("repack", get_repack_args(directory, expire)))
+    if expire != "never":
+        tasks.append(("prune", ["prune", f"--expire={expire}"]))
+    tasks.append(
+        (
+            "commit-graph",
+            [
+                "commit-graph",
+                "write",
+                "--reachable",
+                "--changed-paths",
+            ],
+        )
+    )
+    return tasks
+
+
+def maintain(directory: str, threads: int = 0) -> List[str]:
+    """Run maintenance tasks of a GIT project.
+
+    Objects are repacked by at most `threads` threads, all CPU cores if 0.
+
+    :returns: names of run tasks
+    :raises: `MaintenanceError` on the first failed task
+    """
+    done = []
+    for name, args in get_tasks(directory):
+        logging.debug('Running %s of "%s"', name, directory)
+        try:
+            _git(directory, *args, threads=threads)
+        except subprocess.CalledProcessError as exc:
+            raise MaintenanceError(
+                f'"git {" ".join(args)}" failed: {exc.stderr.strip()}'
+            ) from exc
+        done.append(name)
+    return done
+
+
+def get_open_paths(directories: List[str]) -> Set[str]:
+    """Return `directories` which processes are working in.
+
+    A directory is open if the current directory of any process, e.g. a
+    shell, an editor or a language server, is inside of it. Processes are
+    found under `/proc`, so nothing is found where it is missing.
+    """
+    roots = [os.path.realpath(directory) for directory in directories]
+    open_paths = set()
+    try:
+        pids = [
+            name for name in os.listdir(_PROC_DIR) if name.isdigit()
+        ]
+    except OSError:
+        return open_paths
+    for pid in pids:
+        try:
+            cwd = os.readlink(os.path.join(_PROC_DIR, pid, "cwd"))
+        except OSError:
+            # exited processes and ones of other users
+            continue
+        for directory, root in zip(directories, roots):
+            if cwd == root or cwd.startswith(root + os.sep):
+                open_paths.add(directory)
+    return open_paths
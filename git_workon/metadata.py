@@ -0,0 +1,108 @@
+"""Module for the metadata index of projects.
+
+The index is an SQLite database recording when every project was cloned and
+last opened and its last known size. Projects are identified by their
+absolute paths.
+"""
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from . import config as config_module
+
+_INDEX_NAME = "index.sqlite"
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    path TEXT PRIMARY KEY,
+    cloned_at REAL,
+    opened_at REAL,
+    size INTEGER
+)
+"""
+
+
+@dataclass
+class ProjectMeta:
+    """Metadata of a project."""
+
+    path: str
+    cloned_at: Optional[float]
+    opened_at: Optional[float]
+    size: Optional[int]
+
+    @property
+    def used_at(self) -> Optional[float]:
+        """Return the last time a project was started or opened."""
+        times = [t for t in (self.cloned_at, self.opened_at) if t]
+        return max(times) if times else None
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    # a connection per call keeps the index usable from threads and
+    # concurrent processes
+    with closing(
+        sqlite3.connect(
+            config_module.cache_path(_INDEX_NAME), timeout=30
+        )
+    ) as connection:
+        with connection:
+            connection.execute(_SCHEMA)
+            yield connection
+
+
+def _update(
+    connection: sqlite3.Connection, path: str, column: str, value
+) -> None:
+    connection.execute(
+        "INSERT OR IGNORE INTO projects (path) VALUES (?)", (path,)
+    )
+    connection.execute(
+        f"UPDATE projects SET {column} = ? WHERE path = ?",
+        (value, path),
+    )
+
+
+def record_clone(path: str) -> None:
+    """Record that a project was just cloned to `path`."""
+    with _connect() as connection:
+        _update(connection, path, "cloned_at", time.time())
+
+
+def record_open(path: str) -> None:
+    """Record that a project under `path` was just opened."""
+    with _connect() as connection:
+        _update(connection, path, "opened_at", time.time())
+
+
+def record_sizes(sizes: Dict[str, int]) -> None:
+    """Record sizes of projects by their paths."""
+    with _connect() as connection:
+        for path, size in sizes.items():
+            _update(connection, path, "size", size)
+
+
+def forget(path: str) -> None:
+    """Remove a project under `path` from the index."""
+    with _connect() as connection:
+        connection.execute(
+            "DELETE FROM projects WHERE path = ?", (path,)
+        )
+
+
+def get(paths: List[str]) -> Dict[str, ProjectMeta]:
+    """Return metadata of projects by their paths.
+
+    Projects missing from the index have empty metadata.
+    """
+    with _connect() as connection:
+        rows = connection.execute(
+            "SELECT path, cloned_at, opened_at, size FROM projects"
+        ).fetchall()
+    known = {row[0]: ProjectMeta(*row) for row in rows}
+    return {
+        path: known.get(path, ProjectMeta(path, None, None, None))
+        for path in paths
+    }
@@ -0,0 +1,153 @@
+"""Module for the setup pipeline of started projects.
+
+Setup steps not needed to open a project (completing a resumable clone
+history, cloning submodules, post-clone hooks) may run after it is opened,
+in a background process. Progress of the steps is recorded in a status file, so it can be
+shown by `gw show`. The status file is removed once all steps succeed.
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from . import events, ssh
+
+STEP_DEEPEN = "deepen"
+STEP_SUBMODULES = "submodules"
+STEP_HOOKS = "hooks"
+STEPS = (STEP_DEEPEN, STEP_SUBMODULES, STEP_HOOKS)
+
+
+@dataclass
+class Status:
+    """Progress of setup steps of a project."""
+
+    steps: List[str]
+    submodule_jobs: Optional[int] = None
+    done: List[str] = field(default_factory=list)
+    current: Optional[str] = None
+    # progress within the current step
+    detail: Optional[str] = None
+    error: Optional[str] = None
+    pid: int = field(default_factory=os.getpid)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def pending(self) -> List[str]:
+        """Return steps not done yet."""
+        return [step for step in self.steps if step not in self.done]
+
+    @property
+    def running(self) -> bool:
+        """Return whether the process running the steps is alive."""
+        if self.error or not self.pending:
+            return False
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def describe(self) -> str:
+        """Return human-readable progress of the steps."""
+        progress = f"{len(self.done)}/{len(self.steps)}"
+        if self.detail:
+            progress += f", {self.detail}"
+        if self.error:
+            return f"setup failed at {self.current} ({progress})"
+        if not self.running:
+            return f"setup interrupted at {self.current} ({progress})"
+        return f"setup: {self.current} ({progress})"
+
+
+def load_status(path: str) -> Optional[Status]:
+    """Return setup status from the `path` file if there is one."""
+    try:
+        with open(path, encoding="utf8") as file:
+            return Status(**json.load(file))
+    except (json.JSONDecodeError, OSError, TypeError):
+        return None
+
+
+def save_status(path: str, status: Status) -> None:
+    """Write setup status to the `path` file atomically."""
+    status.updated_at = time.time()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf8") as file:
+        json.dump(asdict(status), file)
+    os.replace(tmp_path, path)
+
+
+def spawn(
+    directory: str,
+    project_name: str,
+    steps: List[str],
+    log_path: str,
+    submodule_jobs: Optional[int] = None,
+) -> int:
+    """Run setup steps of a project in a detached background process.
+
+    Output of the process goes to the `log_path` file.
+
+    :returns: PID of the process
+    """
+    command = [
+        sys.executable,
+        "-m",
+        __name__,
+        directory,
+        project_name,
+        *steps,
+    ]
+    if submodule_jobs:
+        command.extend(["--submodule-jobs", str(submodule_jobs)])
+    logging.debug(
+        'Running setup "%s" in background', " ".join(command)
+    )
+    with open(log_path, "a", encoding="utf8") as log:
+        # pylint:disable=consider-using-with
+        return subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env=ssh.get_detached_env(),
+            start_new_session=True,
+        ).pid
+
+
+def main() -> None:
+    """Run setup steps of a project, used by `spawn`."""
+    # pylint:disable=import-outside-toplevel
+    from . import config as config_module
+    from . import git
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("project")
+    parser.add_argument("steps", nargs="+", choices=STEPS)
+    parser.add_argument("--submodule-jobs", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(message)s"
+    )
+    try:
+        with ssh.multiplexed(), events.timed("command", name="setup"):
+            git.WorkingDir(
+                args.directory, config_module.load_config()
+            ).setup(args.project, args.steps, args.submodule_jobs)
+    except (git.CommandError, config_module.ConfigError) as exc:
+        logging.error(exc)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
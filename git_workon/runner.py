@@ -0,0 +1,59 @@
+"""Module running GIT commands.
+
+Every GIT command of `gw` waited for is run by `run`, so commands are logged
+and their durations are recorded by subcommand in the log of operations.
+"""
+import logging
+import signal
+import subprocess
+from typing import Optional, Sequence
+
+from . import events
+
+
+def get_subcommand(args: Sequence[str]) -> str:
+    """Return a GIT subcommand of GIT arguments, e.g. `status`."""
+    words = iter(args)
+    for word in words:
+        if word == "-c":
+            next(words, None)
+        elif not word.startswith("-"):
+            return word
+    return ""
+
+
+def run(
+    args: Sequence[str],
+    cwd: Optional[str] = None,
+    check: bool = False,
+    text: bool = True,
+    prefix: Sequence[str] = (),
+    **kwargs,
+) -> subprocess.CompletedProcess:
+    """Run a GIT command with `args` and capture its output.
+
+    `prefix` is a command running GIT, e.g. `nice`. `kwargs` are passed to
+    `subprocess.run`.
+
+    :raises: `KeyboardInterrupt` if the command was killed by SIGINT. It is
+        sent to the whole process group, so commands run in threads are
+        interrupted along with the main thread which gets the exception
+    """
+    logging.debug('Running command "git %s"', " ".join(args))
+    with events.timed("git", command=get_subcommand(args)):
+        try:
+            result = subprocess.run(
+                [*prefix, "git", *args],
+                cwd=cwd,
+                capture_output=True,
+                text=text,
+                check=check,
+                **kwargs,
+            )
+        except subprocess.CalledProcessError as exc:
+            if exc.returncode == -signal.SIGINT:
+                raise KeyboardInterrupt from exc
+            raise
+        if not check and result.returncode == -signal.SIGINT:
+            raise KeyboardInterrupt
+        return result
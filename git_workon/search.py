@@ -0,0 +1,165 @@
+"""Module for searches over GIT projects.
+
+`git grep` runs in several projects at once and its matches are streamed as
+they arrive, so the first ones are seen while slow projects are still
+searched. Once enough matches are found, the remaining searches are killed
+and the ones not started yet are skipped.
+"""
+import logging
+import queue
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from . import events
+
+JOBS = 8
+LIMIT = 1000
+# `git grep` exits with 1 if nothing is found
+_NOT_FOUND_CODE = 1
+# marks the end of a project search in the results queue
+_DONE = object()
+
+
+def get_grep_args(
+    pattern: str,
+    pathspecs: Optional[List[str]] = None,
+    ignore_case: bool = False,
+    word: bool = False,
+    fixed: bool = False,
+    files: bool = False,
+) -> List[str]:
+    """Return `git grep` arguments.
+
+    Binary files are skipped and matched lines are prefixed by file paths
+    and line numbers, or only file paths are listed if `files` is set.
+    """
+    args = ["grep", "-I", "--no-color", "-l" if files else "-n"]
+    if ignore_case:
+        args.append("-i")
+    if word:
+        args.append("-w")
+    if fixed:
+        args.append("-F")
+    return [*args, "-e", pattern, "--", *(pathspecs or [])]
+
+
+class _Searches:
+    """Running searches killed on cancellation."""
+
+    def __init__(self) -> None:
+        self.cancelled = threading.Event()
+        self._procs: Set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+
+    def start(
+        self, args: List[str], cwd: str
+    ) -> Optional[subprocess.Popen]:
+        """Start `git` with `args` unless searches are cancelled."""
+        with self._lock:
+            if self.cancelled.is_set():
+                return None
+            proc = subprocess.Popen(  # pylint:disable=consider-using-with
+                ["git", *args],
+                cwd=cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace",
+            )
+            self._procs.add(proc)
+            return proc
+
+    def finish(self, proc: subprocess.Popen) -> None:
+        """Forget a finished search."""
+        with self._lock:
+            self._procs.discard(proc)
+
+    def cancel(self) -> None:
+        """Kill running searches and skip ones not started yet."""
+        with self._lock:
+            self.cancelled.set()
+            for proc in self._procs:
+                proc.kill()
+
+
+def _grep(
+    name: str,
+    directory: str,
+    args: List[str],
+    searches: _Searches,
+    results: queue.Queue,
+) -> None:
+    """Put matches of a project search into `results`."""
+    try:
+        proc = searches.start(args, directory)
+        if not proc:
+            return
+        with events.timed("git", command="grep"), proc:
+            for line in proc.stdout:
+                results.put((name, line.rstrip("\n"), None))
+            stderr = proc.stderr.read()
+        searches.finish(proc)
+        if (
+            proc.returncode not in (0, _NOT_FOUND_CODE)
+            and not searches.cancelled.is_set()
+        ):
+            results.put((name, None, stderr.strip()))
+    except OSError as exc:
+        results.put((name, None, str(exc)))
+    finally:
+        results.put(_DONE)
+
+
+def grep_all(
+    directories: Dict[str, str],
+    args: List[str],
+    jobs: int = JOBS,
+    limit: Optional[int] = LIMIT,
+    errors: Optional[Dict[str, str]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Run `git grep` with `args` in `directories` by names concurrently.
+
+    At most `jobs` projects are searched at once. Searches stop once
+    `limit` matches are found. Errors of failed searches are put into
+    `errors` by names.
+
+    :returns: names of projects and their matched lines, as they arrive
+    """
+    if not directories:
+        return
+    results: queue.Queue = queue.Queue()
+    searches = _Searches()
+    executor = ThreadPoolExecutor(
+        max_workers=min(jobs, len(directories))
+    )
+    for name, directory in directories.items():
+        executor.submit(
+            _grep, name, directory, args, searches, results
+        )
+
+    found = 0
+    running = len(directories)
+    try:
+        while running:
+            result = results.get()
+            if result is _DONE:
+                running -= 1
+                continue
+            name, line, error = result
+            if error is not None:
+                logging.debug(
+                    'Failed to search "%s": %s', name, error
+                )
+                if errors is not None:
+                    errors[name] = error
+                continue
+            yield name, line
+            found += 1
+            if limit and found >= limit:
+                break
+    finally:
+        searches.cancel()
+        executor.shutdown(wait=True)
@@ -0,0 +1,252 @@
+"""Module for statistics of GIT sources used to order clone attempts.
+
+Sources are tried in the configured order, as different sources may host
+different projects under the same name. Only mirrors, sources grouped into
+a nested array, are ordered by their statistics.
+
+Every clone attempt records its outcome and duration per source. Counts
+decay with `HALF_LIFE`, so a source that failed in the past but has
+recovered moves back up over time.
+
+Projects found missing from sources are remembered for `MISS_TTL`, so repeated
+clones of a mistyped project do not try the sources again. Failures to reach
+a source are not remembered.
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Dict, List, Optional, Union
+
+from . import config as config_module
+
+_STATS_NAME = "sources.json"
+_MISSES_NAME = "misses.json"
+MISS_TTL = 600
+HALF_LIFE = 7 * 24 * 3600
+# weight of the latest duration in the moving average
+_SMOOTHING = 0.3
+# duration assumed for sources without recorded attempts
+_DEFAULT_DURATION = 10.0
+# projects may be cloned concurrently
+_LOCK = threading.Lock()
+
+# sources in order of precedence, nested arrays are groups of mirrors
+Sources = List[Union[str, List[str]]]
+
+
+@dataclass
+class SourceStats:
+    """Decayed clone statistics of a source.
+
+    Durations are moving averages in seconds: `clone_time` of successful
+    clones and `probe_time` of failed attempts.
+    """
+
+    successes: float = 0.0
+    failures: float = 0.0
+    clone_time: Optional[float] = None
+    probe_time: Optional[float] = None
+    updated_at: float = 0.0
+
+    def decayed(self, now: float) -> "SourceStats":
+        """Return statistics with counts decayed to the `now` moment."""
+        factor = 0.5 ** (max(now - self.updated_at, 0) / HALF_LIFE)
+        return replace(
+            self,
+            successes=self.successes * factor,
+            failures=self.failures * factor,
+            updated_at=now,
+        )
+
+    @property
+    def success_rate(self) -> float:
+        """Return a success probability smoothed by a uniform prior."""
+        return (self.successes + 1) / (
+            self.successes + self.failures + 2
+        )
+
+    @property
+    def expected_time(self) -> float:
+        """Return expected time spent on the source until a success."""
+        rate = self.success_rate
+        clone_time = (
+            self.clone_time
+            if self.clone_time is not None
+            else _DEFAULT_DURATION
+        )
+        probe_time = (
+            self.probe_time
+            if self.probe_time is not None
+            else _DEFAULT_DURATION
+        )
+        return (rate * clone_time + (1 - rate) * probe_time) / rate
+
+
+def _average(previous: Optional[float], duration: float) -> float:
+    if previous is None:
+        return duration
+    return previous + _SMOOTHING * (duration - previous)
+
+
+def load() -> Dict[str, SourceStats]:
+    """Return statistics of sources decayed to the current moment."""
+    try:
+        with open(
+            config_module.cache_path(_STATS_NAME), encoding="utf8"
+        ) as file:
+            stats = json.load(file)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+    now = time.time()
+    try:
+        return {
+            source: SourceStats(**source_stats).decayed(now)
+            for source, source_stats in stats.items()
+        }
+    except TypeError:
+        return {}
+
+
+def record(source: str, success: bool, duration: float) -> None:
+    """Record a clone attempt from the `source`."""
+    with _LOCK:
+        _record(source, success, duration)
+
+
+def _record(source: str, success: bool, duration: float) -> None:
+    stats = load()
+    source_stats = stats.get(source, SourceStats()).decayed(
+        time.time()
+    )
+    if success:
+        source_stats.successes += 1
+        source_stats.clone_time = _average(
+            source_stats.clone_time, duration
+        )
+    else:
+        source_stats.failures += 1
+        source_stats.probe_time = _average(
+            source_stats.probe_time, duration
+        )
+    stats[source] = source_stats
+    _dump(
+        _STATS_NAME,
+        {source: asdict(stats_) for source, stats_ in stats.items()},
+    )
+
+
+def _dump(name: str, data: dict) -> None:
+    path = config_module.cache_path(name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf8") as file:
+        json.dump(data, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _load_misses() -> Dict[str, Dict[str, float]]:
+    """Return unexpired miss times of projects by sources."""
+    try:
+        with open(
+            config_module.cache_path(_MISSES_NAME), encoding="utf8"
+        ) as file:
+            misses = json.load(file)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+    now = time.time()
+    try:
+        return {
+            source: {
+                project: missed_at
+                for project, missed_at in projects.items()
+                if now - missed_at < MISS_TTL
+            }
+            for source, projects in misses.items()
+        }
+    except (AttributeError, TypeError):
+        return {}
+
+
+def record_miss(source: str, project: str) -> None:
+    """Record that the `source` has no `project`."""
+    with _LOCK:
+        misses = _load_misses()
+        misses.setdefault(source, {})[project] = time.time()
+        _dump(
+            _MISSES_NAME,
+            {
+                source: projects
+                for source, projects in misses.items()
+                if projects
+            },
+        )
+
+
+def get_missing(sources: List[str], project: str) -> List[str]:
+    """Return `sources` recently found to have no `project`."""
+    misses = _load_misses()
+    return [
+        source
+        for source in sources
+        if project in misses.get(source, {})
+    ]
+
+
+def _by_expected_time(
+    sources: List[str], stats: Dict[str, SourceStats]
+) -> List[str]:
+    """Sort sources by expected time to a successful clone.
+
+    Sources with equal expectations, e.g. never used ones, keep their
+    order.
+    """
+    return sorted(
+        sources,
+        key=lambda source: stats.get(
+            source, SourceStats()
+        ).expected_time,
+    )
+
+
+def order(sources: Sources) -> List[str]:
+    """Return sources in order of clone attempts.
+
+    Sources keep their configured order, while mirrors of a group are
+    ordered by expected time to a successful clone.
+    """
+    stats = load()
+    ordered: List[str] = []
+    for source in sources:
+        if isinstance(source, list):
+            ordered.extend(_by_expected_time(source, stats))
+        else:
+            ordered.append(source)
+    return ordered
+
+
+def describe() -> str:
+    """Return human-readable statistics of sources."""
+    stats = load()
+    if not stats:
+        return "No sources statistics recorded yet"
+
+    def _seconds(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:.1f}s"
+
+    lines = [
+        "Sources statistics (ordered by expected time to clone):"
+    ]
+    for source in _by_expected_time(list(stats), stats):
+        source_stats = stats[source]
+        lines.append(
+            f"  {source}: "
+            f"successes {source_stats.successes:.1f}, "
+            f"failures {source_stats.failures:.1f}, "
+            f"success rate {source_stats.success_rate:.0%}, "
+            f"clone {_seconds(source_stats.clone_time)}, "
+            f"probe {_seconds(source_stats.probe_time)}"
+        )
+    return "\n".join(lines)
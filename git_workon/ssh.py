@@ -0,0 +1,153 @@
+"""Module for SSH connections shared by GIT commands.
+
+Network-bound GIT commands (clones, fetches, checks of unpushed tags) open an
+SSH connection each. While a `gw` command runs, the connections to every host
+are multiplexed over a single master connection, so only the first of them
+pays the handshake latency. Masters are closed when the command finishes.
+"""
+import logging
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from . import runner
+
+# masters outlive the command by this number of seconds if not closed
+CONTROL_PERSIST = 60
+_ENV = "GIT_SSH_COMMAND"
+# the user's SSH command replaced while connections are multiplexed
+_original: Optional[Dict[str, Optional[str]]] = None
+_control_dir: Optional[str] = None
+
+
+def _get_config(
+    *args: str, cwd: Optional[str] = None
+) -> Optional[str]:
+    """Return `core.sshCommand` of a GIT config scope if set."""
+    result = runner.run(
+        ["config", *args, "--get", "core.sshCommand"],
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+    )
+    return result.stdout.strip() or None
+
+
+def _get_user_command() -> str:
+    """Return the SSH command of the user as GIT resolves it.
+
+    Repository scopes of `core.sshCommand` are resolved per project by
+    `get_env`.
+    """
+    command = os.environ.get(_ENV)
+    for scope in ("--global", "--system"):
+        command = command or _get_config(scope)
+    return command or shlex.quote(os.environ.get("GIT_SSH", "ssh"))
+
+
+def _supports_multiplexing(command: str) -> bool:
+    program = os.path.basename(shlex.split(command)[0])
+    if program not in ("ssh", "ssh.exe"):
+        logging.debug('"%s" does not support multiplexing', command)
+        return False
+    return True
+
+
+def _get_multiplexed(command: str, control_dir: str) -> str:
+    """Return an SSH command sharing masters under `control_dir`."""
+    if not _supports_multiplexing(command):
+        return command
+    return (
+        f"{command} -o ControlMaster=auto "
+        f"-o ControlPath={shlex.quote(control_dir)}/%C "
+        f"-o ControlPersist={CONTROL_PERSIST}"
+    )
+
+
+def _close_masters(ssh_command: str, control_dir: str) -> None:
+    for name in os.listdir(control_dir):
+        path = os.path.join(control_dir, name)
+        logging.debug('Closing SSH master "%s"', path)
+        # the host is ignored as the control path has no tokens
+        subprocess.run(
+            [
+                *shlex.split(ssh_command),
+                "-o",
+                f"ControlPath={path}",
+                "-O",
+                "exit",
+                "master",
+            ],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            check=False,
+        )
+
+
+@contextmanager
+def multiplexed() -> Iterator[None]:
+    """Multiplex SSH connections of GIT commands run in the context.
+
+    `GIT_SSH_COMMAND` is set for subprocesses, so connections to the same
+    host share a master. It extends the SSH command configured by the user
+    the way GIT resolves it: `GIT_SSH_COMMAND`, `core.sshCommand`, then
+    `GIT_SSH`. Masters are closed on exit.
+    """
+    global _original, _control_dir  # pylint:disable=global-statement
+    ssh_command = _get_user_command()
+    if (
+        not _supports_multiplexing(ssh_command)
+        or _original is not None
+    ):
+        yield
+        return
+
+    _control_dir = tempfile.mkdtemp(prefix="gw-ssh-")
+    _original = {_ENV: os.environ.get(_ENV)}
+    os.environ[_ENV] = _get_multiplexed(ssh_command, _control_dir)
+    try:
+        yield
+    finally:
+        _restore(os.environ, _original)
+        _original = None
+        _close_masters(ssh_command, _control_dir)
+        shutil.rmtree(_control_dir, ignore_errors=True)
+        _control_dir = None
+
+
+def _restore(env, original: Dict[str, Optional[str]]) -> None:
+    for name, value in original.items():
+        if value is None:
+            env.pop(name, None)
+        else:
+            env[name] = value
+
+
+def get_detached_env() -> Dict[str, str]:
+    """Return environment for processes outliving the current command.
+
+    Masters are closed when the command finishes, so such processes use
+    the user's SSH command.
+    """
+    env = dict(os.environ)
+    if _original is not None:
+        _restore(env, _original)
+    return env
+
+
+def get_env(directory: str) -> Dict[str, str]:
+    """Return environment overrides for network GIT commands in a clone.
+
+    `GIT_SSH_COMMAND` set by `multiplexed` takes precedence over
+    `core.sshCommand` of the clone, so the clone's command is multiplexed
+    in its place.
+    """
+    if _original is None or _original[_ENV] is not None:
+        return {}
+    command = _get_config("--local", cwd=directory)
+    if not command:
+        return {}
+    return {_ENV: _get_multiplexed(command, _control_dir)}
@@ -0,0 +1,76 @@
+"""Common fixtures for the tests."""
+# pylint:disable=missing-function-docstring
+import os
+import subprocess
+
+import pytest
+from git_workon import events, git
+
+
+class GitRepo:
+    """GIT repository of a test.
+
+    Test functions get it by `make_git_repo` fixture, `TestCase` classes
+    create it at a path of their own.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.git("init", "--quiet")
+
+    def git(self, *args: str, **kwargs) -> str:
+        return subprocess.run(
+            ["git", *args],
+            cwd=self.path,
+            capture_output=True,
+            text=True,
+            check=True,
+            **kwargs,
+        ).stdout
+
+    def add(self, *files: str) -> None:
+        self.git("add", *(files or ["--all"]))
+
+    def commit(self, message="dummy") -> None:
+        self.git("commit", "--allow-empty", "-m", message)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep cached data of the tests out of the user cache directory."""
+    path = tmp_path / "cache"
+    monkeypatch.setattr("git_workon.config._CACHE_DIR", str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def editor_cache():
+    """Resolve editors anew in every test."""
+    git.resolve_editor.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def events_buffer():
+    """Drop records of the tests instead of logging them."""
+    yield
+    events._buffer.clear()
+
+
+@pytest.fixture(name="make_git_repo")
+def fixture_make_git_repo(tmp_path):
+    """Return a factory of GIT repositories under the test directory."""
+
+    def make_git_repo(name="repo", initial_commit=True) -> GitRepo:
+        repo = GitRepo(str(tmp_path / name))
+        if initial_commit:
+            repo.commit("initial")
+        return repo
+
+    return make_git_repo
+
+
+@pytest.fixture(name="git_repo")
+def fixture_git_repo(make_git_repo):
+    """GIT repository with an initial commit."""
+    return make_git_repo()
@@ -0,0 +1,97 @@
+"""Tests for activity.py."""
+# pylint:disable=missing-function-docstring
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from git_workon import activity
+
+DAY = 24 * 3600
+
+
+@pytest.mark.parametrize(
+    "duration, seconds",
+    [("14d", 14 * DAY), ("2w", 14 * DAY), ("12h", 12 * 3600), ("90", 90)],
+)
+def test_parse_duration(duration, seconds):
+    assert activity.parse_duration(duration) == seconds
+
+
+def test_parse_invalid_duration():
+    with pytest.raises(ValueError):
+        activity.parse_duration("soon")
+
+
+@pytest.mark.parametrize(
+    "seconds, age", [(30, "now"), (3 * 3600, "3h"), (15 * DAY, "2w"), (DAY, "1d")]
+)
+def test_format_age(seconds, age):
+    assert activity.format_age(seconds) == age
+
+
+def _touch(path, mtime):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf8"):
+        pass
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture(name="project")
+def fixture_project(tmp_path):
+    old = time.time() - 30 * DAY
+    _touch(os.path.join(tmp_path, ".git", "logs", "HEAD"), old)
+    _touch(os.path.join(tmp_path, ".git", "index"), old)
+    _touch(os.path.join(tmp_path, "src", "main.py"), old)
+    for directory in (os.path.join(tmp_path, "src"), tmp_path):
+        os.utime(directory, (old, old))
+    return str(tmp_path), old
+
+
+def test_inactive_project(project):
+    path, old = project
+    assert activity.get_activity(path) == old
+
+
+def test_git_activity_found(project):
+    path, old = project
+    _touch(os.path.join(path, ".git", "logs", "HEAD"), old + DAY)
+    assert activity.get_activity(path) == old + DAY
+
+
+def test_worktree_edits_found(project):
+    path, old = project
+    _touch(os.path.join(path, "src", "main.py"), old + 2 * DAY)
+    assert activity.get_activity(path) == old + 2 * DAY
+
+
+def test_git_internals_not_sampled(project):
+    path, old = project
+    _touch(os.path.join(path, ".git", "FETCH_HEAD"), old + DAY)
+    os.utime(os.path.join(path, ".git"), (old, old))
+    assert activity.get_activity(path) == old
+
+
+def test_worktree_sampled(project):
+    path, old = project
+    _touch(os.path.join(path, "src", "main.py"), old + 2 * DAY)
+    assert activity.get_activity(path, sample_size=1) == old
+
+
+def test_linked_worktree(project, tmp_path_factory):
+    main_path, old = project
+    gitdir = os.path.join(main_path, ".git", "worktrees", "feature")
+    _touch(os.path.join(gitdir, "index"), old + DAY)
+    worktree = str(tmp_path_factory.mktemp("feature"))
+    with open(os.path.join(worktree, ".git"), "w", encoding="utf8") as file:
+        file.write(f"gitdir: {gitdir}\n")
+    os.utime(os.path.join(worktree, ".git"), (old, old))
+    os.utime(worktree, (old, old))
+
+    assert activity.get_activity(worktree) == old + DAY
+
+
+def test_activities_of_several_projects(project):
+    path, old = project
+    with patch("git_workon.activity.get_activity", return_value=old):
+        assert activity.get_activities([path, "other"]) == {path: old, "other": old}
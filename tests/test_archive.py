@@ -0,0 +1,165 @@
+"""Tests for archive.py module."""
+# pylint:disable=missing-function-docstring
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+import pytest
+from git_workon import archive, git
+
+
+def _git(*args, cwd):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def _write(path, content):
+    with open(path, "w", encoding="utf8") as file:
+        file.write(content)
+
+
+def _read(path):
+    with open(path, encoding="utf8") as file:
+        return file.read()
+
+
+@pytest.fixture(name="workon")
+def fixture_workon():
+    """Working directory with a `proj` cloned from a local bare remote."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        remote = os.path.join(tmp_dir, "proj.git")
+        _git("init", "--bare", remote, cwd=tmp_dir)
+        workon = git.WorkingDir(os.path.join(tmp_dir, "workon"))
+        proj = os.path.join(workon.directory, "proj")
+        _git("clone", remote, proj, cwd=tmp_dir)
+        _write(os.path.join(proj, "tracked"), "pushed")
+        _git("add", "tracked", cwd=proj)
+        _git("commit", "-m", "pushed", cwd=proj)
+        _git("push", "origin", "HEAD", cwd=proj)
+        yield workon, os.path.join(tmp_dir, "archive")
+
+
+def _make_unpushed_state(proj):
+    _git("checkout", "-b", "feature", cwd=proj)
+    _write(os.path.join(proj, "feature"), "feature")
+    _git("add", "feature", cwd=proj)
+    _git("commit", "-m", "unpushed", cwd=proj)
+    _git("tag", "v1", cwd=proj)
+    _write(os.path.join(proj, "tracked"), "stashed")
+    _git("stash", cwd=proj)
+    _write(os.path.join(proj, "tracked"), "uncommitted")
+    os.makedirs(os.path.join(proj, "new", "dir"))
+    _write(os.path.join(proj, "new", "dir", "untracked"), "untracked")
+
+
+@pytest.mark.parametrize("multi_threaded", [True, False])
+def test_unpushed_archived_and_restored(workon, multi_threaded):
+    workon, archive_dir = workon
+    proj = os.path.join(workon.directory, "proj")
+    _make_unpushed_state(proj)
+    head = _git("rev-parse", "HEAD", cwd=proj)
+
+    with patch(
+        "git_workon.archive.shutil.which",
+        side_effect=shutil.which if multi_threaded else lambda _: None,
+    ):
+        workon.archive("proj", archive_dir)
+        assert "proj" not in workon
+
+        workon.restore("proj", archive_dir, [])
+
+    assert _git("rev-parse", "--abbrev-ref", "HEAD", cwd=proj) == "feature"
+    assert _git("rev-parse", "HEAD", cwd=proj) == head
+    assert _git("tag", cwd=proj) == "v1"
+    assert _read(os.path.join(proj, "tracked")) == "uncommitted"
+    assert _read(os.path.join(proj, "new", "dir", "untracked")) == "untracked"
+    assert "WIP on feature: " in _git("stash", "list", cwd=proj)
+    assert not _git("for-each-ref", "refs/workon-stash", cwd=proj)
+    assert "+stashed" in _git("stash", "show", "-p", cwd=proj)
+
+
+def test_tags_and_detached_head_of_pushed_commits_restored(workon):
+    workon, archive_dir = workon
+    proj = os.path.join(workon.directory, "proj")
+    _git("tag", "v1", cwd=proj)
+    _git("tag", "-a", "v2", "-m", "annotated", cwd=proj)
+    _git("commit", "--allow-empty", "-m", "unpushed", cwd=proj)
+    _git("checkout", "--detach", "HEAD~1", cwd=proj)
+    pushed = _git("rev-parse", "HEAD", cwd=proj)
+    annotated = _git("rev-parse", "v2", cwd=proj)
+
+    workon.archive("proj", archive_dir)
+    workon.restore("proj", archive_dir, [])
+
+    assert _git("rev-parse", "v1", cwd=proj) == pushed
+    assert _git("rev-parse", "v2", cwd=proj) == annotated
+    assert _git("rev-parse", "HEAD", cwd=proj) == pushed
+    assert _git("rev-parse", "--abbrev-ref", "HEAD", cwd=proj) == "HEAD"
+    assert not _git("for-each-ref", "refs/workon-head", cwd=proj)
+
+
+def test_unpushed_detached_head_restored(workon):
+    workon, archive_dir = workon
+    proj = os.path.join(workon.directory, "proj")
+    _git("checkout", "--detach", cwd=proj)
+    _git("commit", "--allow-empty", "-m", "detached", cwd=proj)
+    head = _git("rev-parse", "HEAD", cwd=proj)
+
+    workon.archive("proj", archive_dir)
+    workon.restore("proj", archive_dir, [])
+
+    assert _git("rev-parse", "HEAD", cwd=proj) == head
+
+
+def test_nothing_unpushed_archived_without_bundle(workon):
+    workon, archive_dir = workon
+    path = archive.archive_project(os.path.join(workon.directory, "proj"), archive_dir)
+    assert not os.path.exists(os.path.join(path, "refs.bundle"))
+
+
+def test_full_archived_and_restored(workon):
+    workon, archive_dir = workon
+    proj = os.path.join(workon.directory, "proj")
+    _make_unpushed_state(proj)
+    status = _git("status", "--short", cwd=proj)
+
+    workon.archive("proj", archive_dir, archive.MODE_FULL)
+    assert "proj" not in workon
+
+    workon.restore("proj", archive_dir, [])
+    assert _git("status", "--short", cwd=proj) == status
+    assert "WIP on feature: " in _git("stash", "list", cwd=proj)
+
+
+def test_latest_archive_found(workon):
+    workon, archive_dir = workon
+    proj = os.path.join(workon.directory, "proj")
+    first = archive.archive_project(proj, archive_dir)
+    second = archive.archive_project(proj, archive_dir)
+
+    assert first != second
+    assert archive.find_archive(archive_dir, "proj") == second
+    assert archive.find_archive(archive_dir, "nonex") is None
+
+
+def test_no_archive_exception_raised(workon):
+    workon, archive_dir = workon
+    with pytest.raises(git.CommandError) as exc:
+        workon.restore("nonex", archive_dir, [])
+    assert "No archive" in str(exc.value)
+
+
+def test_failed_archive_project_kept(workon):
+    workon, archive_dir = workon
+    with patch(
+        "git_workon.archive._archive_untracked",
+        side_effect=archive.ArchiveError("Oops"),
+    ):
+        with pytest.raises(git.CommandError):
+            workon.archive("proj", archive_dir)
+
+    assert "proj" in workon
+    assert not os.listdir(os.path.join(archive_dir, "proj"))
@@ -3,11 +3,12 @@
 import os
 import sys
 import tempfile
+import time
 from unittest import TestCase
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
-from git_workon import cli, config, git
+from git_workon import cli, config, disk, doctor, events, git, maintenance, search
 
 
 class TestBase(TestCase):
@@ -96,7 +97,13 @@ class TestStartCommand(TestBase):
             cli.main()
 
         assert not self.mc_open.called
-        self.mc_clone.assert_called_once_with("my_project", ["any"])
+        self.mc_clone.assert_called_once_with(
+            "my_project",
+            ["any"],
+            submodule_jobs=None,
+            defer_lfs=False,
+            background=False,
+        )
 
     @patch(
         "git_workon.config.load_config",
@@ -115,9 +122,62 @@ class TestStartCommand(TestBase):
             ]
             cli.main()
 
-        self.mc_clone.assert_called_once_with("my_project", ["any"])
+        self.mc_clone.assert_called_once_with(
+            "my_project", ["any"], submodule_jobs=None, defer_lfs=False, background=True
+        )
         self.mc_open.assert_called_once_with("my_project", None)
 
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_submodules_and_deferred_lfs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "start",
+                "-d",
+                tmp_dir,
+                "-s",
+                "any",
+                "-n",
+                "--submodules",
+                "my_project",
+                "--defer-lfs",
+            ]
+            cli.main()
+
+        self.mc_clone.assert_called_once_with(
+            "my_project",
+            ["any"],
+            submodule_jobs=git.SUBMODULE_JOBS,
+            defer_lfs=True,
+            background=False,
+        )
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_submodule_jobs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "start",
+                "my_project",
+                "-d",
+                tmp_dir,
+                "-s",
+                "any",
+                "-n",
+                "--submodules",
+                "--submodule-jobs",
+                "3",
+            ]
+            cli.main()
+
+        assert self.mc_clone.call_args[1]["submodule_jobs"] == 3
+
     @patch(
         "git_workon.config.load_config",
         Mock(return_value=config.UserConfig(None, None, None)),
@@ -139,6 +199,166 @@ class TestStartCommand(TestBase):
         assert not self.mc_clone.called
         self.mc_open.assert_called_once_with(os.path.basename(project_name), None)
 
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.add_worktree")
+    def test_worktree_cloned_and_opened(self, mc_add_worktree):
+        mc_add_worktree.return_value = "my_project@feature-x"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "start",
+                "my_project@feature/x",
+                "-d",
+                tmp_dir,
+                "-s",
+                "any",
+            ]
+            cli.main()
+
+        self.mc_clone.assert_called_once_with(
+            "my_project", ["any"], submodule_jobs=None, defer_lfs=False, background=True
+        )
+        mc_add_worktree.assert_called_once_with("my_project", "feature/x")
+        self.mc_open.assert_called_once_with("my_project@feature-x", None)
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_wait_for_setup(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "start",
+                "my_project",
+                "--wait",
+                "-d",
+                tmp_dir,
+                "-s",
+                "any",
+            ]
+            cli.main()
+
+        assert self.mc_clone.call_args[1]["background"] is False
+        self.mc_open.assert_called_once_with("my_project", None)
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_several_projects_cloned_opened_once(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manifest = os.path.join(tmp_dir, "manifest")
+            with open(manifest, "w", encoding="utf8") as file:
+                file.write("# services\nthird\n\nfirst/\n")
+            sys.argv = [
+                "git_workon",
+                "start",
+                "first",
+                "second",
+                "-m",
+                manifest,
+                "-d",
+                tmp_dir,
+                "-s",
+                "any",
+            ]
+            cli.main()
+
+        assert sorted(call[0][0] for call in self.mc_clone.call_args_list) == [
+            "first",
+            "second",
+            "third",
+        ]
+        self.mc_open.assert_called_once_with("first", None)
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_several_projects_working_dir_opened(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "start",
+                "first",
+                "second",
+                "--open-dir",
+                "-d",
+                tmp_dir,
+                "-s",
+                "any",
+            ]
+            cli.main()
+
+        self.mc_open.assert_called_once_with(None, None)
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_failed_clones_reported(self):
+        def _clone(name, *_, **__):
+            if name == "second":
+                raise git.CommandError("oops")
+
+        self.mc_clone.side_effect = _clone
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "start",
+                "first",
+                "second",
+                "-d",
+                tmp_dir,
+                "-s",
+                "any",
+            ]
+            with pytest.raises(SystemExit) as exc:
+                cli.main()
+
+        assert exc.value.code == 1
+        assert self.mc_clone.call_count == 2
+        assert not self.mc_open.called
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_no_projects_error(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "start", "-d", tmp_dir, "-s", "any"]
+            with pytest.raises(SystemExit) as exc:
+                cli.main()
+
+        assert exc.value.code == 1
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None, archive_dir="arch")),
+    )
+    @patch("git_workon.git.WorkingDir.restore")
+    def test_restored_and_opened(self, mc_restore):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "start",
+                "my_project",
+                "-d",
+                tmp_dir,
+                "-s",
+                "any",
+                "--restore",
+            ]
+            cli.main()
+
+        assert not self.mc_clone.called
+        mc_restore.assert_called_once_with("my_project", "arch", ["any"])
+        self.mc_open.assert_called_once_with("my_project", None)
+
     @patch(
         "git_workon.config.load_config",
         Mock(return_value=config.UserConfig(None, None, None)),
@@ -158,7 +378,9 @@ class TestStartCommand(TestBase):
             ]
             cli.main()
 
-        self.mc_clone.assert_called_once_with("my_project", ["any"])
+        self.mc_clone.assert_called_once_with(
+            "my_project", ["any"], submodule_jobs=None, defer_lfs=False, background=True
+        )
         self.mc_open.assert_called_once_with("my_project", "code")
 
     @patch(
@@ -206,7 +428,13 @@ class TestStartCommand(TestBase):
                 tmp_dir,
             ]
             cli.main()
-        self.mc_clone.assert_called_once_with("my_project", ["third", "fourth"])
+        self.mc_clone.assert_called_once_with(
+            "my_project",
+            ["third", "fourth"],
+            submodule_jobs=None,
+            defer_lfs=False,
+            background=True,
+        )
 
     @patch(
         "git_workon.config.load_config",
@@ -227,7 +455,11 @@ class TestStartCommand(TestBase):
             ]
             cli.main()
         self.mc_clone.assert_called_once_with(
-            "my_project", ["first", "second", "third", "fourth"]
+            "my_project",
+            ["first", "second", "third", "fourth"],
+            submodule_jobs=None,
+            defer_lfs=False,
+            background=True,
         )
 
 
@@ -290,6 +522,56 @@ class TestDoneCommand(TestBase):
         assert not self.mc_open.called
         self.mc_remove.assert_called_once_with(None, False)
 
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.archive")
+    def test_archived_instead_of_removal(self, mc_archive):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for mode_args, mode in (
+                ([], "unpushed"),
+                (["--archive-mode", "full"], "full"),
+            ):
+                sys.argv = [
+                    "git_workon",
+                    "done",
+                    "-d",
+                    tmp_dir,
+                    "--archive-dir",
+                    "arch",
+                    "--archive",
+                    "my_project",
+                    *mode_args,
+                ]
+                cli.main()
+                mc_archive.assert_called_once_with("my_project", "arch", mode)
+                mc_archive.reset_mock()
+
+        assert not self.mc_remove.called
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.fetch", Mock(return_value={}))
+    def test_fetched_before_removal(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "done",
+                "my_project",
+                "-d",
+                tmp_dir,
+                "--fetch",
+                "--fetch-timeout",
+                "5",
+            ]
+            cli.main()
+
+        git.WorkingDir.fetch.assert_called_once_with("my_project", timeout=5)
+        self.mc_remove.assert_called_once_with("my_project", False)
+
     @patch(
         "git_workon.config.load_config",
         Mock(return_value=config.UserConfig(None, None, None)),
@@ -345,7 +627,9 @@ class TestShowCommand(TestBase):
             sys.argv = ["git_workon", "show", "-d", tmp_dir, "-n"]
             cli.main()
 
-            self.mc_show.assert_called_once_with(check_status=False)
+            self.mc_show.assert_called_once_with(
+                check_status=False, size=False, activity=False, stale=None
+            )
 
     @patch(
         "git_workon.config.load_config",
@@ -357,4 +641,341 @@ class TestShowCommand(TestBase):
             sys.argv = ["git_workon", "show", "-d", tmp_dir]
             cli.main()
 
-            self.mc_show.assert_called_once_with(check_status=True)
+            self.mc_show.assert_called_once_with(
+                check_status=True, size=False, activity=False, stale=None
+            )
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.fetch")
+    def test_show_with_fetch_failures_reported(self, mc_fetch):
+        mc_fetch.return_value = {"broken": "Failed to fetch"}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "show", "-d", tmp_dir, "--fetch"]
+            with patch("git_workon.cli.logging.warning") as mc_warning:
+                cli.main()
+
+        mc_fetch.assert_called_once_with(None, timeout=60)
+        mc_warning.assert_called_once_with(
+            'Failed to fetch "%s": %s', "broken", "Failed to fetch"
+        )
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_show_sorted_by_size(self):
+        self.mc_show.return_value = [
+            git.ProjectInfo("small", None, disk.DiskUsage(1, 0, 0)),
+            git.ProjectInfo("big", None, disk.DiskUsage(1024, 2048, 0)),
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "show", "-d", tmp_dir, "--sort", "size"]
+            with patch("git_workon.cli.logging.info") as mc_info:
+                cli.main()
+
+        self.mc_show.assert_called_once_with(
+            check_status=True, size=True, activity=False, stale=None
+        )
+        lines = mc_info.call_args[0][0].splitlines()
+        assert "big" in lines[0] and "3.0K" in lines[0]
+        assert "small" in lines[1]
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_show_setup_progress(self):
+        self.mc_show.return_value = [
+            git.ProjectInfo("big", None, setup="setup: deepen (0/2)"),
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "show", "-d", tmp_dir]
+            with patch("git_workon.cli.logging.info") as mc_info:
+                cli.main()
+
+        assert "big [setup: deepen (0/2)]" in mc_info.call_args[0][0]
+
+
+class TestShowActivity(TestBase):
+    """Tests for the show command activity options."""
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_sorted_by_activity(self):
+        now = time.time()
+        self.mc_show.return_value = [
+            git.ProjectInfo("recent", None, active_at=now),
+            git.ProjectInfo("old", None, active_at=now - 3 * 24 * 3600 - 1),
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "show", "-d", tmp_dir, "--sort", "activity"]
+            with patch("git_workon.cli.logging.info") as mc_info:
+                cli.main()
+
+        self.mc_show.assert_called_once_with(
+            check_status=True, size=False, activity=True, stale=None
+        )
+        assert mc_info.call_args[0][0].splitlines() == [
+            "old    active 3d ago",
+            "recent active now",
+        ]
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_stale_parsed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "show", "-d", tmp_dir, "--stale", "2w"]
+            cli.main()
+
+        self.mc_show.assert_called_once_with(
+            check_status=True, size=False, activity=False, stale=14 * 24 * 3600
+        )
+
+
+class TestGcCommand(TestBase):
+    """Tests for the gc command."""
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.gc", return_value=["old"])
+    def test_max_size_parsed(self, mc_gc):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "gc", "-d", tmp_dir, "--max-size", "50G"]
+            cli.main()
+
+        mc_gc.assert_called_once_with(50 * 1024**3, dry_run=False)
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_invalid_max_size_exit(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "gc", "-d", tmp_dir, "--max-size", "lots"]
+            with pytest.raises(SystemExit) as exc:
+                cli.main()
+        assert int(str(exc.value)) == 2
+
+
+class TestDoctorCommand(TestBase):
+    """Tests for the doctor command."""
+
+    diagnoses = {
+        "fast": doctor.Diagnosis({"unstaged": 0.1}),
+        "slow": doctor.Diagnosis(
+            {"unstaged": 2.0, "tags": 0.5},
+            [doctor.Issue("commit-graph", "no commit-graph", "git commit-graph write")],
+        ),
+    }
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.treat")
+    @patch("git_workon.git.WorkingDir.diagnose")
+    def test_issues_shown(self, mc_diagnose, mc_treat):
+        mc_diagnose.return_value = self.diagnoses
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "doctor", "-d", tmp_dir]
+            with patch("git_workon.cli.logging.info") as mc_info:
+                cli.main()
+
+        mc_diagnose.assert_called_once_with(None, git.REPORT_JOBS)
+        assert mc_info.call_args[0][0] == (
+            "slow: 2.5s (unstaged 2.0s, tags 0.5s)\n"
+            "  * no commit-graph (fix: git commit-graph write)"
+        )
+        assert not mc_treat.called
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.treat", return_value={"slow": "failed"})
+    @patch("git_workon.git.WorkingDir.diagnose")
+    def test_issues_fixed(self, mc_diagnose, mc_treat):
+        mc_diagnose.return_value = self.diagnoses
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "doctor",
+                "-d",
+                tmp_dir,
+                "slow",
+                "--fix",
+                "-j",
+                "2",
+            ]
+            with pytest.raises(SystemExit):
+                cli.main()
+
+        mc_diagnose.assert_called_once_with(["slow"], 2)
+        mc_treat.assert_called_once_with(self.diagnoses, 2)
+
+
+class TestMaintainCommand(TestBase):
+    """Tests for the maintain command."""
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.maintain")
+    def test_latency_deltas_shown(self, mc_maintain):
+        mc_maintain.return_value = {
+            "busy": maintenance.Maintenance(skipped="busy"),
+            "fast": maintenance.Maintenance(0.5, 0.4, ["repack"]),
+            "slow": maintenance.Maintenance(3.0, 1.0, ["repack"]),
+        }
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "maintain", "-d", tmp_dir, "-j", "2"]
+            with patch("git_workon.cli.logging.info") as mc_info:
+                cli.main()
+
+        mc_maintain.assert_called_once_with(None, 2)
+        assert [call[0][0] for call in mc_info.call_args_list] == [
+            "slow: checks 3.00s -> 1.00s (-2.00s)",
+            "fast: checks 0.50s -> 0.40s (-0.10s)",
+            "busy: skipped, busy",
+        ]
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.maintain")
+    def test_failures_reported(self, mc_maintain):
+        mc_maintain.return_value = {
+            "some": maintenance.Maintenance(1.0, 1.0, error="failed"),
+        }
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "maintain", "-d", tmp_dir, "some"]
+            with pytest.raises(SystemExit):
+                cli.main()
+
+        mc_maintain.assert_called_once_with(["some"], maintenance.JOBS)
+
+
+class TestGrepCommand(TestBase):
+    """Tests for the grep command."""
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    @patch("git_workon.git.WorkingDir.grep")
+    def test_results_prefixed_by_project(self, mc_grep):
+        mc_grep.return_value = iter([("some", "a.py:1:x"), ("other", "b.py:2:x")])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = [
+                "git_workon",
+                "grep",
+                "-d",
+                tmp_dir,
+                "-i",
+                "x",
+                "*.py",
+                "-p",
+                "some/",
+                "-p",
+                "other",
+                "--limit",
+                "2",
+            ]
+            with patch("git_workon.cli.logging.info") as mc_info:
+                cli.main()
+
+        mc_grep.assert_called_once_with(
+            search.get_grep_args("x", ["*.py"], ignore_case=True),
+            ["some", "other"],
+            search.JOBS,
+            2,
+            {},
+        )
+        assert [call[0] for call in mc_info.call_args_list] == [
+            ("%s/%s", "some", "a.py:1:x"),
+            ("%s/%s", "other", "b.py:2:x"),
+            ("Stopped at the limit of %d results", 2),
+        ]
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_failed_search_reported(self):
+        def _grep(*args):
+            args[-1]["some"] = "failed"
+            return iter([])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sys.argv = ["git_workon", "grep", "-d", tmp_dir, "x", "--limit", "0"]
+            with patch("git_workon.git.WorkingDir.grep", side_effect=_grep) as mc_grep:
+                with pytest.raises(SystemExit):
+                    cli.main()
+
+        assert mc_grep.call_args[0][:4] == (
+            search.get_grep_args("x", []),
+            None,
+            search.JOBS,
+            None,
+        )
+
+
+class TestStatsCommand(TestBase):
+    """Tests for the stats command."""
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_stats_shown(self):
+        events.record("clone", 2, source="origin")
+        events.record("clone", 1, ok=False, source="origin")
+        events.record("check", 0.5, project="some")
+
+        sys.argv = ["git_workon", "stats", "--since", "1d"]
+        with patch("git_workon.cli.logging.info") as mc_info:
+            cli.main()
+
+        assert mc_info.call_args[0][0] == (
+            "Clones: 1 times, p50 2.0s, p95 2.0s\n"
+            "Checks: 1 times, p50 0.5s, p95 0.5s\n"
+            "Slowest projects checks:\n"
+            "  some: 1 times, p50 0.5s, p95 0.5s\n"
+            "Sources:\n"
+            "  origin: 1/2 clones succeeded (50%)"
+        )
+
+    @patch(
+        "git_workon.config.load_config",
+        Mock(return_value=config.UserConfig(None, None, None)),
+    )
+    def test_commands_logged(self):
+        sys.argv = ["git_workon", "stats"]
+        with patch("git_workon.cli.logging.info") as mc_info:
+            cli.main()
+        mc_info.assert_called_once_with("No operations logged")
+
+        events.flush()
+        assert [
+            event["name"] for event in events.load() if event["kind"] == "command"
+        ] == ["stats"]
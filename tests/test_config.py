@@ -40,10 +40,17 @@ def test_get_config_wrong_json_file():
         "dir",
         "editor",
         "sources",
+        "archive_dir",
     ],
 )
 def test_get_config_invalid_config(whats_wrong):
-    config = {"dir": "some", "sources": ["some"], "editor": "some", whats_wrong: 1}
+    config = {
+        "dir": "some",
+        "sources": ["some"],
+        "editor": "some",
+        "archive_dir": "some",
+        whats_wrong: 1,
+    }
 
     with tempfile.NamedTemporaryFile("w+") as file:
         json.dump(config, file)
@@ -52,6 +59,53 @@ def test_get_config_invalid_config(whats_wrong):
             config_module.load_config(file.name)
 
 
+@pytest.mark.parametrize(
+    "projects",
+    [
+        ["big"],
+        {"big": "no"},
+        {"big": {"untracked": "none"}},
+        {"big": {"unknown": 1}},
+        {"big": {"profile": "huge"}},
+        {"big": {"sparse": "src"}},
+        {"big": {"sparse": [1]}},
+        {"big": {"resumable": "yes"}},
+        {"big": {"share": 1}},
+        {"big": {"upstream": ["url"]}},
+        {"big": {"post_clone": "make"}},
+        {"big": {"exclude": [1]}},
+    ],
+)
+def test_get_config_invalid_projects(projects):
+    with pytest.raises(config_module.ConfigError):
+        config_module.UserConfig(None, None, None, projects=projects)
+
+
+@pytest.mark.parametrize("sources", [[1], [["mirror", 2]], [{"url": "a"}]])
+def test_get_config_invalid_sources(sources):
+    with pytest.raises(config_module.ConfigError):
+        config_module.UserConfig(None, None, sources)
+
+
+def test_sources_with_mirrors():
+    assert config_module.UserConfig(None, None, ["a", ["b", "c"]]).sources == [
+        "a",
+        ["b", "c"],
+    ]
+
+
+def test_project_options_merged_in_order():
+    user_config = config_module.UserConfig(
+        None,
+        None,
+        None,
+        projects={"big-*": {"untracked": "no"}, "big-mono": {"untracked": "all"}},
+    )
+    assert user_config.project_options("big-mono") == {"untracked": "all"}
+    assert user_config.project_options("big-other") == {"untracked": "no"}
+    assert user_config.project_options("small") == {}
+
+
 def test_init_config_config_does_not_exist_created():
     with tempfile.TemporaryDirectory() as tmp_dir:
         path = os.path.join(tmp_dir, "config.json")
@@ -0,0 +1,88 @@
+"""Tests for disk.py module."""
+# pylint:disable=missing-function-docstring
+import os
+from unittest.mock import patch
+
+import pytest
+from git_workon import disk
+
+
+@pytest.fixture(name="project")
+def fixture_project(make_git_repo):
+    repo = make_git_repo(initial_commit=False)
+    with open(os.path.join(repo.path, "tracked"), "wb") as file:
+        file.write(b"0" * 8192)
+    repo.add("tracked")
+    os.mkdir(os.path.join(repo.path, "build"))
+    with open(os.path.join(repo.path, "build", "untracked"), "wb") as file:
+        file.write(b"0" * 16384)
+    return repo.path
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [(10, "10B"), (2048, "2.0K"), (5 * 1024**3, "5.0G"), (3 * 1024**4, "3.0T")],
+)
+def test_format_size(size, expected):
+    assert disk.format_size(size) == expected
+
+
+def test_usage_split(project):
+    usage = disk.get_usage([project])[project]
+
+    assert usage.worktree >= 8192
+    assert usage.untracked >= 16384
+    assert usage.objects > 0
+    assert usage.total == usage.objects + usage.worktree + usage.untracked
+
+
+def test_usage_cached_for_unchanged_tree(project):
+    expected = disk.get_usage([project])
+
+    with patch("git_workon.disk._scan") as mc_scan:
+        assert disk.get_usage([project]) == expected
+    assert not mc_scan.called
+
+
+def test_usage_refreshed_for_changed_tree(project):
+    disk.get_usage([project])
+    with open(os.path.join(project, "new"), "wb") as file:
+        file.write(b"0" * 4096)
+
+    with patch("git_workon.disk._scan", return_value=disk.DiskUsage(1, 2, 3)):
+        assert disk.get_usage([project])[project] == disk.DiskUsage(1, 2, 3)
+
+
+def test_usage_refreshed_for_nested_change(project):
+    nested = os.path.join(project, "build", "out")
+    os.mkdir(nested)
+    disk.get_usage([project])
+    with open(os.path.join(nested, "big"), "wb") as file:
+        file.write(b"0" * 4096)
+
+    with patch("git_workon.disk._scan", return_value=disk.DiskUsage(1, 2, 3)):
+        assert disk.get_usage([project])[project] == disk.DiskUsage(1, 2, 3)
+
+
+def test_usage_refreshed_after_ttl(project):
+    with patch("git_workon.disk.time.time", return_value=0):
+        disk.get_usage([project])
+
+    with patch("git_workon.disk.time.time", return_value=disk.CACHE_TTL + 1), patch(
+        "git_workon.disk._scan", return_value=disk.DiskUsage(1, 2, 3)
+    ) as mc_scan:
+        disk.get_usage([project])
+    assert mc_scan.called
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [("100", 100), ("2k", 2048), ("1.5M", 1572864), ("50G", 50 * 1024**3)],
+)
+def test_parse_size(size, expected):
+    assert disk.parse_size(size) == expected
+
+
+def test_parse_invalid_size():
+    with pytest.raises(ValueError):
+        disk.parse_size("50X")
@@ -0,0 +1,75 @@
+"""Tests for doctor.py."""
+# pylint:disable=missing-function-docstring
+import os
+from unittest.mock import patch
+
+import pytest
+from git_workon import doctor
+
+
+def test_missing_commit_graph_fixed(git_repo):
+    project = git_repo.path
+    diagnosis = doctor.diagnose(project, {"unstaged": 0.1}, {})
+    assert [issue.kind for issue in diagnosis.issues] == ["commit-graph"]
+
+    assert doctor.treat(project, diagnosis.issues) == diagnosis.issues
+    assert not doctor.diagnose(project, {}, {}).issues
+
+
+def test_slow_checks_reported(git_repo):
+    git_repo.git("commit-graph", "write", "--reachable")
+
+    diagnosis = doctor.diagnose(
+        git_repo.path,
+        {"unstaged": 3.0, "tags": 5.0, "stashes": 0.1},
+        {"stashes": 30},
+    )
+    assert [issue.kind for issue in diagnosis.issues] == [
+        "untracked",
+        "remote",
+        "stashes",
+    ]
+    assert not any(issue.fix for issue in diagnosis.issues)
+    assert diagnosis.latency == 8.1
+
+
+def test_too_many_objects_repacked(git_repo):
+    project = git_repo.path
+    git_repo.git("commit-graph", "write", "--reachable")
+    for i in range(3):
+        with open(os.path.join(project, "file"), "w", encoding="utf8") as file:
+            file.write(str(i))
+        git_repo.add("file")
+        git_repo.commit(str(i))
+
+    with patch("git_workon.doctor.LOOSE_OBJECTS_LIMIT", 5):
+        diagnosis = doctor.diagnose(project, {}, {})
+        assert [issue.kind for issue in diagnosis.issues] == ["loose-objects"]
+
+        doctor.treat(project, diagnosis.issues)
+        assert not doctor.diagnose(project, {}, {}).issues
+
+
+def test_repack_keeps_unreachable_objects(git_repo):
+    git_repo.git("config", "gc.pruneExpire", "never")
+    git_repo.git("commit-graph", "write", "--reachable")
+    blob = git_repo.git("hash-object", "-w", "--stdin", input="unreachable")
+    git_repo.git("pack-objects", ".git/objects/pack/pack", input=blob)
+    git_repo.git("prune-packed")
+
+    with patch("git_workon.doctor.PACKS_LIMIT", 0):
+        diagnosis = doctor.diagnose(git_repo.path, {}, {})
+        assert [issue.kind for issue in diagnosis.issues] == ["packs"]
+        doctor.treat(git_repo.path, diagnosis.issues)
+
+    git_repo.git("cat-file", "-e", blob.strip())
+
+
+def test_failed_fix_raises(tmp_path):
+    with pytest.raises(doctor.DoctorError):
+        doctor.treat(str(tmp_path), [doctor.Issue("packs", "", "git repack -a -d")])
+
+
+def test_not_a_git_project_reported(tmp_path):
+    diagnosis = doctor.diagnose(str(tmp_path), {}, {})
+    assert [issue.kind for issue in diagnosis.issues] == ["git"]
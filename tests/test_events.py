@@ -0,0 +1,76 @@
+"""Tests for events.py."""
+# pylint:disable=missing-function-docstring, protected-access
+from unittest.mock import patch
+
+import pytest
+from git_workon import events
+
+
+def test_records_logged_on_flush():
+    events.record("clone", 1.5, project="some", source="origin")
+    assert not events.load()
+
+    events.flush()
+    [event] = events.load()
+    assert event["kind"] == "clone"
+    assert event["duration"] == 1.5
+    assert event["ok"]
+    assert event["project"] == "some"
+
+
+def test_failed_operation_timed():
+    with pytest.raises(ValueError):
+        with events.timed("command", name="start") as fields:
+            fields["projects"] = 2
+            raise ValueError
+    events.flush()
+
+    [event] = events.load()
+    assert not event["ok"]
+    assert event["projects"] == 2
+
+
+def test_log_rotated():
+    with patch("git_workon.events.MAX_LOG_SIZE", 10), patch(
+        "git_workon.events.ROTATIONS", 2
+    ):
+        for i in range(4):
+            events.record("command", i)
+            events.flush()
+
+        assert [event["duration"] for event in events.load()] == [1, 2, 3]
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert events.percentile(values, 50) == 50
+    assert events.percentile(values, 95) == 95
+    assert events.percentile([3], 95) == 3
+
+
+def test_stats():
+    for duration in (1, 2, 10):
+        events.record("clone", duration, source="fast")
+    events.record("clone", 30, ok=False, source="slow")
+    for project, duration in (("big", 5), ("big", 7), ("small", 0.1)):
+        events.record("check", duration, project=project)
+    events.record("command", 3, name="start")
+    events.record("git", 1, command="status")
+    events.flush()
+
+    stats = events.get_stats()
+
+    assert stats.clones == events.Timing(3, 2, 10)
+    assert stats.checks == events.Timing(3, 5, 7)
+    assert stats.commands == {"start": events.Timing(1, 3, 3)}
+    assert [project for project, _ in stats.slowest_projects] == ["big", "small"]
+    assert stats.sources == {"fast": (3, 0), "slow": (0, 1)}
+
+
+def test_stats_since():
+    with patch("git_workon.events.time.time", return_value=100):
+        events.record("command", 1, name="old")
+    events.record("command", 1, name="new")
+    events.flush()
+
+    assert list(events.get_stats(since=1000).commands) == ["new"]
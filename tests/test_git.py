@@ -1,149 +1,392 @@
 """Tests for git.py."""
-# pylint:disable=missing-function-docstring, no-self-use
+# pylint:disable=missing-function-docstring, no-self-use, protected-access
 import os
 import re
 import shutil
 import subprocess
+import sys
 import tempfile
+import threading
+import time
 from collections import namedtuple
 from dataclasses import dataclass
-from typing import Iterable
 from unittest import TestCase
 from unittest.mock import Mock, call, patch
 
 import pytest
-from git_workon import git
+from git_workon import config, disk, events, git, metadata, search, sources, ssh
+
+from .conftest import GitRepo
 
 DummyGitProject = namedtuple("DummyProject", ["name", "path"])
 
 
-class TmpGitDir:
-    """Temporary GIT directory."""
+def test_is_git_dir(make_git_repo):
+    assert git.is_git_dir(make_git_repo(initial_commit=False).path)
 
-    def __init__(self, initial_commit=False) -> None:
-        self.path = tempfile.mkdtemp()
-        self.initial_commit = initial_commit
+    with tempfile.TemporaryDirectory() as tmp_dir_path:
+        assert not git.is_git_dir(tmp_dir_path)
 
-        self._git_init()
 
-    def _git_init(self):
-        subprocess.run(["git", "init"], cwd=self.path, check=True)
+def test_check_all_pushed_everything_is_pushed_returns_none(make_git_repo):
+    """If everything is pushed, the function should return None."""
+    git_repo = make_git_repo(initial_commit=False)
+    with patch("git_workon.git.subprocess.run") as mc_run:
+        mc_run.return_value = Mock(stderr="Everything up-to-date", stdout="")
+        assert git.check_all_pushed(git_repo.path) is None
 
-        if self.initial_commit:
-            os.mknod(os.path.join(self.path, "some"))
-            self.add()
-            self.commit()
 
-    def add(self, files: Iterable[str] = None):
-        if not files:
-            subprocess.run(["git", "add", "--all"], cwd=self.path, check=True)
-        else:
-            for file in files:
-                subprocess.run(["git", "add", file], cwd=self.path, check=True)
+def test_check_all_pushed_there_is_some_stash_raises_exception(git_repo):
+    """If everything is pushed, the function should return None."""
+    os.mknod(os.path.join(git_repo.path, "1.txt"))
+    git_repo.git("stash", "--include-untracked")
+    pattern = r"stash@\{0\}: WIP on master: .+? initial"
 
-    def stash(self, include_untracked=True):
-        command = ["git", "stash"]
-        if include_untracked:
-            command.append("--include-untracked")
+    with pytest.raises(git.GITError) as exc:
+        git.check_all_pushed(git_repo.path)
+    assert re.search(pattern, str(exc.value))
 
-        subprocess.run(command, cwd=self.path, check=True)
 
-    def checkout(self, branch, create=True):
-        command = ["git", "checkout", "-b" if create else "", branch]
-        subprocess.run(command, cwd=self.path, check=True)
+def test_check_all_pushed_branch_raises_exception(git_repo):
+    git_repo.git("checkout", "-b", "test")
+    os.mknod(os.path.join(git_repo.path, "1.txt"))
+    git_repo.add()
+    git_repo.commit("example")
 
-    def commit(self, message="dummy"):
-        subprocess.run(["git", "commit", "-m", message], cwd=self.path, check=True)
+    with pytest.raises(git.GITError) as exc:
+        git.check_all_pushed(git_repo.path)
+    assert re.search(r"^master: \w+ initial$", str(exc.value), re.M)
+    assert re.search(r"^test: \w+ example$", str(exc.value), re.M)
 
-    def __enter__(self):
-        return self
 
-    def __exit__(self, *_):
-        shutil.rmtree(self.path)
+def test_check_all_pushed_with_unstaged_returns_info(git_repo):
+    git_repo.git("checkout", "-b", "test")
+    os.mknod(os.path.join(git_repo.path, "1.txt"))
 
+    with pytest.raises(git.GITError) as exc:
+        git.check_all_pushed(git_repo.path)
+    assert "?? 1.txt\n" in str(exc.value)
 
-def test_is_git_dir():
-    with TmpGitDir() as git_dir:
-        assert git.is_git_dir(git_dir.path)
 
-    with tempfile.TemporaryDirectory() as tmp_dir_path:
-        assert not git.is_git_dir(tmp_dir_path)
+def test_check_all_pushed_untracked_files_skipped(git_repo):
+    os.mknod(os.path.join(git_repo.path, "1.txt"))
 
+    with pytest.raises(git.GITError) as exc:
+        git.check_all_pushed(git_repo.path, untracked="no")
+    assert "1.txt" not in str(exc.value)
 
-def test_check_all_pushed_everything_is_pushed_returns_none():
-    """If everything is pushed, the function should return None."""
-    with TmpGitDir() as git_repo:
-        with patch("git_workon.git.subprocess.run") as mc_run:
-            mc_run.return_value = Mock(stderr="Everything up-to-date", stdout="")
-            assert git.check_all_pushed(git_repo.path) is None
 
+def test_unstaged_info_excluded_paths_skipped(git_repo):
+    os.mkdir(os.path.join(git_repo.path, "build"))
+    os.mknod(os.path.join(git_repo.path, "build", "out.o"))
+    os.mknod(os.path.join(git_repo.path, "1.txt"))
 
-def test_check_all_pushed_there_is_some_stash_raises_exception():
-    """If everything is pushed, the function should return None."""
-    with TmpGitDir(initial_commit=True) as git_dir:
-        os.mknod(os.path.join(git_dir.path, "1.txt"))
-        git_dir.stash()
-        pattern = r"stash@\{0\}: WIP on master: .+? dummy"
+    info = git._get_unstaged_info(git_repo.path, exclude=["build"])
+    assert info.lines == ["?? 1.txt"]
+
+
+def test_unstaged_info_uses_untracked_cache(git_repo):
+    with patch("git_workon.git._stream_command") as mc_stream:
+        git._get_unstaged_info(git_repo.path, untracked="all")
+    command = mc_stream.call_args[0][0]
+    assert "-c core.untrackedCache=true" in command
+    assert command.endswith("status --short --untracked-files=all")
+
+
+def test_unstaged_info_project_untracked_cache_respected(git_repo):
+    git_repo.git("config", "core.untrackedCache", "false")
+    command = git._get_status_command(git_repo.path, "normal")
+    assert "core.untrackedCache" not in command
+
+
+@patch("git_workon.git._fsmonitor_supported", None)
+def test_fsmonitor_support_probed_in_project(git_repo):
+    with patch("git_workon.git._run_command", wraps=git._run_command) as mc_run:
+        assert not git._is_fsmonitor_supported(tempfile.gettempdir())
+        assert git._fsmonitor_supported is None
+
+        supported = git._is_fsmonitor_supported(git_repo.path)
+        mc_run.assert_called_with("git fsmonitor--daemon status", cwd=git_repo.path)
+    assert git._fsmonitor_supported is supported
+    assert supported == (sys.platform in ("darwin", "win32"))
 
-        with pytest.raises(git.GITError) as exc:
-            git.check_all_pushed(git_dir.path)
-        assert re.search(pattern, str(exc.value))
 
+def test_unstaged_info_slow_status_warned(caplog, git_repo):
+    with patch("git_workon.git.time.monotonic", Mock(side_effect=[0, 5])):
+        git._get_unstaged_info(git_repo.path)
+    assert "took 5.0s" in caplog.text
+    assert '"untracked" project option' in caplog.text
 
-def test_check_all_pushed_branch_raises_exception():
-    with TmpGitDir(initial_commit=True) as git_dir:
-        git_dir.checkout("test")
-        os.mknod(os.path.join(git_dir.path, "1.txt"))
-        git_dir.add()
-        git_dir.commit("example")
 
+def test_check_all_pushed_tags_no_remote_raises_exception(make_git_repo):
+    git_repo = make_git_repo(initial_commit=False)
+    with pytest.raises(git.GITError) as exc:
+        git.check_all_pushed(git_repo.path)
+    assert "Failed to check unpushed tags" in str(exc.value)
+
+
+def test_check_all_pushed_tags_with_unpushed_raises_exception(git_repo):
+    with patch("git_workon.git.subprocess.run") as mc_run:
+        mc_run.return_value = Mock(
+            stderr="* [new tag]         1.1.0 -> 1.1.0", stdout=""
+        )
+        with pytest.raises(git.GITError) as exc:
+            git.check_all_pushed(git_repo.path)
+        assert "Tags:\n1.1.0\n" in str(exc.value)
+
+
+def test_check_all_all_entities_are_unpushed_raises_exception(git_repo):
+    with patch("git_workon.git._stream_command") as mc_stream, patch(
+        "git_workon.git.subprocess.run"
+    ) as mc_run:
+        mc_stream.side_effect = [
+            git.CappedOutput(["?? 1.txt"], 1),
+            git.CappedOutput(["refs/heads/master\tabc dummy"], 1),
+            git.CappedOutput(["stash{0}"], 1),
+        ]
+        mc_run.return_value = Mock(
+            stderr="* [new tag]         1.1.0 -> 1.1.0", stdout=""
+        )
         with pytest.raises(git.GITError) as exc:
-            git.check_all_pushed(git_dir.path)
-        assert "(master) dummy" in str(exc.value)
-        assert "(HEAD -> test) example" in str(exc.value)
+            git.check_all_pushed(git_repo.path)
+        for entity in "Stashes", "Commits", "Not staged", "Tags":
+            assert entity in str(exc.value)
 
 
-def test_check_all_pushed_with_unstaged_returns_info():
-    with TmpGitDir(initial_commit=True) as git_dir:
-        git_dir.checkout("test")
-        os.mknod(os.path.join(git_dir.path, "1.txt"))
+class TestReport(TestCase):
+    """Tests for structured reports of unpushed entities."""
+
+    def setUp(self) -> None:
+        self.origin = GitRepo(tempfile.mkdtemp())
+        self.origin.commit()
+        self.path = os.path.join(tempfile.mkdtemp(), "clone")
+        subprocess.run(
+            ["git", "clone", f"file://{self.origin.path}", self.path], check=True
+        )
 
+    def tearDown(self) -> None:
+        shutil.rmtree(self.origin.path)
+        shutil.rmtree(os.path.dirname(self.path))
+
+    def _git(self, *command):
+        subprocess.run(["git", *command], cwd=self.path, check=True)
+
+    def test_clean_project(self):
+        report = git.get_report(self.path)
+
+        assert report.clean
+        assert report == git.ProjectReport(self.path, timings=report.timings)
+        assert set(report.timings) == {
+            "unstaged",
+            "commits",
+            "stashes",
+            "tags",
+            "submodules",
+        }
+
+    def test_all_entities_reported(self):
+        os.mknod(os.path.join(self.path, "stashed"))
+        self._git("stash", "--include-untracked")
+        self._git("checkout", "-b", "feature")
+        self._git("commit", "--allow-empty", "-m", "first feature")
+        self._git("commit", "--allow-empty", "-m", "second feature")
+        self._git("tag", "v1.0")
+        os.mknod(os.path.join(self.path, "1.txt"))
+
+        report = git.get_report(self.path)
+
+        assert not report.clean
+        assert report.unstaged == ["?? 1.txt"]
+        assert len(report.stashes) == 1
+        assert list(report.commits) == ["feature"]
+        assert [commit.split(" ", 1)[1] for commit in report.commits["feature"]] == [
+            "second feature",
+            "first feature",
+        ]
+        assert report.tags == ["v1.0"]
+        assert report.totals == {"unstaged": 1, "commits": 2, "stashes": 1, "tags": 1}
+        assert not report.errors
+
+    def test_capped_to_limit(self):
+        for i in range(3):
+            os.mknod(os.path.join(self.path, f"{i}.txt"))
+
+        report = git.get_report(self.path, limit=2)
+        assert len(report.unstaged) == 2
+        assert report.totals["unstaged"] == 3
+
+    def test_failed_check_reported(self):
+        self._git("remote", "remove", "origin")
+
+        report = git.get_report(self.path)
+        assert not report.clean
+        assert [error.split(":")[0] for error in report.errors] == ["tags"]
+
+    def test_failed_status_reported(self):
+        with open(
+            os.path.join(self.path, ".git", "index"), "w", encoding="utf8"
+        ) as file:
+            file.write("corrupted")
+
+        report = git.get_report(self.path)
+        assert not report.clean
+        assert [error.split(":")[0] for error in report.errors] == ["unstaged"]
         with pytest.raises(git.GITError) as exc:
-            git.check_all_pushed(git_dir.path)
-        assert "?? 1.txt\n" in str(exc.value)
+            git.check_all_pushed(self.path)
+        assert "Errors:\nunstaged: Failed to run" in str(exc.value)
+
+    def test_working_dir_diagnosed_and_treated(self):
+        workon = git.WorkingDir(os.path.dirname(self.path))
+
+        diagnoses = workon.diagnose()
+        assert list(diagnoses) == ["clone"]
+        assert [issue.kind for issue in diagnoses["clone"].issues] == ["commit-graph"]
+        assert "tags" in diagnoses["clone"].timings
+
+        assert workon.treat(diagnoses) == {}
+        assert not workon.diagnose(["clone"])["clone"].issues
+
+    def test_working_dir_maintained(self):
+        workon = git.WorkingDir(os.path.dirname(self.path))
+
+        [result] = workon.maintain().values()
+        assert result.tasks == ["pack-refs", "repack", "prune", "commit-graph"]
+        assert result.before is not None and result.after is not None
+        assert not result.skipped and not result.error
 
+    def test_open_and_locked_projects_not_maintained(self):
+        workon = git.WorkingDir(os.path.dirname(self.path))
 
-def test_check_all_pushed_tags_no_remote_raises_exception():
-    with TmpGitDir() as git_dir:
+        with patch("git_workon.maintenance.get_open_paths", return_value={self.path}):
+            assert workon.maintain()["clone"].skipped == "open"
+        with workon._lock("clone"):
+            assert workon.maintain()["clone"].skipped == "busy"
+
+    def test_working_dir_searched(self):
+        workon = git.WorkingDir(os.path.dirname(self.path))
+        os.mkdir(os.path.join(workon.directory, "not_git"))
+        with open(os.path.join(self.path, "file"), "w", encoding="utf8") as file:
+            file.write("needle")
+        self._git("add", "file")
+
+        assert list(workon.grep(search.get_grep_args("needle"))) == [
+            ("clone", "file:1:needle")
+        ]
+        with pytest.raises(git.CommandError):
+            workon.grep(["grep", "needle"], ["not_git"])
+
+    def test_reports_concurrently(self):
+        os.mknod(os.path.join(self.origin.path, "1.txt"))
+
+        reports = git.get_reports([self.path, self.origin.path], jobs=2)
+        assert reports[self.path].clean
+        assert reports[self.origin.path].unstaged == ["?? 1.txt"]
+
+
+def test_check_all_pushed_huge_output_capped(git_repo):
+    for i in range(git.MAX_SHOWN_LINES + 10):
+        os.mknod(os.path.join(git_repo.path, f"{i}.txt"))
+
+    with pytest.raises(git.GITError) as exc:
+        git.check_all_pushed(git_repo.path)
+    assert str(exc.value).count("?? ") == git.MAX_SHOWN_LINES
+    assert f"... 60 unstaged files (first {git.MAX_SHOWN_LINES} shown)" in str(
+        exc.value
+    )
+
+
+def test_check_all_pushed_verdict_only_stops_on_first_entity(git_repo):
+    os.mknod(os.path.join(git_repo.path, "1.txt"))
+    os.mknod(os.path.join(git_repo.path, "2.txt"))
+
+    with patch(
+        "git_workon.git._stream_command", wraps=git._stream_command
+    ) as mc_stream, patch("git_workon.git._get_unpushed_tag_names") as mc_tags:
+        with pytest.raises(git.GITError):
+            git.check_all_pushed(git_repo.path, verdict_only=True)
+    mc_stream.assert_called_once()
+    assert mc_stream.call_args[1]["stop_after"] == 1
+    assert not mc_tags.called
+
+
+class TestSubmodules(TestCase):
+    """Tests for projects with submodules."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        submodule = GitRepo(os.path.join(self.directory, "sub.git"))
+        os.mknod(os.path.join(submodule.path, "some"))
+        submodule.add()
+        submodule.commit()
+        self.submodule = submodule.path
+        superproject = GitRepo(os.path.join(self.directory, "super.git"))
+        superproject.git(
+            "-c",
+            "protocol.file.allow=always",
+            "submodule",
+            "add",
+            f"file://{self.submodule}",
+            "sub",
+        )
+        superproject.commit()
+        self.superproject = superproject.path
+
+        self.patch_env = patch.dict(
+            os.environ,
+            {
+                "GIT_CONFIG_COUNT": "1",
+                "GIT_CONFIG_KEY_0": "protocol.file.allow",
+                "GIT_CONFIG_VALUE_0": "always",
+            },
+        )
+        self.patch_env.start()
+        self.clone = os.path.join(self.directory, "clone")
+        git.clone(f"file://{self.superproject}", self.clone, submodule_jobs=2)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.patch_env.stop()
+        shutil.rmtree(self.directory)
+        return super().tearDown()
+
+    def test_submodules_cloned(self):
+        assert os.path.isfile(os.path.join(self.clone, "sub", "some"))
+        assert not git.is_worktree(os.path.join(self.clone, "sub"))
+
+    @patch("git_workon.git._get_unpushed_tag_names", Mock(return_value=[]))
+    def test_submodule_checked(self):
+        git.check_all_pushed(self.clone)
+
+        subprocess.run(
+            ["git", "stash", "store", "-m", "stash", "HEAD"],
+            cwd=os.path.join(self.clone, "sub"),
+            check=True,
+        )
         with pytest.raises(git.GITError) as exc:
-            git.check_all_pushed(git_dir.path)
-        assert "Failed to check unpushed tags" in str(exc.value)
+            git.check_all_pushed(self.clone)
+        assert 'Submodules:\n"sub":\nStashes:' in str(exc.value)
 
+        with pytest.raises(git.GITError):
+            git.check_all_pushed(self.clone, verdict_only=True)
 
-def test_check_all_pushed_tags_with_unpushed_raises_exception():
-    with TmpGitDir(initial_commit=True) as git_dir:
-        with patch("git_workon.git.subprocess.run") as mc_run:
-            mc_run.return_value = Mock(
-                stderr="* [new tag]         1.1.0 -> 1.1.0", stdout=""
-            )
-            with pytest.raises(git.GITError) as exc:
-                git.check_all_pushed(git_dir.path)
-            assert "1.1.0 -> 1.1.0" in str(exc.value)
-
-
-def test_check_all_all_entities_are_unpushed_raises_exception():
-    with TmpGitDir(initial_commit=True) as git_dir:
-        with patch("git_workon.git.subprocess.run") as mc_run:
-            mc_run.side_effect = [
-                Mock(stdout="?? 1.txt\n"),
-                Mock(stdout="stash{0}"),
-                Mock(stdout="(master) dummy\n(HEAD -> test) example"),
-                Mock(stderr="* [new tag]         1.1.0 -> 1.1.0", stdout=""),
-            ]
-            with pytest.raises(git.GITError) as exc:
-                git.check_all_pushed(git_dir.path)
-            for entity in "Stashes", "Commits", "Not staged", "Tags":
-                assert entity in str(exc.value)
+
+def test_clone_lfs_deferred():
+    with patch("git_workon.git._run_command") as mc_run:
+        git.clone("source", "destination", defer_lfs=True)
+    assert mc_run.call_args[1]["env"] == {"GIT_LFS_SKIP_SMUDGE": "1"}
+
+
+def test_stream_command_failure_raised():
+    with tempfile.TemporaryDirectory() as directory, pytest.raises(git.GITError) as exc:
+        git._stream_command("git stash list", cwd=directory)
+    assert "not a git repository" in str(exc.value)
+
+
+def test_stream_command_counts_all_lines():
+    output = git._stream_command("seq 1000", limit=3)
+    assert output.lines == ["1", "2", "3"]
+    assert output.total == 1000
+    assert "... 1,000 numbers (first 3 shown)" in output.describe("numbers")
 
 
 @patch("git_workon.git.subprocess.run")
@@ -205,6 +448,206 @@ class TestWorkingDirBase(TestCase):
         return DummyGitProject(os.path.basename(proj_dir), proj_dir)
 
 
+class TestWorktrees(TestWorkingDirBase):
+    """Tests for projects checked out as worktrees."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.main = os.path.join(self.directory, "proj")
+        os.mkdir(self.main)
+        subprocess.run(["git", "init"], cwd=self.main, check=True)
+        subprocess.run(
+            ["git", "commit", "--allow-empty", "-m", "dummy"], cwd=self.main, check=True
+        )
+
+    def test_split_project_name(self):
+        assert git.split_project_name("proj") == ("proj", None)
+        assert git.split_project_name("proj@feature/x") == ("proj", "feature/x")
+
+    def test_new_branch_worktree_added(self):
+        name = self.workon.add_worktree("proj", "feature/x")
+
+        assert name == "proj@feature-x"
+        path = os.path.join(self.directory, name)
+        assert git.is_worktree(path)
+        assert git.get_worktrees(self.main) == [path]
+
+    def test_existing_worktree_reused(self):
+        name = self.workon.add_worktree("proj", "test")
+        assert self.workon.add_worktree("proj", "test") == name
+
+    def test_no_project_exception_raised(self):
+        with pytest.raises(git.CommandError):
+            self.workon.add_worktree("nonex", "test")
+
+    def test_worktree_branch_is_not_checked(self):
+        name = self.workon.add_worktree("proj", "test")
+        assert git.check_all_pushed(os.path.join(self.directory, name)) is None
+
+    def test_worktree_unstaged_checked(self):
+        name = self.workon.add_worktree("proj", "test")
+        os.mknod(os.path.join(self.directory, name, "1.txt"))
+
+        with pytest.raises(git.GITError) as exc:
+            git.check_all_pushed(os.path.join(self.directory, name))
+        assert "?? 1.txt" in str(exc.value)
+
+    def test_main_clone_with_worktrees_not_removed(self):
+        self.workon.add_worktree("proj", "test")
+
+        with pytest.raises(git.CommandError) as exc:
+            self.workon.remove("proj", force=True)
+        assert "live worktrees" in str(exc.value)
+        assert os.path.exists(self.main)
+
+    @patch("git_workon.git._get_unpushed_tag_names", Mock(return_value=[]))
+    def test_worktree_removed_branch_kept(self):
+        self.workon.add_worktree("proj", "test")
+        self.workon.remove("proj@test")
+
+        assert self.workon._dirs == ["proj"]
+        assert not git.get_worktrees(self.main)
+        subprocess.run(
+            ["git", "rev-parse", "--verify", "test"], cwd=self.main, check=True
+        )
+
+    def test_failed_worktree_removal_reported(self):
+        name = self.workon.add_worktree("proj", "test")
+        path = os.path.join(self.directory, name)
+        subprocess.run(["git", "worktree", "lock", path], cwd=self.main, check=True)
+
+        with pytest.raises(git.CommandError) as exc:
+            self.workon.remove(name, force=True)
+        assert "Failed to remove" in str(exc.value)
+        assert os.path.exists(path)
+
+    def test_all_projects_worktrees_removed_first(self):
+        self.workon.add_worktree("proj", "test")
+        self.workon.remove(force=True)
+
+        assert not self.workon._dirs
+
+
+@pytest.mark.parametrize(
+    "url, host",
+    [
+        ("https://github.com/user/a.git", "github.com"),
+        ("ssh://git@example.com:2222/user/a.git", "example.com"),
+        ("git@github.com:user/a.git", "github.com"),
+        ("github.com:user/a.git", "github.com"),
+        ("/srv/git/a.git", "localhost"),
+        ("file:///srv/git/a.git", "localhost"),
+    ],
+)
+def test_get_remote_host(url, host):
+    assert git.get_remote_host(url) == host
+
+
+def test_fetch_all_limited_per_host():
+    running = {"localhost": 0, "example.com": 0}
+    max_running = dict(running)
+    lock = threading.Lock()
+
+    def _fetch(directory, *_):
+        host = "example.com" if "remote" in directory else "localhost"
+        with lock:
+            running[host] += 1
+            max_running[host] = max(max_running[host], running[host])
+        time.sleep(0.05)
+        with lock:
+            running[host] -= 1
+
+    directories = [f"local{i}" for i in range(4)] + [f"remote{i}" for i in range(4)]
+    with patch("git_workon.git._get_remotes") as mc_remotes, patch(
+        "git_workon.git.fetch", side_effect=_fetch
+    ):
+        mc_remotes.side_effect = lambda directory: {
+            "origin": "git@example.com:a" if "remote" in directory else "/a"
+        }
+        assert not git.fetch_all(directories, jobs=8, jobs_per_host=2)
+
+    assert max_running == {"localhost": 2, "example.com": 2}
+
+
+class TestFetch(TestWorkingDirBase):
+    """Tests for fetching projects against local bare remotes."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.remote = tempfile.mkdtemp()
+        subprocess.run(["git", "init", "--bare", self.remote], check=True)
+        self.upstream = os.path.join(self.remote, "upstream")
+        subprocess.run(["git", "clone", self.remote, self.upstream], check=True)
+        self._push_commit()
+        subprocess.run(
+            ["git", "clone", self.remote, os.path.join(self.directory, "proj")],
+            check=True,
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.remote)
+        return super().tearDown()
+
+    def _push_commit(self) -> str:
+        subprocess.run(
+            ["git", "commit", "--allow-empty", "-m", "dummy"],
+            cwd=self.upstream,
+            check=True,
+        )
+        subprocess.run(["git", "push", "origin", "HEAD"], cwd=self.upstream, check=True)
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=self.upstream,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    def test_remote_refs_updated(self):
+        head = self._push_commit()
+
+        assert not self.workon.fetch()
+        assert (
+            subprocess.run(
+                ["git", "rev-parse", "origin/master"],
+                cwd=os.path.join(self.directory, "proj"),
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+            == head
+        )
+
+    def test_failed_fetches_reported(self):
+        broken = os.path.join(self.directory, "broken")
+        subprocess.run(["git", "init", broken], check=True)
+        subprocess.run(
+            ["git", "remote", "add", "origin", "/nonexistent/repo.git"],
+            cwd=broken,
+            check=True,
+        )
+
+        errors = self.workon.fetch()
+        assert list(errors) == ["broken"]
+        assert "Failed to fetch" in errors["broken"]
+
+    def test_one_project_fetched(self):
+        with patch("git_workon.git.fetch_all", return_value={}) as mc_fetch_all:
+            self.workon.fetch("proj", timeout=5)
+        mc_fetch_all.assert_called_once_with(
+            [os.path.join(self.directory, "proj")], timeout=5
+        )
+
+    def test_timeout_reported(self):
+        with patch(
+            "git_workon.git.subprocess.run",
+            side_effect=subprocess.TimeoutExpired("git fetch", 1),
+        ):
+            with pytest.raises(git.GITError) as exc:
+                git.fetch(os.path.join(self.directory, "proj"), "origin", 1)
+        assert "timed out" in str(exc.value)
+
+
 class TestInit(TestWorkingDirBase):
     """Tests for initialization."""
 
@@ -247,7 +690,7 @@ class TestRemove(TestWorkingDirBase):
         os.mkfifo(os.path.join(self.workon.directory, "tmppipe"), 0o600)
 
         self.workon.remove()
-        assert len(os.listdir(self.workon.directory)) == 5
+        assert len(self.workon._dirs) == 5
 
     @patch(
         "git_workon.git.check_all_pushed",
@@ -277,7 +720,122 @@ class TestRemove(TestWorkingDirBase):
         mc_check_all_pushed.side_effect = (git.GITError, None, git.GITError, None)
         self.workon.remove()
 
-        assert len(os.listdir(self.directory)) == 2
+        assert len(self.workon._dirs) == 2
+
+    @patch("git_workon.git.check_all_pushed", Mock(return_value=None))
+    def test_pre_done_hooks_run(self):
+        proj = self.add_git_project()
+        self.workon = git.WorkingDir(
+            self.directory,
+            config.UserConfig(
+                None, None, None, projects={"*": {"pre_done": ["touch ../stopped"]}}
+            ),
+        )
+
+        self.workon.remove(proj.name)
+        assert not os.path.exists(proj.path)
+        assert os.path.exists(os.path.join(self.directory, "stopped"))
+
+    @patch("git_workon.git.check_all_pushed", Mock(side_effect=git.GITError("stashes")))
+    def test_pre_done_hooks_skipped_for_kept_project(self):
+        proj = self.add_git_project()
+        self.workon = git.WorkingDir(
+            self.directory,
+            config.UserConfig(
+                None, None, None, projects={"*": {"pre_done": ["touch ../stopped"]}}
+            ),
+        )
+
+        with pytest.raises(git.CommandError, match="unpushed changes"):
+            self.workon.remove(proj.name)
+        assert os.path.exists(proj.path)
+        assert not os.path.exists(os.path.join(self.directory, "stopped"))
+
+    @patch("git_workon.git.check_all_pushed", Mock(return_value=None))
+    def test_failed_pre_done_hook_blocks_removal(self):
+        proj = self.add_git_project()
+        self.workon = git.WorkingDir(
+            self.directory,
+            config.UserConfig(
+                None, None, None, projects={"*": {"pre_done": ["false"]}}
+            ),
+        )
+
+        with pytest.raises(git.CommandError) as exc:
+            self.workon.remove(proj.name)
+        assert 'Hook "false" failed' in str(exc.value)
+        assert os.path.exists(proj.path)
+
+        self.workon.remove(proj.name, force=True)
+        assert not os.path.exists(proj.path)
+
+
+class TestGc(TestWorkingDirBase):
+    """Tests for the disk budget eviction."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.projects = [self.add_git_project() for _ in range(4)]
+        # the first project is the least recently used one
+        for i, proj in enumerate(self.projects):
+            os.utime(proj.path, (i, i))
+        self.usage = {proj.path: disk.DiskUsage(100, 0, 0) for proj in self.projects}
+
+    def _gc(self, max_size, dirty=(), dry_run=False, worktrees=None):
+        def _check(path, **_):
+            if path in dirty:
+                raise git.GITError("dirty")
+
+        def _get_worktrees(path):
+            return [
+                worktree
+                for worktree in (worktrees or {}).get(path, [])
+                if os.path.exists(worktree)
+            ]
+
+        with patch("git_workon.disk.get_usage", return_value=self.usage), patch(
+            "git_workon.git.check_all_pushed", side_effect=_check
+        ), patch("git_workon.git.get_worktrees", side_effect=_get_worktrees):
+            return self.workon.gc(max_size, dry_run=dry_run)
+
+    def test_fits_budget_nothing_removed(self):
+        assert not self._gc(400)
+        assert len(self.workon._dirs) == 4
+
+    def test_least_recently_used_removed(self):
+        assert self._gc(250) == [self.projects[0].name, self.projects[1].name]
+        assert sorted(self.workon._dirs) == sorted(
+            proj.name for proj in self.projects[2:]
+        )
+
+    def test_dirty_skipped(self):
+        removed = self._gc(300, dirty=[self.projects[0].path])
+        assert removed == [self.projects[1].name]
+        assert os.path.exists(self.projects[0].path)
+
+    def test_recorded_usage_preferred_over_mtime(self):
+        metadata.record_open(self.projects[0].path)
+        assert self._gc(300) == [self.projects[1].name]
+
+    def test_dry_run_nothing_removed(self):
+        assert self._gc(0, dry_run=True) == [proj.name for proj in self.projects]
+        assert len(self.workon._dirs) == 4
+
+    def test_main_clone_removed_after_its_worktrees(self):
+        worktrees = {self.projects[0].path: [self.projects[3].path]}
+        expected = [proj.name for proj in self.projects[1:] + self.projects[:1]]
+
+        assert self._gc(0, dry_run=True, worktrees=worktrees) == expected
+        assert self._gc(0, worktrees=worktrees) == expected
+        assert not self.workon._dirs
+
+    def test_dry_run_main_clone_with_kept_worktrees_skipped(self):
+        worktrees = {self.projects[0].path: [self.projects[3].path]}
+
+        removed = self._gc(
+            0, dirty=[self.projects[3].path], dry_run=True, worktrees=worktrees
+        )
+        assert removed == [self.projects[1].name, self.projects[2].name]
 
 
 class TestClone(TestWorkingDirBase):
@@ -316,26 +874,438 @@ class TestClone(TestWorkingDirBase):
             # pylint:disable=cell-var-from-loop
             with tempfile.TemporaryDirectory() as tmp_dir:
                 proj_path = os.path.join(tmp_dir, "some")
-                mc_clone.side_effect = lambda *args, **kwargs: os.mkdir(proj_path)
+                staging = os.path.join(tmp_dir, git.STATE_DIR_NAME, "staging", "some")
+                mc_clone.side_effect = lambda _, destination: os.mkdir(destination)
 
                 workon_ = git.WorkingDir(tmp_dir)
                 workon_.clone("some", [case.source])
                 assert os.path.isdir(proj_path)
+                assert not os.path.exists(staging)
 
-                mc_clone.assert_called_once_with(case.expected, proj_path)
+                mc_clone.assert_called_once_with(case.expected, staging)
                 mc_clone.reset_mock()
 
     @patch("git_workon.git.clone")
     def test_cloned_couple_of_sources_tried(self, mc_clone):
-        mc_clone.side_effect = (git.GITError, None)
+        def _clone(source, destination):
+            os.mkdir(destination)
+            if source.startswith("fail_source"):
+                raise git.GITError
+
+        mc_clone.side_effect = _clone
         self.workon.clone("any", ["fail_source", "success_source"])
 
+        staging = f"{self.directory}/{git.STATE_DIR_NAME}/staging/any"
         mc_clone.assert_has_calls(
             [
-                call("fail_source/any.git", f"{self.directory}/any"),
-                call("success_source/any.git", f"{self.directory}/any"),
+                call("fail_source/any.git", staging),
+                call("success_source/any.git", staging),
+            ]
+        )
+        assert self.workon._dirs == ["any"]
+
+    @patch("git_workon.git.clone")
+    def test_interrupted_clone_not_in_place(self, mc_clone):
+        def _clone(_, destination):
+            os.mkdir(destination)
+            raise KeyboardInterrupt
+
+        mc_clone.side_effect = _clone
+        with pytest.raises(KeyboardInterrupt):
+            self.workon.clone("any", ["source"])
+        assert "any" not in self.workon
+
+        mc_clone.side_effect = lambda _, destination: os.mkdir(destination)
+        self.workon.clone("any", ["source"])
+        assert "any" in self.workon
+
+    def test_locked_project_busy(self):
+        proj = self.add_git_project()
+        with self.workon._lock(proj.name):
+            assert list(self.workon.show(check_status=True)) == [
+                git.ProjectInfo(name=proj.name, status=git.ProjectStatus.BUSY)
             ]
+            report = self.workon.reports()[proj.name]
+        assert "locked by another process" in report.errors[0]
+        assert not report.clean
+
+    @patch("git_workon.git.clone")
+    def test_clone_all_concurrently(self, mc_clone):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def _clone(source, destination, **_):
+            barrier.wait()
+            if "fail" in source:
+                raise git.GITError
+            os.mkdir(destination)
+
+        mc_clone.side_effect = _clone
+        errors = self.workon.clone_all(["first", "second"], ["fail", "ok"], jobs=2)
+
+        assert not errors
+        assert sorted(self.workon._dirs) == ["first", "second"]
+
+    @patch("git_workon.git.clone")
+    def test_clone_all_interrupted(self, mc_clone):
+        def _clone(source, destination, **_):
+            self.workon._cancelled.set()
+            raise git.GITError(f"{source} killed")
+
+        mc_clone.side_effect = _clone
+        with pytest.raises(KeyboardInterrupt):
+            self.workon.clone_all(["first", "second"], ["hung", "ok"], jobs=1)
+
+        assert [call[0][0] for call in mc_clone.call_args_list] == ["hung/first.git"]
+        assert not sources.load()
+        assert not self.workon._dirs
+
+    @patch("git_workon.git.clone")
+    def test_clone_all_errors_reported(self, mc_clone):
+        mc_clone.side_effect = git.GITError
+
+        errors = self.workon.clone_all(["first", "second"], ["fail"])
+
+        assert sorted(errors) == ["first", "second"]
+
+    @patch("git_workon.git.clone")
+    def test_mirrors_ordered_by_stats(self, mc_clone):
+        sources.record("fail_source", False, 1)
+        sources.record("success_source", True, 1)
+        mc_clone.side_effect = lambda _, destination: os.mkdir(destination)
+
+        self.workon.clone("any", [["fail_source", "success_source"]])
+        mc_clone.assert_called_once_with(
+            "success_source/any.git",
+            f"{self.directory}/{git.STATE_DIR_NAME}/staging/any",
+        )
+
+    @patch("git_workon.git.clone")
+    def test_sources_order_kept(self, mc_clone):
+        def _clone(source, destination, **_):
+            if source.startswith("src/"):
+                raise git.NotFoundError(f"{source} not found")
+            os.mkdir(destination)
+
+        mc_clone.side_effect = _clone
+        self.workon.clone("beta", ["src", "fork"])
+        assert "src" not in sources.load()
+
+        self.workon.clone("alpha", ["src", "fork"])
+        assert mc_clone.call_args_list[-2][0][0] == "src/alpha.git"
+
+
+class TestCloneProfile(TestWorkingDirBase):
+    """Tests for clones set up according to project options."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.source = tempfile.mkdtemp()
+        repo = GitRepo(os.path.join(self.source, "some.git"))
+        os.mknod(os.path.join(repo.path, "some"))
+        repo.add()
+        repo.commit()
+        for directory in ("docs", "src"):
+            os.mkdir(os.path.join(repo.path, directory))
+            os.mknod(os.path.join(repo.path, directory, "file"))
+        repo.add()
+        repo.commit()
+
+        # the identity of commits made by tests is kept, as it may be set
+        # only in the overridden global config
+        global_config = os.path.join(self.source, "gitconfig")
+        for key, value in (("user.name", "test"), ("user.email", "test@test")):
+            subprocess.run(
+                ["git", "config", "-f", global_config, key, value], check=True
+            )
+        self.patch_env = patch.dict(os.environ, {"GIT_CONFIG_GLOBAL": global_config})
+        self.patch_env.start()
+
+    def tearDown(self) -> None:
+        self.patch_env.stop()
+        shutil.rmtree(self.source)
+        return super().tearDown()
+
+    def _clone(self, options):
+        self.workon = git.WorkingDir(
+            self.directory,
+            config.UserConfig(None, None, None, projects={"some": options}),
+        )
+        self.workon.clone("some", [f"file://{self.source}"])
+        return os.path.join(self.directory, "some")
+
+    def _git(self, command, cwd):
+        return subprocess.run(
+            ["git", *command.split()], cwd=cwd, capture_output=True, text=True
+        ).stdout.strip()
+
+    def test_missing_project_fails_at_once(self):
+        self.workon = git.WorkingDir(self.directory)
+        sources_ = [f"file://{self.source}", f"file://{self.source}/nested"]
+
+        with pytest.raises(git.CommandError, match="Tried all configured sources"):
+            self.workon.clone("typo", sources_)
+        assert sources.get_missing(sources_, "typo") == sources_
+
+        with patch("git_workon.git.clone") as mc_clone:
+            with pytest.raises(git.CommandError, match="not found on any"):
+                self.workon.clone("typo", sources_)
+        assert not mc_clone.called
+
+    def test_missing_source_skipped(self):
+        missing = f"file://{self.source}/nested"
+        self.workon = git.WorkingDir(self.directory)
+        sources.record_miss(missing, "some")
+
+        with patch("git_workon.git.clone", wraps=git.clone) as mc_clone:
+            self.workon.clone("some", [missing, f"file://{self.source}"])
+        mc_clone.assert_called_once()
+        assert mc_clone.call_args[0][0] == f"file://{self.source}/some.git"
+
+    def test_unreachable_source_not_cached(self):
+        self.workon = git.WorkingDir(self.directory)
+        error = subprocess.CalledProcessError(
+            128, "git clone", stderr="fatal: Could not resolve host: example.com"
+        )
+
+        with patch("git_workon.git._run_command", side_effect=error):
+            with pytest.raises(git.CommandError):
+                self.workon.clone("some", ["https://example.com"])
+        assert not sources.get_missing(["https://example.com"], "some")
+
+    def test_large_profile(self):
+        path = self._clone({"profile": "large"})
+
+        assert self._git("config core.commitGraph", path) == "true"
+        assert self._git("config fetch.writeCommitGraph", path) == "true"
+        assert os.path.isfile(os.path.join(path, ".git/objects/info/commit-graph"))
+        assert path in self._git("config --global --get-all maintenance.repo", path)
+        # a scheduler may be not started, so automatic gc is kept
+        assert not self._git("config maintenance.auto", path)
+
+        self.workon.remove("some")
+        assert not self._git("config --global --get-all maintenance.repo", self.source)
+
+    def test_sparse_checkout(self):
+        path = self._clone({"sparse": ["src"]})
+
+        assert sorted(os.listdir(path)) == [".git", "some", "src"]
+
+    def test_clone_logged(self):
+        self._clone({})
+
+        [event] = [event for event in events._buffer if event["kind"] == "clone"]
+        assert event["ok"]
+        assert event["project"] == "some"
+        assert event["source"] == f"file://{self.source}"
+        assert event["size"] > 0
+
+    def test_resumable_clone_complete(self):
+        path = self._clone({"resumable": True})
+
+        assert self._git("rev-parse --is-shallow-repository", path) == "false"
+        assert self._git("rev-list --count HEAD", path) == "2"
+
+    def test_interrupted_clone_resumed(self):
+        with patch("git_workon.git.deepen", Mock(side_effect=git.GITError)):
+            with pytest.raises(git.CommandError) as exc:
+                self._clone({"resumable": True})
+        assert "will be resumed" in str(exc.value)
+        assert "some" not in self.workon
+
+        with patch("git_workon.git.clone", Mock(wraps=git.clone)) as mc_clone:
+            path = self._clone({"resumable": True})
+        assert not mc_clone.called
+        assert self._git("rev-list --count HEAD", path) == "2"
+
+    def test_deepened_step_by_step(self):
+        path = os.path.join(self.directory, "shallow")
+        git.clone(f"file://{self.source}/some.git", path, depth=1)
+        assert self._git("rev-parse --is-shallow-repository", path) == "true"
+
+        with patch(
+            "git_workon.git._run_command", Mock(wraps=git._run_command)
+        ) as mc_run:
+            git.deepen(path, step=1)
+
+        assert self._git("rev-parse --is-shallow-repository", path) == "false"
+        assert [
+            call_[0][0] for call_ in mc_run.call_args_list if "--deepen" in call_[0][0]
+        ] == ["git fetch --deepen 1 origin", "git fetch --deepen 2 origin"]
+
+    @patch("git_workon.pipeline.spawn", Mock(return_value=os.getpid()))
+    def test_background_setup(self):
+        self.workon = git.WorkingDir(
+            self.directory,
+            config.UserConfig(None, None, None, projects={"some": {"resumable": True}}),
+        )
+        self.workon.clone("some", [f"file://{self.source}"], background=True)
+        path = os.path.join(self.directory, "some")
+
+        assert git.is_shallow(path)
+        status = self.workon.get_setup_status("some")
+        assert status.pending == ["deepen"]
+        assert [info.setup for info in self.workon.show(check_status=False)] == [
+            "setup: deepen (0/1)"
+        ]
+
+        self.workon.setup("some", status.pending)
+        assert not git.is_shallow(path)
+        assert self.workon.get_setup_status("some") is None
+
+    def test_background_setup_spawned(self):
+        self.workon = git.WorkingDir(
+            self.directory,
+            config.UserConfig(None, None, None, projects={"some": {"resumable": True}}),
+        )
+        # the spawned process must not use the configuration and the cache
+        # of the user
+        home = os.path.join(self.source, "home")
+        with patch.dict(
+            os.environ,
+            {
+                "HOME": home,
+                "XDG_CONFIG_HOME": os.path.join(home, ".config"),
+                "XDG_CACHE_HOME": os.path.join(home, ".cache"),
+            },
+        ):
+            self.workon.clone("some", [f"file://{self.source}"], background=True)
+
+        events_log = os.path.join(home, ".cache", "git_workon", "events.jsonl")
+        deadline = time.monotonic() + 30
+        while (
+            self.workon.get_setup_status("some") or not os.path.isfile(events_log)
+        ) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert self.workon.get_setup_status("some") is None
+        assert not git.is_shallow(os.path.join(self.directory, "some"))
+        assert os.path.isfile(events_log)
+
+    def test_failed_setup_resumed(self):
+        path = os.path.join(self.directory, "some")
+        git.clone(f"file://{self.source}/some.git", path, depth=1)
+
+        with patch("git_workon.git.deepen", Mock(side_effect=git.GITError("oops"))):
+            with pytest.raises(git.CommandError):
+                self.workon.setup("some", ["deepen"])
+        status = self.workon.get_setup_status("some")
+        assert status.describe() == "setup failed at deepen (0/1)"
+
+        self.workon.resume_setup("some")
+        assert self.workon.get_setup_status("some") is None
+        assert not git.is_shallow(path)
+
+    def test_post_clone_hooks_run(self):
+        path = self._clone({"post_clone": ["touch built", "ls built"]})
+
+        assert os.path.exists(os.path.join(path, "built"))
+        assert self.workon.get_setup_status("some") is None
+        with open(
+            os.path.join(self.directory, ".git_workon", "logs", "some.log"),
+            encoding="utf8",
+        ) as log:
+            assert log.read() == "$ touch built\n$ ls built\nbuilt\n"
+
+    def test_failed_post_clone_hook_reported(self):
+        with pytest.raises(git.CommandError):
+            self._clone({"post_clone": ["true", "false"]})
+
+        assert "some" in self.workon
+        assert (
+            self.workon.get_setup_status("some").describe()
+            == "setup failed at hooks (0/1, 2/2: false)"
+        )
+        assert "some" in self.workon.clone_all(["some"], [f"file://{self.source}"])
+
+        self.workon = git.WorkingDir(self.directory)
+        self.workon.resume_setup("some")
+        assert self.workon.get_setup_status("some") is None
+
+    def _bundle(self):
+        bundles = os.path.join(self.source, "bundles")
+        os.mkdir(bundles)
+        repo = os.path.join(self.source, "some.git")
+        subprocess.run(
+            ["git", "bundle", "create", os.path.join(bundles, "some.bundle"), "--all"],
+            cwd=repo,
+            check=True,
+        )
+        subprocess.run(
+            ["git", "commit", "--allow-empty", "-m", "after snapshot"],
+            cwd=repo,
+            check=True,
+        )
+        return bundles
+
+    def test_seeded_from_bundle(self):
+        bundles = self._bundle()
+
+        with patch("git_workon.git.clone", Mock(wraps=git.clone)) as mc_clone:
+            self.workon.clone("some", [f"bundle:{bundles}", f"file://{self.source}"])
+        path = os.path.join(self.directory, "some")
+
+        mc_clone.assert_called_once()
+        assert mc_clone.call_args[0][0] == os.path.join(bundles, "some.bundle")
+        assert self._git("log -1 --format=%s", path) == "after snapshot"
+        assert self._git("remote get-url origin", path) == (
+            f"file://{self.source}/some.git"
+        )
+
+    def test_seeded_clone_offline(self):
+        bundles = self._bundle()
+
+        self.workon.clone("some", [f"bundle:{bundles}", "file:///nonexistent"])
+
+        path = os.path.join(self.directory, "some")
+        assert self._git("rev-list --count HEAD", path) == "2"
+
+    def test_bundle_sources_without_snapshot(self):
+        bundles = self._bundle()
+
+        with pytest.raises(git.CommandError, match="Tried all configured sources"):
+            self.workon.clone("other", [f"bundle:{bundles}"])
+        assert "other" not in os.listdir(self.directory)
+
+    def test_objects_borrowed_from_shared_clone(self):
+        lender = self._clone({})
+        GitRepo(os.path.join(self.directory, "unrelated")).commit()
+        fork = os.path.join(self.source, "fork.git")
+        shutil.copytree(os.path.join(self.source, "some.git"), fork)
+        subprocess.run(["git", "checkout", "-b", "feature"], cwd=fork, check=True)
+        subprocess.run(
+            ["git", "commit", "--allow-empty", "-m", "fork"], cwd=fork, check=True
+        )
+
+        self.workon = git.WorkingDir(
+            self.directory,
+            config.UserConfig(None, None, None, projects={"fork": {"share": True}}),
         )
+        self.workon.clone("fork", [f"file://{self.source}"])
+        path = os.path.join(self.directory, "fork")
+
+        assert git.get_alternates(path) == [os.path.join(lender, ".git", "objects")]
+        assert self._git("config gc.pruneExpire", lender) == "never"
+
+        self.workon.remove("some", force=True)
+        assert not git.get_alternates(path)
+        assert self._git("rev-list --count HEAD", path) == "3"
+        assert subprocess.run(["git", "fsck"], cwd=path).returncode == 0
+
+    def test_objects_borrowed_from_upstream_pool(self):
+        upstream = f"file://{self.source}/some.git"
+        path = self._clone({"upstream": upstream})
+
+        [pool] = git.get_alternates(path)
+        assert pool.startswith(os.path.join(self.directory, ".git_workon", "pools"))
+
+        self.workon.remove("some")
+        assert os.path.isdir(pool)
+        self._clone({"upstream": upstream})
+
+    def test_default_profile(self):
+        path = self._clone({})
+
+        assert not self._git("config core.commitGraph", path)
+        assert os.path.isdir(os.path.join(path, "docs"))
 
 
 class TestOpen(TestWorkingDirBase):
@@ -345,6 +1315,7 @@ class TestOpen(TestWorkingDirBase):
         with pytest.raises(git.CommandError):
             self.workon.open("nonex", editor="code")
 
+    @patch("git_workon.git.shutil.which", Mock(return_value="/usr/bin/code"))
     @patch("git_workon.git.subprocess")
     def test_with_specified_editor(self, mc_subprocess):
         mc_subprocess.run.return_value = Mock(returncode=0)
@@ -352,31 +1323,53 @@ class TestOpen(TestWorkingDirBase):
         proj = self.add_git_project()
         self.workon.open(proj.name, editor="code")
         mc_subprocess.run.assert_called_once_with(
-            ["code", f"{self.directory}/{proj.name}"], check=False
+            ["code", f"{self.directory}/{proj.name}"],
+            check=False,
+            env=ssh.get_detached_env(),
         )
 
+    @patch("git_workon.git.shutil.which", Mock(return_value=None))
     @patch("git_workon.git.subprocess")
     def test_no_suitable_editor_found(self, mc_subprocess):
-        # this test assumes that this ENV variable is set
-        os.environ["EDITOR"] = "env_editor"
-        mc_subprocess.run.return_value = Mock(returncode=1)
-
         proj = self.add_git_project()
 
         with pytest.raises(git.CommandError) as exc:
             self.workon.open(proj.name, editor="code")
         assert "No suitable editor" in str(exc.value)
+        assert not mc_subprocess.run.called
 
-        assert mc_subprocess.run.call_count == 4
-
+    @patch.dict(os.environ, {"EDITOR": "env_editor"})
     @patch("git_workon.git.subprocess")
     def test_editor_from_env(self, mc_subprocess):
-        mc_subprocess.run.side_effect = (Mock(returncode=1), Mock(returncode=0))
+        mc_subprocess.run.return_value = Mock(returncode=0)
+        proj = self.add_git_project()
+
+        with patch(
+            "git_workon.git.shutil.which",
+            Mock(side_effect=lambda name: name == "env_editor"),
+        ):
+            self.workon.open(proj.name, editor="code")
+        assert mc_subprocess.run.call_args[0][0][0] == "env_editor"
+
+    @patch("git_workon.git.subprocess")
+    def test_editor_resolved_once(self, mc_subprocess):
+        mc_subprocess.run.return_value = Mock(returncode=0)
+        proj = self.add_git_project()
+
+        with patch("git_workon.git.shutil.which") as mc_which:
+            self.workon.open(proj.name, editor="code")
+            self.workon.open(proj.name, editor="code")
+        mc_which.assert_called_once_with("code")
 
+    @patch("git_workon.git.shutil.which", Mock(return_value="/usr/bin/code"))
+    @patch("git_workon.git.subprocess")
+    def test_editor_failed(self, mc_subprocess):
+        mc_subprocess.run.return_value = Mock(returncode=1)
         proj = self.add_git_project()
 
-        self.workon.open(proj.name, editor="code")
-        assert mc_subprocess.run.call_count == 2
+        with pytest.raises(git.CommandError) as exc:
+            self.workon.open(proj.name, editor="code")
+        assert "failed to open" in str(exc.value)
 
 
 class TestShow(TestWorkingDirBase):
@@ -391,9 +1384,10 @@ class TestShow(TestWorkingDirBase):
             git.ProjectInfo(name=proj.name, status=None)
         ]
 
-    @patch("git_workon.git._get_unpushed_tags", Mock(return_value=""))
+    @patch("git_workon.git._get_unpushed_tag_names", Mock(return_value=[]))
     def test_check_status_project_is_clean(self):
         proj = self.add_git_project()
+        subprocess.run(["git", "init"], cwd=proj.path, check=True)
         assert list(self.workon.show(check_status=True)) == [
             git.ProjectInfo(name=proj.name, status=git.ProjectStatus.CLEAN)
         ]
@@ -404,7 +1398,7 @@ class TestShow(TestWorkingDirBase):
             git.ProjectInfo(name=proj.name, status=git.ProjectStatus.DIRTY)
         ]
 
-    @patch("git_workon.git._get_unpushed_tags", Mock(return_value=""))
+    @patch("git_workon.git._get_unpushed_tag_names", Mock(return_value=[]))
     def test_check_status_project_is_file(self):
         path = os.path.join(self.directory, "some.txt")
         os.mknod(path)
@@ -412,3 +1406,52 @@ class TestShow(TestWorkingDirBase):
         assert list(self.workon.show(check_status=True)) == [
             git.ProjectInfo(name="some.txt", status=git.ProjectStatus.UNDEFINED)
         ]
+
+    def test_project_untracked_option_applied(self):
+        self.workon = git.WorkingDir(
+            self.directory,
+            config.UserConfig(None, None, None, projects={"big*": {"untracked": "no"}}),
+        )
+        for name in ("big", "small"):
+            repo = GitRepo(os.path.join(self.directory, name))
+            repo.commit()
+            os.mknod(os.path.join(repo.path, "1.txt"))
+
+        with patch(
+            "git_workon.git._get_unpushed_tag_names", Mock(return_value=[])
+        ), patch(
+            "git_workon.git._get_unpushed_commits",
+            Mock(return_value=git.CappedOutput([], 0)),
+        ):
+            statuses = {
+                info.name: info.status for info in self.workon.show(check_status=True)
+            }
+        assert statuses == {
+            "big": git.ProjectStatus.CLEAN,
+            "small": git.ProjectStatus.DIRTY,
+        }
+
+    def test_size_for_git_projects_only(self):
+        proj = self.add_git_project()
+        os.mknod(os.path.join(self.directory, "some.txt"))
+
+        info = {info.name: info for info in self.workon.show(False, size=True)}
+        assert isinstance(info[proj.name].size, disk.DiskUsage)
+        assert info["some.txt"].size is None
+
+    @patch("git_workon.git.check_all_pushed")
+    def test_stale_projects_only_checked(self, mc_check_all_pushed):
+        stale, active = self.add_git_project(), self.add_git_project()
+        os.mknod(os.path.join(self.directory, "some.txt"))
+        old = time.time() - 30 * 24 * 3600
+        for path in (stale.path, os.path.join(stale.path, ".git")):
+            os.utime(path, (old, old))
+        metadata.record_open(stale.path)
+        metadata.record_open(active.path)
+        with metadata._connect() as connection:
+            connection.execute("UPDATE projects SET opened_at = ?", (old,))
+
+        info = list(self.workon.show(True, stale=14 * 24 * 3600))
+
+        assert [(info_.name, info_.active_at) for info_ in info] == [(stale.name, old)]
+        mc_check_all_pushed.assert_called_once()
@@ -0,0 +1,53 @@
+"""Tests for hooks.py."""
+# pylint:disable=missing-function-docstring
+import os
+import threading
+
+import pytest
+from git_workon import hooks, locks
+
+
+def test_hooks_run_and_logged(tmp_path):
+    log_path = os.path.join(tmp_path, "project.log")
+    progress = []
+
+    hooks.run(
+        str(tmp_path),
+        ["echo one > file", "cat file"],
+        log_path,
+        [os.path.join(tmp_path, "slot.lock")],
+        progress.append,
+    )
+
+    with open(log_path, encoding="utf8") as log:
+        assert log.read() == "$ echo one > file\n$ cat file\none\n"
+    assert progress == ["1/2: echo one > file", "2/2: cat file"]
+
+
+def test_failed_hook_stops_others(tmp_path):
+    log_path = os.path.join(tmp_path, "project.log")
+
+    with pytest.raises(hooks.HookError) as exc:
+        hooks.run(
+            str(tmp_path),
+            ["exit 3", "touch file"],
+            log_path,
+            [os.path.join(tmp_path, "slot.lock")],
+        )
+    assert 'Hook "exit 3" failed with code 3' in str(exc.value)
+    assert not os.path.exists(os.path.join(tmp_path, "file"))
+
+
+def test_hooks_wait_for_free_slot(tmp_path):
+    slot = os.path.join(tmp_path, "slot.lock")
+    thread = threading.Thread(
+        target=hooks.run,
+        args=(str(tmp_path), ["touch file"], os.devnull, [slot]),
+    )
+
+    with locks.acquire(slot):
+        thread.start()
+        thread.join(0.3)
+        assert not os.path.exists(os.path.join(tmp_path, "file"))
+    thread.join(5)
+    assert os.path.exists(os.path.join(tmp_path, "file"))
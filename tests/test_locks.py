@@ -0,0 +1,54 @@
+"""Tests for locks.py."""
+# pylint:disable=missing-function-docstring
+import os
+import threading
+
+import pytest
+from git_workon import locks
+
+
+def test_exclusive_lock_excludes_others(tmp_path):
+    path = os.path.join(tmp_path, "project.lock")
+    with locks.acquire(path):
+        with pytest.raises(locks.LockedError):
+            with locks.acquire(path, blocking=False):
+                pass
+        with pytest.raises(locks.LockedError):
+            with locks.acquire(path, shared=True, blocking=False):
+                pass
+
+    with locks.acquire(path, blocking=False):
+        pass
+
+
+def test_shared_locks_coexist(tmp_path):
+    path = os.path.join(tmp_path, "project.lock")
+    with locks.acquire(path, shared=True):
+        with locks.acquire(path, shared=True, blocking=False):
+            pass
+
+
+def test_blocking_lock_waits_for_release(tmp_path):
+    path = os.path.join(tmp_path, "project.lock")
+    acquired = threading.Event()
+
+    def _acquire():
+        with locks.acquire(path):
+            acquired.set()
+
+    with locks.acquire(path):
+        thread = threading.Thread(target=_acquire)
+        thread.start()
+        assert not acquired.wait(0.2)
+    thread.join(5)
+    assert acquired.is_set()
+
+
+def test_any_free_lock_acquired(tmp_path):
+    paths = [os.path.join(tmp_path, f"slot-{i}.lock") for i in range(2)]
+    with locks.acquire(paths[0]):
+        with locks.acquire_any(paths) as path:
+            assert path == paths[1]
+            with pytest.raises(locks.LockedError):
+                with locks.acquire(paths[1], blocking=False):
+                    pass
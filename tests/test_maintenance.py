@@ -0,0 +1,64 @@
+"""Tests for maintenance.py."""
+# pylint:disable=missing-function-docstring
+import os
+
+import pytest
+from git_workon import maintenance
+
+
+@pytest.fixture(name="project")
+def fixture_project(git_repo):
+    for i in range(3):
+        git_repo.commit(str(i))
+    git_repo.git("tag", "v1.0")
+    return git_repo
+
+
+def _count_objects(project):
+    output = project.git("count-objects", "-v")
+    return dict(line.split(": ") for line in output.splitlines())
+
+
+def test_project_maintained(project):
+    assert _count_objects(project)["count"] != "0"
+
+    assert maintenance.maintain(project.path, threads=1) == [
+        "pack-refs",
+        "repack",
+        "prune",
+        "commit-graph",
+    ]
+
+    counts = _count_objects(project)
+    assert counts["count"] == "0"
+    assert counts["packs"] == "1"
+    assert os.path.isfile(os.path.join(project.path, ".git", "packed-refs"))
+    assert os.path.isfile(
+        os.path.join(project.path, ".git", "objects", "info", "commit-graph")
+    )
+
+
+def test_unreachable_objects_kept_for_borrowers(project):
+    project.git("config", "gc.pruneExpire", "never")
+
+    tasks = dict(maintenance.get_tasks(project.path))
+    assert "prune" not in tasks
+    assert "--keep-unreachable" in tasks["repack"]
+    assert maintenance.maintain(project.path) == list(tasks)
+
+
+def test_failed_maintenance_raises(tmp_path):
+    with pytest.raises(maintenance.MaintenanceError) as exc:
+        maintenance.maintain(str(tmp_path))
+    assert "git pack-refs" in str(exc.value)
+
+
+def test_open_paths(tmp_path):
+    cwd = os.getcwd()
+    assert maintenance.get_open_paths([cwd, str(tmp_path)]) == {cwd}
+
+
+def test_latency_of_local_checks():
+    assert (
+        maintenance.get_latency({"unstaged": 1.0, "tags": 5.0, "commits": 0.5}) == 1.5
+    )
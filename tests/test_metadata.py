@@ -0,0 +1,31 @@
+"""Tests for metadata.py module."""
+# pylint:disable=missing-function-docstring
+from unittest.mock import patch
+
+from git_workon import metadata
+
+
+def test_unknown_project_has_empty_metadata():
+    assert metadata.get(["/nonex"]) == {
+        "/nonex": metadata.ProjectMeta("/nonex", None, None, None)
+    }
+
+
+@patch("git_workon.metadata.time.time")
+def test_project_recorded(mc_time):
+    mc_time.return_value = 10
+    metadata.record_clone("/proj")
+    mc_time.return_value = 20
+    metadata.record_open("/proj")
+    metadata.record_sizes({"/proj": 1024, "/other": 1})
+
+    meta = metadata.get(["/proj"])["/proj"]
+    assert meta == metadata.ProjectMeta("/proj", 10, 20, 1024)
+    assert meta.used_at == 20
+
+
+def test_project_forgotten():
+    metadata.record_clone("/proj")
+    metadata.forget("/proj")
+
+    assert metadata.get(["/proj"])["/proj"].used_at is None
@@ -0,0 +1,62 @@
+"""Tests for pipeline.py."""
+# pylint:disable=missing-function-docstring
+import os
+import subprocess
+import sys
+
+from git_workon import git, pipeline
+
+
+def test_status_saved_and_loaded(tmp_path):
+    path = os.path.join(tmp_path, "status.json")
+    status = pipeline.Status(["deepen", "submodules"], submodule_jobs=4)
+    status.done.append("deepen")
+    pipeline.save_status(path, status)
+
+    loaded = pipeline.load_status(path)
+    assert loaded == status
+    assert loaded.pending == ["submodules"]
+
+
+def test_broken_status_ignored(tmp_path):
+    path = os.path.join(tmp_path, "status.json")
+    with open(path, "w", encoding="utf8") as file:
+        file.write("oops")
+    assert pipeline.load_status(path) is None
+    assert pipeline.load_status(os.path.join(tmp_path, "nonexistent")) is None
+
+
+def test_status_described():
+    status = pipeline.Status(["deepen", "submodules"], current="deepen")
+    assert status.running
+    assert status.describe() == "setup: deepen (0/2)"
+
+    status.error = "oops"
+    assert not status.running
+    assert status.describe() == "setup failed at deepen (0/2)"
+
+
+def test_status_of_dead_process_interrupted():
+    with subprocess.Popen([sys.executable, "-c", ""]) as proc:
+        pass
+    status = pipeline.Status(["deepen"], current="deepen", pid=proc.pid)
+    assert not status.running
+    assert status.describe() == "setup interrupted at deepen (0/1)"
+
+
+def test_run_as_module_without_warnings():
+    result = subprocess.run(
+        [sys.executable, "-W", "error", "-m", "git_workon.pipeline", "--help"],
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0
+    assert not result.stderr
+
+
+def test_api_exported():
+    import git_workon  # pylint:disable=import-outside-toplevel
+
+    assert git_workon.WorkingDir is git.WorkingDir
+    assert git_workon.get_reports is git.get_reports
@@ -0,0 +1,38 @@
+"""Tests for runner.py."""
+# pylint:disable=missing-function-docstring
+import subprocess
+
+import pytest
+from git_workon import events, runner
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        (["status", "--porcelain"], "status"),
+        (["-c", "core.fsmonitor=true", "status"], "status"),
+        (["--no-pager", "log"], "log"),
+        (["--version"], ""),
+    ],
+)
+def test_get_subcommand(args, expected):
+    assert runner.get_subcommand(args) == expected
+
+
+def test_run_timed(tmp_path):
+    result = runner.run(["init", "--quiet"], cwd=str(tmp_path))
+    assert result.returncode == 0
+
+    with pytest.raises(subprocess.CalledProcessError):
+        runner.run(["rev-parse", "HEAD"], cwd=str(tmp_path), check=True)
+
+    events.flush()
+    assert [(event["command"], event["ok"]) for event in events.load()] == [
+        ("init", True),
+        ("rev-parse", False),
+    ]
+
+
+def test_interrupted_command_raises():
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(["--version"], prefix=["sh", "-c", "kill -INT $$", "sh"])
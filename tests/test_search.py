@@ -0,0 +1,69 @@
+"""Tests for search.py."""
+# pylint:disable=missing-function-docstring
+import os
+
+import pytest
+from git_workon import search
+
+
+@pytest.fixture(name="projects")
+def fixture_projects(make_git_repo):
+    projects = {}
+    for name in ("first", "second"):
+        repo = make_git_repo(name, initial_commit=False)
+        for file_name in ("module.py", "notes.txt"):
+            with open(os.path.join(repo.path, file_name), "w", encoding="utf8") as file:
+                file.write(f"def {name}():\n    return 'Found'\n")
+        repo.add()
+        projects[name] = repo.path
+    return projects
+
+
+def test_grep_args():
+    assert search.get_grep_args("a b", ["*.py"], ignore_case=True, fixed=True) == [
+        "grep",
+        "-I",
+        "--no-color",
+        "-n",
+        "-i",
+        "-F",
+        "-e",
+        "a b",
+        "--",
+        "*.py",
+    ]
+
+
+def test_all_projects_searched(projects):
+    results = search.grep_all(
+        projects, search.get_grep_args("found", ["*.py"], ignore_case=True)
+    )
+
+    assert sorted(results) == [
+        ("first", "module.py:2:    return 'Found'"),
+        ("second", "module.py:2:    return 'Found'"),
+    ]
+
+
+def test_files_listed(projects):
+    results = search.grep_all(
+        projects, search.get_grep_args("def first", files=True), jobs=1
+    )
+
+    assert list(results) == [("first", "module.py"), ("first", "notes.txt")]
+
+
+def test_search_stopped_at_limit(projects):
+    results = search.grep_all(projects, search.get_grep_args("e"), jobs=1, limit=3)
+
+    assert len(list(results)) == 3
+
+
+def test_failed_searches_reported(projects):
+    errors = {}
+
+    assert not list(
+        search.grep_all(projects, search.get_grep_args("\\("), errors=errors)
+    )
+    assert set(errors) == {"first", "second"}
+    assert "Unmatched" in errors["first"]
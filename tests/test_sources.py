@@ -0,0 +1,93 @@
+"""Tests for sources.py module."""
+# pylint:disable=missing-function-docstring
+from unittest.mock import patch
+
+from git_workon import sources
+
+
+def test_no_stats_configured_order_kept():
+    assert sources.order(["c", "a", "b"]) == ["c", "a", "b"]
+
+
+def test_failing_source_moved_down():
+    for _ in range(3):
+        sources.record("flaky", False, 30)
+    sources.record("stable", True, 1)
+
+    assert sources.order([["flaky", "unknown", "stable"]]) == [
+        "stable",
+        "unknown",
+        "flaky",
+    ]
+
+
+def test_slow_source_moved_down():
+    sources.record("slow", True, 60)
+    sources.record("fast", True, 2)
+
+    assert sources.order([["slow", "fast"]]) == ["fast", "slow"]
+
+
+def test_configured_order_kept_for_other_sources():
+    sources.record("slow", True, 60)
+    sources.record("fast", True, 2)
+    sources.record("fast_mirror", True, 1)
+
+    assert sources.order(["slow", ["fast", "fast_mirror"], "fast"]) == [
+        "slow",
+        "fast_mirror",
+        "fast",
+        "fast",
+    ]
+
+
+def test_durations_averaged():
+    sources.record("source", True, 10)
+    sources.record("source", True, 20)
+    sources.record("source", False, 5)
+
+    stats = sources.load()["source"]
+    assert stats.clone_time == 13
+    assert stats.probe_time == 5
+    assert round(stats.successes) == 2
+    assert round(stats.failures) == 1
+
+
+@patch("git_workon.sources.time.time")
+def test_recovered_source_comes_back(mc_time):
+    mc_time.return_value = 0
+    for _ in range(5):
+        sources.record("recovered", False, 30)
+    sources.record("other", True, 10)
+    assert sources.order([["recovered", "other"]]) == ["other", "recovered"]
+
+    mc_time.return_value = 10 * sources.HALF_LIFE
+    sources.record("recovered", True, 5)
+    sources.record("recovered", True, 5)
+    assert sources.order([["recovered", "other"]]) == ["recovered", "other"]
+
+
+def test_describe():
+    assert "No sources statistics" in sources.describe()
+
+    sources.record("https://github.com/user", True, 3)
+    assert "https://github.com/user: successes 1.0, failures 0.0" in (
+        sources.describe()
+    )
+
+
+def test_misses_remembered_per_source_and_project():
+    sources.record_miss("origin", "typo")
+
+    assert sources.get_missing(["origin", "mirror"], "typo") == ["origin"]
+    assert not sources.get_missing(["origin"], "project")
+
+
+def test_misses_expire():
+    with patch("git_workon.sources.time.time", return_value=0):
+        sources.record_miss("origin", "typo")
+        sources.record_miss("origin", "other")
+    with patch("git_workon.sources.time.time", return_value=sources.MISS_TTL + 1):
+        sources.record_miss("origin", "other")
+        assert not sources.get_missing(["origin"], "typo")
+        assert sources.get_missing(["origin"], "other") == ["origin"]
@@ -0,0 +1,147 @@
+"""Tests for ssh.py."""
+# pylint:disable=missing-function-docstring
+import os
+import subprocess
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+from git_workon import git, ssh
+
+# stands for `ssh`: records its arguments, runs GIT commands locally and
+# emulates control sockets of masters
+_SSH_STAND_IN = """#!{python}
+import os
+import subprocess
+import sys
+
+args = sys.argv[1:]
+with open({log!r}, "a", encoding="utf8") as log:
+    log.write(" ".join(args) + "\\n")
+options = {{}}
+while args[0].startswith("-"):
+    flag = args.pop(0)
+    value = args.pop(0)
+    if flag == "-o":
+        name, _, value = value.partition("=")
+        options[name] = value
+    else:
+        options[flag] = value
+host = args.pop(0)
+control_path = options.get("ControlPath", "").replace("%C", host)
+if options.get("-O") == "exit":
+    os.remove(control_path)
+    sys.exit(0)
+if options.get("ControlMaster") == "auto":
+    open(control_path, "w", encoding="utf8").close()
+sys.exit(subprocess.run(["sh", "-c", " ".join(args)]).returncode)
+"""
+
+
+@pytest.fixture(name="ssh_log")
+def fixture_ssh_log(tmp_path):
+    log = os.path.join(tmp_path, "ssh.log")
+    stand_in = os.path.join(tmp_path, "bin", "ssh")
+    os.mkdir(os.path.dirname(stand_in))
+    with open(stand_in, "w", encoding="utf8") as file:
+        file.write(_SSH_STAND_IN.format(python=sys.executable, log=log))
+    os.chmod(stand_in, 0o755)
+    with patch.dict(os.environ, {"GIT_SSH": stand_in}):
+        os.environ.pop("GIT_SSH_COMMAND", None)
+        yield log
+
+
+def _read_log(path):
+    with open(path, encoding="utf8") as log:
+        return log.read().splitlines()
+
+
+def test_connections_multiplexed(tmp_path, ssh_log):
+    source = os.path.join(tmp_path, "source")
+    subprocess.run(["git", "init", source], check=True)
+    subprocess.run(
+        ["git", "commit", "--allow-empty", "-m", "initial"], cwd=source, check=True
+    )
+
+    with ssh.multiplexed():
+        control_dir = os.environ["GIT_SSH_COMMAND"].split("ControlPath=")[1]
+        control_dir = os.path.dirname(control_dir.split()[0])
+        for name in ("first", "second"):
+            git.clone(f"ssh://example.com{source}", os.path.join(tmp_path, name))
+        assert os.listdir(control_dir) == ["example.com"]
+        assert "GIT_SSH_COMMAND" not in ssh.get_detached_env()
+
+    lines = _read_log(ssh_log)
+    assert len(lines) == 3
+    for line in lines[:2]:
+        assert "-o ControlMaster=auto" in line
+        assert f"ControlPath={control_dir}/%C" in line
+    assert lines[2].endswith(f"-o ControlPath={control_dir}/example.com -O exit master")
+    assert not os.path.exists(control_dir)
+    assert "GIT_SSH_COMMAND" not in os.environ
+
+
+def test_user_command_kept(ssh_log):
+    with patch.dict(os.environ, {"GIT_SSH_COMMAND": "ssh -i key"}):
+        with ssh.multiplexed():
+            assert os.environ["GIT_SSH_COMMAND"].startswith(
+                "ssh -i key -o ControlMaster=auto"
+            )
+            assert ssh.get_detached_env()["GIT_SSH_COMMAND"] == "ssh -i key"
+        assert os.environ["GIT_SSH_COMMAND"] == "ssh -i key"
+    assert not os.path.exists(ssh_log)
+
+
+def test_other_clients_not_multiplexed():
+    with patch.dict(os.environ, {"GIT_SSH": "/usr/bin/plink"}):
+        os.environ.pop("GIT_SSH_COMMAND", None)
+        with ssh.multiplexed():
+            assert "GIT_SSH_COMMAND" not in os.environ
+
+
+def test_configured_command_kept(tmp_path, ssh_log):
+    config = os.path.join(tmp_path, "gitconfig")
+    subprocess.run(
+        ["git", "config", "-f", config, "core.sshCommand", "ssh -i key"],
+        check=True,
+    )
+    with patch.dict(os.environ, {"GIT_CONFIG_GLOBAL": config}):
+        with ssh.multiplexed():
+            assert os.environ["GIT_SSH_COMMAND"].startswith(
+                "ssh -i key -o ControlMaster=auto"
+            )
+            assert "GIT_SSH_COMMAND" not in ssh.get_detached_env()
+        assert "GIT_SSH_COMMAND" not in os.environ
+    assert not os.path.exists(ssh_log)
+
+
+def test_project_command_multiplexed(tmp_path, ssh_log):
+    project = os.path.join(tmp_path, "project")
+    subprocess.run(["git", "init", project], check=True)
+    subprocess.run(
+        ["git", "config", "core.sshCommand", "ssh -i key"],
+        cwd=project,
+        check=True,
+    )
+
+    assert not ssh.get_env(project)
+    with ssh.multiplexed():
+        command = ssh.get_env(project)["GIT_SSH_COMMAND"]
+        assert command.startswith("ssh -i key -o ControlMaster=auto")
+        assert (
+            os.environ["GIT_SSH_COMMAND"].split("ControlPath=")[1]
+            == command.split("ControlPath=")[1]
+        )
+    assert not os.path.exists(ssh_log)
+
+
+def test_editor_not_multiplexed(tmp_path, ssh_log):
+    workon = git.WorkingDir(str(tmp_path / "workon"))
+    with ssh.multiplexed():
+        with patch("git_workon.git.shutil.which", return_value="/usr/bin/code"), patch(
+            "git_workon.git.subprocess.run", return_value=Mock(returncode=0)
+        ) as mc_run:
+            workon.open(None, editor="code")
+
+    assert "GIT_SSH_COMMAND" not in mc_run.call_args[1]["env"]
+    assert not os.path.exists(ssh_log)